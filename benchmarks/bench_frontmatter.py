@@ -0,0 +1,44 @@
+"""Compare the fast frontmatter reader with python-frontmatter.
+
+Usage: python benchmarks/bench_frontmatter.py [--tabs N]
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import frontmatter
+from corpus import write_corpus
+
+from tabstash.header import split_frontmatter
+from tabstash.parser import read_source
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tabs", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        content_dir = write_corpus(Path(tmp) / "content", args.tabs)
+        paths = sorted(content_dir.rglob("*.md"))
+
+        readers = {
+            "frontmatter.load": lambda path: frontmatter.load(path),
+            "split_frontmatter": lambda path: split_frontmatter(read_source(path)[1]),
+        }
+        print(f"{args.tabs} tabs")
+        print(f"{'reader':>18} {'µs/file':>9} {'speedup':>8}")
+        baseline = None
+        for name, read in readers.items():
+            start = time.perf_counter()
+            for path in paths:
+                read(path)
+            per_file = (time.perf_counter() - start) / len(paths) * 1e6
+            baseline = baseline or per_file
+            print(f"{name:>18} {per_file:>9.1f} {baseline / per_file:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
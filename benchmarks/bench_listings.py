@@ -0,0 +1,61 @@
+"""Measure home page size and listing render time as the catalog grows.
+
+Builds each catalog once unpaginated and once with the default page size,
+then reports the size of index.html and the time spent rendering the
+index, artist directory and artist pages.
+
+Usage: python benchmarks/bench_listings.py [--tabs 1000,5000,20000]
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from corpus import write_corpus
+
+from tabstash.builder import DEFAULT_PAGE_SIZE, SiteBuilder
+from tabstash.parser import iter_tabs, tab_sort_key
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+def render_listings(builder: SiteBuilder, content_dir: Path) -> float:
+    """Render every listing page once and return the seconds it took."""
+    tabs = sorted((tab.summary() for tab in iter_tabs(content_dir)), key=tab_sort_key)
+    by_artist: dict[str, list] = {}
+    for tab in tabs:
+        by_artist.setdefault(tab.artist_slug, []).append(tab)
+
+    start = time.perf_counter()
+    builder._render_index(tabs, by_artist)
+    for slug, artist_tabs in by_artist.items():
+        builder._render_artist_page(slug, artist_tabs)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tabs", default="1000,5000,20000")
+    args = parser.parse_args()
+
+    print(f"{'tabs':>7} {'page size':>10} {'index.html':>12} {'listings':>10}")
+    for count in map(int, args.tabs.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            content_dir = write_corpus(Path(tmp) / "content", count)
+            for page_size in (0, DEFAULT_PAGE_SIZE):
+                output_dir = Path(tmp) / f"dist-{page_size}"
+                builder = SiteBuilder(
+                    content_dir=content_dir,
+                    templates_dir=PROJECT_ROOT / "templates",
+                    static_dir=PROJECT_ROOT / "static",
+                    output_dir=output_dir,
+                    page_size=page_size,
+                )
+                seconds = render_listings(builder, content_dir)
+                size = (output_dir / "index.html").stat().st_size
+                print(f"{count:>7} {page_size:>10} {size:>12,} {seconds:>9.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Compare time to first page for a full build and for live rendering.
+
+For each catalog size, times a full ``build`` (what ``serve`` needs before
+it can answer anything) against ``serve --live`` answering its first tab
+page, its first listing (which parses the whole catalog), and the same
+pages again from its cache and after one tab is edited.
+
+Usage: python benchmarks/bench_live.py [--tabs 1000,5000]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from corpus import write_corpus
+
+from tabstash.builder import SiteBuilder
+from tabstash.live import LiveSite
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+def timed(func, *args) -> float:
+    """Milliseconds one call takes."""
+    start = time.perf_counter()
+    func(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def make_builder(content_dir: Path, output_dir: Path) -> SiteBuilder:
+    return SiteBuilder(
+        content_dir=content_dir,
+        templates_dir=PROJECT_ROOT / "templates",
+        static_dir=PROJECT_ROOT / "static",
+        output_dir=output_dir,
+        optimize_assets=False,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tabs", default="1000,5000")
+    args = parser.parse_args()
+
+    columns = ["build", "first tab", "first index", "cached", "after edit"]
+    print(f"{'tabs':>7}" + "".join(f"{name:>13}" for name in columns))
+    for count in map(int, args.tabs.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            content_dir = write_corpus(Path(tmp) / "content", count)
+            output_dir = Path(tmp) / "dist"
+            build = timed(make_builder(content_dir, output_dir).build)
+
+            site = LiveSite(make_builder(content_dir, output_dir))
+            source = next((content_dir / "tabs").rglob("*.md"))
+            artist, slug = source.parent.name, source.stem
+            tab_page = f"/tabs/{artist}/{slug}.html"
+            first_tab = timed(site.get, tab_page)
+            first_index = timed(site.get, "/")
+            cached = timed(site.get, "/")
+
+            stat = source.stat()
+            source.write_text(source.read_text() + "\nEdited\n")
+            os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+            edited = timed(site.get, tab_page) + timed(site.get, "/")
+
+            times = [build, first_tab, first_index, cached, edited]
+            print(f"{count:>7}" + "".join(f"{ms:>10.1f} ms" for ms in times))
+
+
+if __name__ == "__main__":
+    main()
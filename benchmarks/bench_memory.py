@@ -0,0 +1,68 @@
+"""Measure peak build memory as the size of the tab content grows.
+
+Each build runs in a fresh process so its peak RSS is measured on its own.
+With the streaming pipeline, peak RSS should stay roughly flat as content
+grows, since only summaries and search postings are kept for every tab.
+
+Usage: python benchmarks/bench_memory.py [--tabs N] [--repeats 1,4,16]
+"""
+
+import argparse
+import resource
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from corpus import write_corpus
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+def build(content_dir: Path, output_dir: Path) -> None:
+    """Run one build and print this process's peak RSS in KiB."""
+    from tabstash.builder import SiteBuilder
+
+    result = SiteBuilder(
+        content_dir=content_dir,
+        templates_dir=PROJECT_ROOT / "templates",
+        static_dir=PROJECT_ROOT / "static",
+        output_dir=output_dir,
+    ).build()
+    assert result.success, result.errors
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tabs", type=int, default=2000)
+    parser.add_argument("--repeats", default="1,4,16")
+    parser.add_argument("--child", nargs=2, type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        build(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{args.tabs} tabs")
+        print(f"{'repeat':>6} {'content MB':>11} {'peak RSS MB':>12}")
+        for repeat in (int(r) for r in args.repeats.split(",")):
+            content_dir = Path(tmp) / f"content-{repeat}"
+            write_corpus(content_dir, args.tabs, repeat=repeat)
+            content_bytes = sum(
+                path.stat().st_size for path in content_dir.rglob("*.md")
+            )
+            output = subprocess.run(
+                [sys.executable, __file__, "--child", content_dir, Path(tmp) / "dist"],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+            peak_kib = int(output.split()[-1])
+            print(
+                f"{repeat:>6} {content_bytes / 2**20:>11.1f} {peak_kib / 1024:>12.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Compare plain builds with pipelined ones, by number of build workers.
+
+For each worker count, times a full build with the plain executor and with
+``--pipeline``, which overlaps reading, parsing, rendering and writing.
+
+Usage: python benchmarks/bench_pipeline.py [--tabs N] [--jobs 1,2,4]
+    [--readers 8] [--writers 4]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from corpus import write_corpus
+
+from tabstash.builder import SiteBuilder
+from tabstash.pipeline import DEFAULT_READERS, DEFAULT_WRITERS, StageLimits
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+def timed_build(
+    content_dir: Path, output_dir: Path, jobs: int, limits: StageLimits | None
+) -> float:
+    """Seconds a full build takes."""
+    builder = SiteBuilder(
+        content_dir=content_dir,
+        templates_dir=PROJECT_ROOT / "templates",
+        static_dir=PROJECT_ROOT / "static",
+        output_dir=output_dir,
+        jobs=jobs,
+        pipeline=limits,
+    )
+    start = time.perf_counter()
+    result = builder.build()
+    assert result.success, result.errors
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tabs", type=int, default=5000)
+    parser.add_argument("--jobs", default="1,2,4")
+    parser.add_argument("--readers", type=int, default=DEFAULT_READERS)
+    parser.add_argument("--writers", type=int, default=DEFAULT_WRITERS)
+    args = parser.parse_args()
+    limits = StageLimits(args.readers, args.writers)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        content_dir = write_corpus(Path(tmp) / "content", args.tabs)
+        print(f"{args.tabs} tabs, {os.cpu_count()} CPUs")
+        print(f"{'jobs':>5} {'plain':>9} {'pipeline':>9} {'speedup':>8}")
+        for jobs in map(int, args.jobs.split(",")):
+            # A fresh output directory each time, so nothing is skipped
+            plain = timed_build(content_dir, Path(tmp) / f"plain-{jobs}", jobs, None)
+            piped = timed_build(content_dir, Path(tmp) / f"piped-{jobs}", jobs, limits)
+            print(f"{jobs:>5} {plain:>8.2f}s {piped:>8.2f}s {plain / piped:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Measure how page rendering scales with the number of build workers.
+
+Usage: python benchmarks/bench_render.py [--tabs N] [--jobs 1,2,4,8,16]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from corpus import write_corpus
+
+from tabstash.builder import SiteBuilder
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tabs", type=int, default=5000)
+    parser.add_argument("--jobs", default="1,2,4,8,16")
+    args = parser.parse_args()
+    job_counts = [int(j) for j in args.jobs.split(",")]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        content_dir = write_corpus(Path(tmp) / "content", args.tabs)
+        print(f"{args.tabs} tabs, {os.cpu_count()} CPUs")
+        print(f"{'jobs':>5} {'seconds':>9} {'pages/s':>9} {'speedup':>8}")
+
+        baseline = None
+        for jobs in job_counts:
+            builder = SiteBuilder(
+                content_dir=content_dir,
+                templates_dir=PROJECT_ROOT / "templates",
+                static_dir=PROJECT_ROOT / "static",
+                output_dir=Path(tmp) / f"dist-{jobs}",
+                jobs=jobs,
+            )
+            start = time.perf_counter()
+            result = builder.build()
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(
+                f"{jobs:>5} {elapsed:>9.2f} {result.pages_generated / elapsed:>9.0f}"
+                f" {baseline / elapsed:>7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
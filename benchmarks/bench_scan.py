@@ -0,0 +1,71 @@
+"""Compare finding changed tabs by snapshot scan against rglob and hashing.
+
+Before snapshots, an incremental build found its sources with ``rglob`` and
+hashed every one to compare with the manifest. A scan against the last
+snapshot only lists directories whose mtime moved and re-stats the rest,
+so only the tabs that changed need hashing. Times both after editing
+``--edits`` tabs in place.
+
+Usage: python benchmarks/bench_scan.py [--tabs N] [--edits 10] [--repeat 5]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from corpus import write_corpus
+
+from tabstash.manifest import hash_file
+from tabstash.scan import scan
+
+
+def best_of(repeat: int, run) -> float:
+    """Fastest of ``repeat`` timed calls, in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tabs", type=int, default=20000)
+    parser.add_argument("--edits", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tabs_dir = write_corpus(Path(tmp) / "content", args.tabs) / "tabs"
+        # Backdate the corpus so the snapshot trusts its mtimes
+        old = time.time() - 60
+        for path in [tabs_dir, *tabs_dir.rglob("*")]:
+            os.utime(path, (old, old))
+        snapshot, _ = scan(tabs_dir, suffix=".md")
+        paths = snapshot.paths()
+        for path in paths[:: max(1, len(paths) // args.edits)][: args.edits]:
+            path.write_bytes(path.read_bytes() + b"\n")
+
+        def rglob_and_hash() -> None:
+            for path in tabs_dir.rglob("*.md"):
+                hash_file(path)
+
+        def scan_and_hash() -> None:
+            _, delta = scan(tabs_dir, snapshot, ".md")
+            for path in delta.changed():
+                hash_file(path)
+
+        _, delta = scan(tabs_dir, snapshot, ".md")
+        print(f"{args.tabs} tabs, {len(delta.changed())} changed")
+        baseline = best_of(args.repeat, rglob_and_hash)
+        scanned = best_of(args.repeat, scan_and_hash)
+        print(f"rglob + hash all: {baseline * 1000:>9.1f} ms")
+        print(f"scan + hash delta: {scanned * 1000:>8.1f} ms")
+        print(f"speedup: {baseline / scanned:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
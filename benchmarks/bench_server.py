@@ -0,0 +1,154 @@
+"""Load-test ``tabstash serve`` against the old single-threaded server.
+
+Builds a corpus, serves it from a child process with either the threaded
+site server or ``socketserver.TCPServer`` with ``SimpleHTTPRequestHandler``
+(what ``serve`` used before), and has client threads request random pages
+and assets over keep-alive connections. ``--idle`` opens connections that
+never send a request first, like a stalled client would.
+
+Usage: python benchmarks/bench_server.py [--tabs N] [--clients 16]
+    [--seconds 5] [--idle 1]
+"""
+
+import argparse
+import functools
+import http.client
+import http.server
+import random
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from corpus import write_corpus
+
+PROJECT_ROOT = Path(__file__).parent.parent
+SERVERS = ("simple", "tabstash")
+
+
+def serve(kind: str, root: Path, port: int) -> None:
+    """Run one kind of server until killed."""
+    if kind == "simple":
+        handler = functools.partial(
+            http.server.SimpleHTTPRequestHandler, directory=str(root)
+        )
+        handler.func.log_message = lambda *args: None
+        socketserver.TCPServer.allow_reuse_address = True
+        httpd = socketserver.TCPServer(("127.0.0.1", port), handler)
+    else:
+        from tabstash.server import SiteServer
+
+        httpd = SiteServer(("127.0.0.1", port), root, quiet=True)
+    print("ready", flush=True)
+    httpd.serve_forever()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def client(port: int, paths: list[str], deadline: float, latencies: list[float]) -> int:
+    """Request random paths until the deadline; return the error count."""
+    errors = 0
+    rng = random.Random()
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+    headers = {"Accept-Encoding": "br, gzip"}
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            connection.request("GET", rng.choice(paths), headers=headers)
+            response = connection.getresponse()
+            response.read()
+            if response.getheader("Connection") == "close" or response.version == 10:
+                connection.close()
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            continue
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+    return errors
+
+
+def load(port: int, paths: list[str], clients: int, seconds: float, idle: int) -> str:
+    """Run the load test and format a result row."""
+    stalled = [socket.create_connection(("127.0.0.1", port)) for _ in range(idle)]
+    latencies: list[list[float]] = [[] for _ in range(clients)]
+    errors = [0] * clients
+    deadline = time.perf_counter() + seconds
+
+    def run(i: int) -> None:
+        errors[i] = client(port, paths, deadline, latencies[i])
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for sock in stalled:
+        sock.close()
+
+    times = sorted(t for per_client in latencies for t in per_client)
+    if not times:
+        return f"{0:>9.0f} {'-':>9} {'-':>9} {sum(errors):>7}"
+    p50 = times[len(times) // 2] * 1000
+    p99 = times[int(len(times) * 0.99)] * 1000
+    return f"{len(times) / seconds:>9.0f} {p50:>9.2f} {p99:>9.2f} {sum(errors):>7}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tabs", type=int, default=500)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--idle", type=int, default=1)
+    parser.add_argument("--servers", default=",".join(SERVERS))
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        serve(args.child[0], Path(args.child[1]), int(args.child[2]))
+        return
+
+    from tabstash.builder import SiteBuilder
+
+    with tempfile.TemporaryDirectory() as tmp:
+        content_dir = write_corpus(Path(tmp) / "content", args.tabs)
+        output_dir = Path(tmp) / "dist"
+        builder = SiteBuilder(
+            content_dir=content_dir,
+            templates_dir=PROJECT_ROOT / "templates",
+            static_dir=PROJECT_ROOT / "static",
+            output_dir=output_dir,
+        )
+        assert builder.build().success
+        pages = sorted(output_dir.glob("tabs/*/*.html"))[:200]
+        paths = ["/", "/search-index.json"]
+        paths += ["/" + path.relative_to(output_dir).as_posix() for path in pages]
+        paths += [builder.asset_url(name) for name in builder.assets]
+
+        print(f"{args.tabs} tabs, {args.clients} clients, {args.idle} idle")
+        print(f"{'server':>9} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        for kind in args.servers.split(","):
+            port = free_port()
+            child = subprocess.Popen(
+                [sys.executable, __file__, "--child", kind, output_dir, str(port)],
+                stdout=subprocess.PIPE,
+                text=True,
+            )
+            try:
+                child.stdout.readline()
+                row = load(port, paths, args.clients, args.seconds, args.idle)
+            finally:
+                child.kill()
+                child.wait()
+            print(f"{kind:>9} {row}")
+
+
+if __name__ == "__main__":
+    main()
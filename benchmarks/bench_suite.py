@@ -0,0 +1,220 @@
+"""Benchmark suite for parse, build and search index, with tracked baselines.
+
+For each catalog size a synthetic corpus is written (see corpus.py) and a
+fresh process measures parse throughput, a full build and its render
+throughput, search index build time and size, and the build's peak RSS.
+Results are compared against benchmarks/baselines.json, and ``--check``
+exits non-zero when a metric is worse than its baseline by more than the
+tolerance, so CI can catch regressions. ``--update`` records the results
+as the new baselines. Baselines are machine-dependent; record them on the
+machine that checks them.
+
+Corpora for 100k tabs and up take minutes to write, so ``--workdir`` keeps
+them between runs.
+
+Usage: python benchmarks/bench_suite.py [--scales 1k,10k,100k,1M]
+    [--jobs 1] [--check] [--update] [--tolerance 0.25] [--workdir DIR]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from corpus import write_corpus
+
+PROJECT_ROOT = Path(__file__).parent.parent
+BASELINES = Path(__file__).parent / "baselines.json"
+DEFAULT_SCALES = "1k,10k"
+
+# Metric -> (unit, whether higher is better, whether it varies between runs)
+METRICS = {
+    "parse_tabs_per_s": ("tabs/s", True, True),
+    "build_seconds": ("s", False, True),
+    "build_pages_per_s": ("pages/s", True, True),
+    "render_pages_per_s": ("pages/s", True, True),
+    "index_seconds": ("s", False, True),
+    "index_bytes": ("B", False, False),
+    "index_gzip_bytes": ("B", False, False),
+    "peak_rss_mb": ("MB", False, True),
+}
+# Allowed growth for metrics that should not vary between runs at all
+EXACT_TOLERANCE = 0.01
+RENDER_PHASES = ("tab render", "index render", "artist render")
+
+
+def parse_scale(text: str) -> int:
+    """Read a catalog size such as ``10k`` or ``1M``."""
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(text[-1].lower(), 1)
+    return int(text.rstrip("kKmM")) * multiplier
+
+
+def corpus(workdir: Path, tabs: int) -> Path:
+    """Write the corpus for a size, or reuse one a previous run left behind."""
+    content_dir = workdir / f"corpus-{tabs}"
+    marker = content_dir / ".complete"
+    if not marker.exists():
+        start = time.perf_counter()
+        write_corpus(content_dir, tabs, workers=os.cpu_count() or 1)
+        marker.touch()
+        print(f"  wrote {tabs:,} tabs in {time.perf_counter() - start:.1f}s")
+    return content_dir
+
+
+def measure(content_dir: Path, output_dir: Path, jobs: int) -> dict[str, float]:
+    """Take every measurement for one corpus. Runs in a fresh process."""
+    from tabstash.builder import SiteBuilder
+    from tabstash.parser import parse_directory
+    from tabstash.search import generate_search_index
+
+    # Build first, so the peak RSS is the build's own
+    builder = SiteBuilder(
+        content_dir=content_dir,
+        templates_dir=PROJECT_ROOT / "templates",
+        static_dir=PROJECT_ROOT / "static",
+        output_dir=output_dir,
+        jobs=jobs,
+    )
+    result = builder.build(profile=True)
+    assert result.success, result.errors
+    profile = result.profile
+    render_seconds = sum(
+        profile.phases[name].wall_seconds
+        for name in RENDER_PHASES
+        if name in profile.phases
+    )
+
+    start = time.perf_counter()
+    tabs = parse_directory(content_dir, workers=jobs)
+    parse_seconds = time.perf_counter() - start
+
+    summaries = [tab.summary() for tab in tabs]
+    del tabs
+    index_path = output_dir / "bench-search-index.json"
+    start = time.perf_counter()
+    generate_search_index(summaries, index_path)
+    index_seconds = time.perf_counter() - start
+
+    metrics = {
+        "parse_tabs_per_s": len(summaries) / parse_seconds,
+        "build_seconds": profile.wall_seconds,
+        "build_pages_per_s": result.pages_generated / profile.wall_seconds,
+        "render_pages_per_s": result.pages_generated / render_seconds,
+        "index_seconds": index_seconds,
+        "index_bytes": result.search_index_bytes,
+        "index_gzip_bytes": result.search_index_gzip_bytes,
+        "peak_rss_mb": profile.peak_rss_bytes / 2**20,
+    }
+    return {name: round(value, 3) for name, value in metrics.items()}
+
+
+def run(content_dir: Path, scratch: Path, jobs: int) -> dict[str, float]:
+    """Measure a corpus in a child process and return its results."""
+    output = subprocess.run(
+        [
+            sys.executable,
+            __file__,
+            "--child",
+            content_dir,
+            scratch / "dist",
+            str(jobs),
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def regression(name: str, baseline: float, current: float, tolerance: float) -> bool:
+    """Whether a metric got worse than its baseline by more than allowed."""
+    _, higher_is_better, noisy = METRICS[name]
+    allowed = tolerance if noisy else EXACT_TOLERANCE
+    if higher_is_better:
+        return current < baseline * (1 - allowed)
+    return current > baseline * (1 + allowed)
+
+
+def report(
+    results: dict[str, dict[str, float]],
+    baselines: dict[str, dict[str, float]],
+    tolerance: float,
+) -> int:
+    """Print results against their baselines and count the regressions."""
+    regressions = 0
+    print(f"{'tabs':>8} {'metric':<20} {'baseline':>12} {'current':>12} {'change':>8}")
+    for scale, metrics in results.items():
+        for name, value in metrics.items():
+            unit = METRICS[name][0]
+            baseline = baselines.get(scale, {}).get(name)
+            if baseline is None:
+                change, status = "", "new"
+            else:
+                change = f"{(value - baseline) / baseline:>+7.1%}" if baseline else ""
+                status = ""
+                if regression(name, baseline, value, tolerance):
+                    status = "REGRESSION"
+                    regressions += 1
+            base = "-" if baseline is None else f"{baseline:,.2f}"
+            print(
+                f"{int(scale):>8,} {name:<20} {base:>12} {value:>12,.2f}"
+                f" {change:>8} {unit} {status}"
+            )
+    return regressions
+
+
+def machine() -> dict[str, str | int]:
+    """What the baselines were recorded on."""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count() or 1,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scales", default=DEFAULT_SCALES)
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument("--update", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--workdir", type=Path)
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        content_dir, output_dir, jobs = args.child
+        print(json.dumps(measure(Path(content_dir), Path(output_dir), int(jobs))))
+        return
+
+    stored = json.loads(BASELINES.read_text()) if BASELINES.exists() else {}
+    baselines = stored.get("scales", {})
+
+    results: dict[str, dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = args.workdir or Path(tmp)
+        workdir.mkdir(parents=True, exist_ok=True)
+        for tabs in map(parse_scale, args.scales.split(",")):
+            print(f"{tabs:,} tabs, {args.jobs} jobs")
+            content_dir = corpus(workdir, tabs)
+            results[str(tabs)] = run(content_dir, Path(tmp), args.jobs)
+
+    regressions = report(results, baselines, args.tolerance)
+    if args.update:
+        baselines.update(results)
+        BASELINES.write_text(
+            json.dumps({"machine": machine(), "scales": baselines}, indent=2) + "\n"
+        )
+        print(f"Updated {BASELINES}")
+    if args.check and regressions:
+        print(f"{regressions} metrics regressed beyond their tolerance")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
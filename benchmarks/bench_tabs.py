@@ -0,0 +1,78 @@
+"""Measure the per-tab cost of validating and holding tab metadata.
+
+Compares pydantic models with the slotted dataclasses builds carry, and
+one-at-a-time validation with batched validation.
+
+Usage: python benchmarks/bench_tabs.py [--tabs N]
+"""
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from corpus import write_corpus
+
+from tabstash.header import split_frontmatter
+from tabstash.models import Metadata, TabMetadata, validate_metadata
+from tabstash.parser import _parse_batch, read_source
+from tabstash.search import build_search_index
+
+
+def bytes_per_item(make: Callable[[], list[Any]]) -> float:
+    """Average memory retained per item of the list ``make`` returns."""
+    tracemalloc.start()
+    items = make()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / len(items)
+
+
+def per_second(run: Callable[[], Any], count: int) -> float:
+    """Items per second for ``run``, which processes ``count`` items."""
+    start = time.perf_counter()
+    run()
+    return count / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tabs", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        content_dir = write_corpus(Path(tmp) / "content", args.tabs)
+        paths = sorted(content_dir.rglob("*.md"))
+        headers = [split_frontmatter(read_source(path)[1])[0] for path in paths]
+        models = [TabMetadata.model_validate(header) for header in headers]
+
+        print(f"{len(paths)} tabs")
+        print(f"{'memory':>28} {'bytes/tab':>10}")
+        memory = {
+            "TabMetadata": lambda: [TabMetadata.model_validate(h) for h in headers],
+            "Metadata": lambda: [Metadata.from_model(m) for m in models],
+        }
+        for name, make in memory.items():
+            print(f"{name:>28} {bytes_per_item(make):>10.0f}")
+
+        print(f"{'throughput':>28} {'tabs/s':>10}")
+        throughput = {
+            "model_validate per tab": lambda: [
+                TabMetadata.model_validate(h) for h in headers
+            ],
+            "validate_metadata batch": lambda: validate_metadata(headers),
+            "parse (read+split+validate)": lambda: _parse_batch(paths),
+        }
+        for name, run in throughput.items():
+            print(f"{name:>28} {per_second(run, len(paths)):>10.0f}")
+
+        tabs = [source.tab for source, _, _ in _parse_batch(paths) if source]
+        rate = per_second(lambda: build_search_index(tabs), len(tabs))
+        print(f"{'search index':>28} {rate:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
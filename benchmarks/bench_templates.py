@@ -0,0 +1,86 @@
+"""Measure what the template bytecode cache saves on cold and warm builds.
+
+Every build runs in a fresh process, as a CLI build would. "cold" builds
+start with an empty template cache and "warm" ones reuse the previous
+build's; the parse cache is warm in both, so the difference is template
+compilation in the main process and in each render worker.
+
+Usage: python benchmarks/bench_templates.py [--tabs N] [--jobs 1,4] [--runs R]
+"""
+
+import argparse
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from corpus import write_corpus
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+def build(content_dir: Path, output_dir: Path, cache_dir: Path, jobs: str) -> None:
+    """Run one build and print template load and build times in seconds."""
+    from tabstash.builder import SiteBuilder
+
+    start = time.perf_counter()
+    builder = SiteBuilder(
+        content_dir=content_dir,
+        templates_dir=PROJECT_ROOT / "templates",
+        static_dir=PROJECT_ROOT / "static",
+        output_dir=output_dir,
+        jobs=int(jobs),
+        cache_dir=cache_dir,
+    )
+    builder.warm_templates()
+    loaded = time.perf_counter()
+    result = builder.build()
+    assert result.success, result.errors
+    print(loaded - start, time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tabs", type=int, default=500)
+    parser.add_argument("--jobs", default="1,4")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--child", nargs=4, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        build(*map(Path, args.child[:3]), args.child[3])
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        content_dir = write_corpus(Path(tmp) / "content", args.tabs)
+        cache_dir = Path(tmp) / "cache"
+
+        def run(jobs: int, cold: bool) -> tuple[float, float]:
+            best = (float("inf"), float("inf"))
+            for _ in range(args.runs):
+                if cold:
+                    shutil.rmtree(cache_dir / "jinja", ignore_errors=True)
+                output = subprocess.run(
+                    [sys.executable, __file__, "--child", content_dir,
+                     Path(tmp) / "dist", cache_dir, str(jobs)],
+                    capture_output=True, text=True, check=True,
+                ).stdout  # fmt: skip
+                times = tuple(float(t) for t in output.split()[-2:])
+                best = min(best, times, key=lambda t: t[1])
+            return best
+
+        run(1, cold=False)  # warm the parse cache
+        print(f"{args.tabs} tabs")
+        print(f"{'jobs':>4} {'cache':>5} {'templates ms':>13} {'build ms':>9}")
+        for jobs in (int(j) for j in args.jobs.split(",")):
+            for cold in (True, False):
+                templates, total = run(jobs, cold)
+                label = "cold" if cold else "warm"
+                print(
+                    f"{jobs:>4} {label:>5} {templates * 1e3:>13.1f} {total * 1e3:>9.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
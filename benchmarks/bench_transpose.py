@@ -0,0 +1,56 @@
+"""Measure what precomputing twelve key variants adds to each tab page.
+
+Usage: python benchmarks/bench_transpose.py [--tabs N] [--repeat R]
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from corpus import write_corpus
+
+from tabstash.builder import SiteBuilder
+from tabstash.parser import parse_directory
+from tabstash.transpose import transpose_tab
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tabs", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        content_dir = write_corpus(Path(tmp) / "content", args.tabs, repeat=args.repeat)
+        tabs = parse_directory(content_dir)
+        builder = SiteBuilder(
+            content_dir=content_dir,
+            templates_dir=PROJECT_ROOT / "templates",
+            static_dir=PROJECT_ROOT / "static",
+            output_dir=Path(tmp) / "dist",
+        )
+
+        start = time.perf_counter()
+        variants = [transpose_tab(t.content, t.lines, t.metadata.key) for t in tabs]
+        transpose_us = (time.perf_counter() - start) / len(tabs) * 1e6
+        data = sum(
+            len(json.dumps(v.to_dict(), separators=(",", ":"))) for v in variants if v
+        )
+
+        start = time.perf_counter()
+        for tab in tabs:
+            builder._render_tab_page(tab)
+        render_us = (time.perf_counter() - start) / len(tabs) * 1e6
+
+        print(f"{len(tabs)} tabs, {data / len(tabs):.0f} bytes of key data per tab")
+        print(f"{'transpose':>12} {transpose_us:>8.1f} µs/tab")
+        print(f"{'tab page':>12} {render_us:>8.1f} µs/tab (including transpose)")
+        print(f"{'share':>12} {transpose_us / render_us:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Deterministic synthetic tab corpus for benchmarks.
+
+Writes catalogs that look like real ones: artists with made-up band names
+and a long-tailed number of songs each, frontmatter using every field the
+site knows about, and songs made of intro, verse, chorus and bridge
+sections with chord lines over lyrics and the odd tab staff. Each tab is
+generated from its own seeded random stream, so a corpus is the same on
+every machine and a tab does not change when the corpus around it grows.
+
+Usage: python benchmarks/corpus.py DIR [--tabs N] [--artists M] [--seed S]
+    [--workers W]
+"""
+
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from tabstash.parser import slugify
+
+KEYS = ["C", "G", "D", "A", "E", "F", "Bb", "Am", "Em", "Bm", "F#m", "Dm"]
+CHORDS = [
+    "G", "C", "D", "Em", "Am", "F", "A7", "Dsus4", "Cadd9", "Bm", "E", "A",
+    "B7", "Fmaj7", "G/B", "Em7", "Asus2", "D/F#", "C#m", "Bb",
+]  # fmt: skip
+WORDS = [
+    "the", "road", "goes", "on", "and", "under", "a", "silver", "moon",
+    "tonight", "we", "sing", "heart", "river", "home", "never", "you", "me",
+    "light", "down", "old", "town", "rain", "falling", "again", "love",
+    "dream", "tomorrow", "gold", "slow", "running", "back", "to", "your",
+]  # fmt: skip
+ADJECTIVES = [
+    "Silver", "Electric", "Velvet", "Broken", "Midnight", "Golden", "Lonely",
+    "Wild", "Paper", "Crimson", "Hollow", "Neon", "Quiet", "Rusty", "Sunday",
+    "Northern", "Little", "Burning", "Blue", "Wooden",
+]  # fmt: skip
+NOUNS = [
+    "River", "Ghost", "Engine", "Sparrow", "Lantern", "Harbor", "Canyon",
+    "Satellite", "Orchard", "Highway", "Mirror", "Wolf", "Parade", "Thunder",
+    "Garden", "Signal", "Comet", "Willow", "Anchor", "Radio",
+]  # fmt: skip
+TAGS = [
+    "acoustic", "rock", "folk", "pop", "punk", "90s", "80s", "ballad",
+    "beginner-friendly", "fingerpicking", "strumming", "country", "indie",
+]  # fmt: skip
+TUNINGS = ["standard"] * 8 + ["drop D", "half step down", "open G"]
+DIFFICULTIES = [None, "beginner", "intermediate", "advanced"]
+STRUCTURE = ["Verse 1", "Chorus", "Verse 2", "Chorus", "Bridge", "Chorus"]
+STAFF = "e|", "B|", "G|", "D|", "A|", "E|"
+
+
+def artist_name(index: int) -> str:
+    """A unique band name for the artist with this index."""
+    combos = len(ADJECTIVES) * len(NOUNS)
+    name = f"The {ADJECTIVES[index % len(ADJECTIVES)]}"
+    name += f" {NOUNS[index // len(ADJECTIVES) % len(NOUNS)]}s"
+    return name if index < combos else f"{name} {index // combos + 1}"
+
+
+def song_title(rng: random.Random) -> str:
+    return " ".join(rng.choices(WORDS, k=rng.randint(1, 4))).title()
+
+
+def chord_line(rng: random.Random, lyric: str) -> str:
+    """Chords spaced out over a lyric line, the way tabs are written."""
+    columns = sorted(rng.sample(range(max(len(lyric), 2)), k=min(3, len(lyric))))
+    line = ""
+    for column in columns:
+        line = line.ljust(column if column > len(line) else len(line) + 1)
+        line += rng.choice(CHORDS)
+    return line
+
+
+def staff(rng: random.Random) -> list[str]:
+    """A short tab staff riff."""
+    lines = []
+    for string in STAFF:
+        notes = (rng.choice("---" + str(rng.randint(0, 7))) for _ in range(24))
+        lines.append(string + "".join(notes) + "|")
+    return lines
+
+
+def song(rng: random.Random, repeat: int = 1) -> list[str]:
+    """The lines of one song's content."""
+    lines = ["[Intro]", "  ".join(rng.choices(CHORDS, k=4)) + "  (x2)", ""]
+    if rng.random() < 0.2:
+        lines[2:2] = staff(rng)
+    for section in STRUCTURE * repeat:
+        lines.append(f"[{section}]")
+        for _ in range(rng.randint(2, 6)):
+            lyric = " ".join(rng.choices(WORDS, k=rng.randint(4, 9))).capitalize()
+            lines.append(chord_line(rng, lyric))
+            lines.append(lyric)
+        lines.append("")
+    lines += ["[Outro]", "  ".join(rng.choices(CHORDS, k=3)), ""]
+    return lines
+
+
+def tab_text(rng: random.Random, title: str, artist: str, repeat: int = 1) -> str:
+    """A tab file with frontmatter."""
+    header = ["---", f'title: "{title}"', f'artist: "{artist}"']
+    header.append(f'key: "{rng.choice(KEYS)}"')
+    if rng.random() < 0.3:
+        header.append(f"capo: {rng.randint(1, 5)}")
+    header.append(f'tuning: "{rng.choice(TUNINGS)}"')
+    difficulty = rng.choice(DIFFICULTIES)
+    if difficulty is not None:
+        header.append(f'difficulty: "{difficulty}"')
+    if rng.random() < 0.7:
+        header.append(f"bpm: {rng.randint(60, 180)}")
+    tags = ", ".join(f'"{tag}"' for tag in rng.sample(TAGS, k=rng.randint(1, 4)))
+    header.append(f"tags: [{tags}]")
+    if rng.random() < 0.1:
+        header.append('format: "compact"')
+    if rng.random() < 0.01:
+        header.append("featured: true")
+    return "\n".join(header + ["---", ""] + song(rng, repeat))
+
+
+def _write_tabs(
+    root: Path, indexes: range, names: list[str], seed: int, repeat: int
+) -> None:
+    """Write the tabs with the given indexes."""
+    for i in indexes:
+        rng = random.Random(f"{seed}:{i}")
+        artist = i if i < len(names) else int(len(names) * rng.random() ** 2)
+        title = song_title(rng)
+        path = root / "tabs" / slugify(names[artist]) / f"{slugify(title)}-{i}.md"
+        path.write_text(tab_text(rng, title, names[artist], repeat))
+
+
+def write_corpus(
+    root: Path,
+    tabs: int,
+    artists: int = 0,
+    seed: int = 0,
+    repeat: int = 1,
+    workers: int = 1,
+) -> Path:
+    """Write ``tabs`` tab files under ``root/tabs`` and return ``root``.
+
+    ``artists`` defaults to one per 20 tabs. The first tabs give every artist
+    a song, and the rest go mostly to the first artists, so song counts have
+    a long tail like a real catalog. ``repeat`` plays each song's sections
+    that many times over, which scales the content size without changing
+    the number of tabs. With ``workers > 1`` the files are written by that
+    many processes; the corpus is the same either way.
+    """
+    names = [artist_name(i) for i in range(min(artists or max(1, tabs // 20), tabs))]
+    for name in names:
+        (root / "tabs" / slugify(name)).mkdir(parents=True, exist_ok=True)
+    if workers <= 1:
+        _write_tabs(root, range(tabs), names, seed, repeat)
+        return root
+
+    chunk = -(-tabs // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(
+                _write_tabs, root, range(i, min(i + chunk, tabs)), names, seed, repeat
+            )
+            for i in range(0, tabs, chunk)
+        ]
+        for future in futures:
+            future.result()
+    return root
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("root", type=Path)
+    parser.add_argument("--tabs", type=int, default=1000)
+    parser.add_argument("--artists", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    write_corpus(
+        args.root, args.tabs, args.artists, args.seed, args.repeat, args.workers
+    )
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {args.tabs} tabs to {args.root / 'tabs'} in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+"""Static asset pipeline: minify, fingerprint and precompress.
+
+Each file under the static directory is written to the output once per
+content change. Stylesheets and scripts are minified, every file gets a
+content hash in its name (``js/search.js`` becomes ``js/search.1a2b3c4d.js``)
+so browsers can cache it indefinitely, and text files get ``.gz``/``.br``
+siblings. Templates look the hashed names up through the ``asset()`` global.
+"""
+
+import json
+import re
+from collections.abc import Callable
+from contextlib import suppress
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+
+from .compress import COMPRESSED_SUFFIXES, write_compressed
+from .manifest import AssetEntry, hash_bytes
+from .output import write_file
+
+# Written to the output's static directory, mapping each asset to the path
+# it was written to
+ASSET_MANIFEST_NAME = "assets.json"
+
+FINGERPRINT_LENGTH = 8
+
+# Assets worth precompressing
+TEXT_SUFFIXES = frozenset({".css", ".js", ".json", ".svg", ".txt", ".html", ".map"})
+
+_CSS_TOKEN = re.compile(
+    r"""(?P<comment>/\*.*?\*/)"""
+    r"""|(?P<space>\s+)"""
+    r"""|(?P<string>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')"""
+    r"""|[^\s"'/{};,>:]+|.""",
+    re.DOTALL,
+)
+# Spaces next to these are never significant. Colons only lose the space
+# after them, since a space before one is a descendant selector.
+_CSS_TIGHT_BEFORE = frozenset("{};,>")
+_CSS_TIGHT_AFTER = frozenset("{};,>:")
+
+_JS_WORD = re.compile(r"[\w$]+")
+_JS_SPACE = re.compile(r"[ \t\r\n]+")
+_JS_FLAGS = re.compile(r"[a-z]*")
+# Keywords after which a slash starts a regular expression, not a division
+_JS_REGEX_AFTER = frozenset({
+    "return", "typeof", "instanceof", "in", "of", "new", "delete", "void",
+    "throw", "case", "do", "else", "yield", "await",
+})  # fmt: skip
+# Keywords whose parenthesized head ends just before a statement, so a slash
+# after its closing parenthesis starts a regular expression too
+_JS_CONTROL = frozenset({"if", "while", "for", "with"})
+# A line break next to these can go without changing where statements end
+_JS_JOIN_AFTER = frozenset("{(;,:[=&|?")
+_JS_JOIN_BEFORE = frozenset("}),;:].")
+
+
+def minify_css(text: str) -> str:
+    """Strip comments and insignificant whitespace from a stylesheet."""
+    out: list[str] = []
+    space = False
+    for match in _CSS_TOKEN.finditer(text):
+        if match.lastgroup in ("comment", "space"):
+            space = True
+            continue
+        token = match.group()
+        if token == "}" and out and out[-1] == ";":
+            out.pop()
+        elif (
+            space
+            and out
+            and out[-1][-1] not in _CSS_TIGHT_AFTER
+            and token not in _CSS_TIGHT_BEFORE
+        ):
+            out.append(" ")
+        out.append(token)
+        space = False
+    return "".join(out)
+
+
+def _js_string_end(text: str, start: int) -> int:
+    """Index just past the quoted string starting at ``start``."""
+    quote = text[start]
+    i = start + 1
+    while i < len(text):
+        char = text[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == quote:
+            return i + 1
+        if char == "\n":
+            break
+        i += 1
+    raise ValueError(f"unterminated string at offset {start}")
+
+
+def _js_template_end(text: str, start: int) -> int:
+    """Index just past the template literal starting at ``start``."""
+    i = start + 1
+    while i < len(text):
+        char = text[i]
+        if char == "\\":
+            i += 2
+        elif char == "`":
+            return i + 1
+        elif text.startswith("${", i):
+            i = _js_braces_end(text, i + 2)
+        else:
+            i += 1
+    raise ValueError(f"unterminated template literal at offset {start}")
+
+
+def _js_braces_end(text: str, start: int) -> int:
+    """Index just past the ``}`` closing a template substitution."""
+    depth = 1
+    i = start
+    while i < len(text):
+        char = text[i]
+        if char in "'\"":
+            i = _js_string_end(text, i)
+            continue
+        if char == "`":
+            i = _js_template_end(text, i)
+            continue
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    raise ValueError(f"unterminated template substitution at offset {start}")
+
+
+def _js_regex_end(text: str, start: int) -> int:
+    """Index just past the regular expression literal starting at ``start``."""
+    i = start + 1
+    in_class = False
+    while i < len(text):
+        char = text[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == "\n":
+            break
+        if char == "[":
+            in_class = True
+        elif char == "]":
+            in_class = False
+        elif char == "/" and not in_class:
+            return _JS_FLAGS.match(text, i + 1).end()
+        i += 1
+    raise ValueError(f"unterminated regular expression at offset {start}")
+
+
+def _js_needs_space(before: str, after: str) -> bool:
+    """Whether two tokens would run together without a space."""
+    a, b = before[-1], after[0]
+    if (a.isalnum() or a in "_$") and (b.isalnum() or b in "_$"):
+        return True
+    # a + +b, a - -b, and 1 .toString()
+    return (a == b and a in "+-/") or (a.isdigit() and b == ".")
+
+
+def minify_js(text: str) -> str:
+    """Strip comments and insignificant whitespace from a script.
+
+    Line breaks are kept wherever automatic semicolon insertion could
+    depend on them, so the result parses to the same program without the
+    minifier needing to understand statements. Raises ``ValueError`` on
+    unterminated literals and comments.
+    """
+    out: list[str] = []
+    last = ""
+    pending = ""
+    # For each open parenthesis, whether it is the head of an if, while,
+    # for or with; after the ``)`` closing one of those, a slash is a regex
+    parens: list[bool] = []
+    after_head = False
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if match := _JS_SPACE.match(text, i):
+            pending = "\n" if "\n" in match.group() or pending == "\n" else " "
+            i = match.end()
+            continue
+        if text.startswith("//", i):
+            end = text.find("\n", i)
+            i = len(text) if end == -1 else end
+            continue
+        if text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            if end == -1:
+                raise ValueError(f"unterminated comment at offset {i}")
+            pending = "\n" if "\n" in text[i:end] else pending or " "
+            i = end + 2
+            continue
+
+        if char in "'\"":
+            end = _js_string_end(text, i)
+        elif char == "`":
+            end = _js_template_end(text, i)
+        elif char == "/" and (
+            not last
+            or last in _JS_REGEX_AFTER
+            or after_head
+            or not (_JS_WORD.match(last[-1]) or last[-1] in ")]}'\"`")
+        ):
+            end = _js_regex_end(text, i)
+        elif match := _JS_WORD.match(text, i):
+            end = match.end()
+        else:
+            end = i + 1
+        token = text[i:end]
+        if token == "(":
+            parens.append(last in _JS_CONTROL)
+            after_head = False
+        else:
+            after_head = token == ")" and bool(parens) and parens.pop()
+
+        if pending and out:
+            if pending == "\n" and not (
+                last[-1] in _JS_JOIN_AFTER or token[0] in _JS_JOIN_BEFORE
+            ):
+                out.append("\n")
+            elif _js_needs_space(last, token):
+                out.append(" ")
+        out.append(token)
+        last = token
+        pending = ""
+        i = end
+    if out:
+        out.append("\n")
+    return "".join(out)
+
+
+MINIFIERS: dict[str, Callable[[str], str]] = {".css": minify_css, ".js": minify_js}
+
+
+def fingerprint(name: str, data: bytes) -> str:
+    """Put a hash of ``data`` into an asset's name, before its suffix."""
+    path = PurePosixPath(name)
+    digest = hash_bytes(data)[:FINGERPRINT_LENGTH]
+    return str(path.with_name(f"{path.stem}.{digest}{path.suffix}"))
+
+
+@dataclass
+class AssetBuild:
+    """Result of running the asset pipeline."""
+
+    entries: dict[str, AssetEntry] = field(default_factory=dict)
+    written: int = 0
+    skipped: int = 0
+    # Assets that could not be minified and were copied as they are
+    warnings: list[str] = field(default_factory=list)
+
+    def paths(self) -> dict[str, str]:
+        """Map each asset's name to the path it was written to."""
+        return {name: entry.path for name, entry in self.entries.items()}
+
+
+def _write_asset(
+    source: Path, data: bytes, name: str, output_dir: Path, warnings: list[str]
+) -> str:
+    """Minify, fingerprint and precompress one asset, returning its path.
+
+    An asset the minifier cannot handle is written unminified, with a
+    warning, rather than failing the build.
+    """
+    suffix = source.suffix
+    minify = MINIFIERS.get(suffix)
+    if minify is not None:
+        try:
+            data = minify(data.decode()).encode()
+        except ValueError as e:
+            warnings.append(f"Copied {name} unminified: {e}")
+    path = fingerprint(name, data)
+    target = output_dir / path
+    target.parent.mkdir(parents=True, exist_ok=True)
+    write_file(target, data)
+    if suffix in TEXT_SUFFIXES:
+        write_compressed(target, data)
+    return path
+
+
+def _remove_stale(output_dir: Path, keep: set[str]) -> None:
+    """Delete files left over from assets that changed or went away."""
+    directories = []
+    for path in output_dir.rglob("*"):
+        if path.is_dir():
+            directories.append(path)
+        elif path.relative_to(output_dir).as_posix() not in keep:
+            path.unlink()
+    for directory in sorted(directories, reverse=True):
+        with suppress(OSError):
+            directory.rmdir()
+
+
+def build_assets(
+    static_dir: Path,
+    output_dir: Path,
+    previous: dict[str, AssetEntry] | None = None,
+    optimize: bool = True,
+) -> AssetBuild:
+    """Write the static assets into ``output_dir``, the site's static directory.
+
+    Assets whose source hash matches their ``previous`` entry are left as
+    they are, and outputs no asset maps to any more are deleted. Without
+    ``optimize``, assets are copied under their own names untouched, which
+    is what the development server wants.
+    """
+    previous = previous or {}
+    result = AssetBuild()
+    keep = {ASSET_MANIFEST_NAME}
+    sources = sorted(static_dir.rglob("*")) if static_dir.is_dir() else []
+    for source in sources:
+        if not source.is_file():
+            continue
+        name = source.relative_to(static_dir).as_posix()
+        data = source.read_bytes()
+        digest = hash_bytes(data)
+        entry = previous.get(name)
+        if (
+            entry is not None
+            and entry.hash == digest
+            and (output_dir / entry.path).exists()
+        ):
+            result.skipped += 1
+        elif optimize:
+            path = _write_asset(source, data, name, output_dir, result.warnings)
+            entry = AssetEntry(digest, path)
+            result.written += 1
+        else:
+            (output_dir / name).parent.mkdir(parents=True, exist_ok=True)
+            write_file(output_dir / name, data)
+            entry = AssetEntry(digest, name)
+            result.written += 1
+        result.entries[name] = entry
+        keep.add(entry.path)
+        if optimize and source.suffix in TEXT_SUFFIXES:
+            keep.update(entry.path + suffix for suffix in COMPRESSED_SUFFIXES)
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    _remove_stale(output_dir, keep)
+    write_file(
+        output_dir / ASSET_MANIFEST_NAME,
+        json.dumps(result.paths(), indent=2, sort_keys=True).encode(),
+    )
+    return result
@@ -1,15 +1,97 @@
 """Static site builder for TabStash."""
 
+import bisect
+import os
 import shutil
-from collections import defaultdict
+import time
+from collections import defaultdict, deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import AbstractContextManager, nullcontext, suppress
 from dataclasses import dataclass, field
+from itertools import chain, islice
 from pathlib import Path
+from typing import Any, NamedTuple, TypeVar
 
 from jinja2 import Environment, FileSystemLoader
 
-from .models import Tab
-from .parser import extract_sections, parse_directory
-from .search import generate_search_index
+from .assets import build_assets
+from .cache import CacheEntry, ParseCache, template_cache
+from .compress import sibling
+from .fulltext import CHORDS_INDEX_NAME, LYRICS_INDEX_NAME, FullTextIndexer
+from .manifest import (
+    MANIFEST_NAME,
+    AssetEntry,
+    BuildManifest,
+    SourceEntry,
+    hash_bytes,
+    hash_file,
+    hash_tree,
+)
+from .models import LineKind, Tab, TabSummary
+from .output import (
+    WriteStats,
+    add_writes,
+    current_stage,
+    replace_directory,
+    set_stage,
+    stage,
+    write_file,
+    write_totals,
+)
+from .paginate import Page, paginate, stale_pages
+from .parser import (
+    ParsedSource,
+    cached_tab,
+    decode_source,
+    iter_tabs,
+    parse_file,
+    parse_source,
+    tab_sort_key,
+)
+from .pipeline import Output, Pipeline, StageLimits
+from .profiling import BuildProfile, Profiler
+from .scan import SNAPSHOT_NAME, Snapshot, scan
+from .search import generate_search_index, search_index_sizes
+from .shard import (
+    MERGED_NAMES,
+    SHARD_METADATA_NAME,
+    ShardMetadata,
+    merge_fulltext,
+    shard_of,
+)
+from .transpose import transpose_tab
+
+# (output page, page kind, render arguments)
+RenderJob = tuple[str, str, tuple[Any, ...]]
+
+
+class RenderOutcome(NamedTuple):
+    """The output page of a render job, its error if it failed, and its time."""
+
+    page: str
+    error: str | None
+    seconds: float
+
+
+# A worker's render outcomes for one batch, and the writes it made for them
+WorkerBatch = tuple[list[RenderOutcome], WriteStats]
+
+# Render jobs sent to a worker at a time
+RENDER_BATCH_SIZE = 16
+
+# Tabs or artists per listing page
+DEFAULT_PAGE_SIZE = 100
+
+T = TypeVar("T")
+
+
+class Listing(NamedTuple):
+    """A paginated listing and the template context shared by its pages."""
+
+    template: str
+    pages: list[Page]
+    context: dict[str, Any]
 
 
 @dataclass
@@ -17,14 +99,76 @@ class BuildResult:
     """Result of a build operation."""
 
     pages_generated: int = 0
+    pages_skipped: int = 0
     search_index_size: int = 0
+    search_index_bytes: int = 0
+    search_index_gzip_bytes: int = 0
+    search_index_brotli_bytes: int = 0
+    assets_written: int = 0
+    assets_skipped: int = 0
+    # Output files written, and left alone because they were unchanged
+    files_written: int = 0
+    bytes_written: int = 0
+    files_skipped: int = 0
+    bytes_skipped: int = 0
+    # Tab sources added, modified and deleted since the last build's scan
+    sources_added: int = 0
+    sources_modified: int = 0
+    sources_deleted: int = 0
     errors: list[str] = field(default_factory=list)
+    # Problems worked around without failing the build
+    warnings: list[str] = field(default_factory=list)
+    # Only recorded by build(profile=True)
+    profile: BuildProfile | None = None
 
     @property
     def success(self) -> bool:
         return len(self.errors) == 0
 
 
+class SourceJob(NamedTuple):
+    """A tab source read by the build pipeline, and what to do with it."""
+
+    path: Path
+    # None if the file could not be read
+    data: bytes | None
+    digest: str = ""
+    stat: os.stat_result | None = None
+    error: str | None = None
+    # The source's parse cache entry, if it is still valid
+    cached: CacheEntry | None = None
+    render: bool = False
+
+
+class ProcessedSource(NamedTuple):
+    """A pipelined tab's parse result or error, parse time and page render."""
+
+    source: ParsedSource | None
+    error: str | None
+    seconds: float
+    outcome: RenderOutcome | None = None
+
+
+def _changed(previous: BuildManifest | None, key: str, digest: str) -> bool:
+    """Whether a source is new or changed since the ``previous`` build."""
+    old = previous.sources.get(key) if previous is not None else None
+    return old is None or old.hash != digest
+
+
+def group_by_artist(tabs: list[TabSummary]) -> dict[str, list[TabSummary]]:
+    """Group tabs by artist slug, preserving their order."""
+    tabs_by_artist: dict[str, list[TabSummary]] = defaultdict(list)
+    for tab in tabs:
+        tabs_by_artist[tab.artist_slug].append(tab)
+    return tabs_by_artist
+
+
+def _listing_key(tab: TabSummary) -> tuple[Any, ...]:
+    """The parts of a tab that appear on the index page."""
+    meta = tab.metadata
+    return (meta.title, meta.artist, meta.featured, meta.key, meta.format)
+
+
 class SiteBuilder:
     """Builds the static site from tab content."""
 
@@ -35,118 +179,1091 @@ class SiteBuilder:
         static_dir: Path,
         output_dir: Path,
         base_url: str = "",
+        jobs: int = 1,
+        cache_dir: Path | None = None,
+        search_shard_prefix: int = 0,
+        compact_search: bool = False,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        optimize_assets: bool = True,
+        pipeline: StageLimits | None = None,
+        shard: tuple[int, int] | None = None,
     ):
         self.content_dir = content_dir
         self.templates_dir = templates_dir
         self.static_dir = static_dir
         self.output_dir = output_dir
         self.base_url = base_url.rstrip("/")
+        self.jobs = jobs
+        self.cache_dir = cache_dir
+        self.search_shard_prefix = search_shard_prefix
+        self.compact_search = compact_search
+        self.page_size = page_size
+        self.optimize_assets = optimize_assets
+        # Build tab pages on the overlapped pipeline, with these stage limits
+        self.pipeline = pipeline
+        # (K, N) to build only shard K of N (see shard.py)
+        self.shard = shard
+        # Static asset name -> path written under static/, from the last build
+        self.assets: dict[str, str] = {}
+
+        # State from the last build, used by update()
+        self._tabs: dict[Path, TabSummary] | None = None
+        self._manifest: BuildManifest | None = None
+        self._fulltext: FullTextIndexer | None = None
+        # Set for the duration of a profiled build
+        self._profiler: Profiler | None = None
+        # Tab sources found by the scan of the build in progress, in every
+        # shard
+        self._sources: list[Path] | None = None
 
         self.env = Environment(
             loader=FileSystemLoader(templates_dir),
             autoescape=True,
+            bytecode_cache=template_cache(cache_dir) if cache_dir else None,
         )
         # Add base_url to all templates
         self.env.globals["base_url"] = self.base_url
+        self.env.globals["search_shard_prefix"] = self.search_shard_prefix
+        self.env.globals["asset"] = self.asset_url
+        self.env.globals["LineKind"] = LineKind
+        self.env.policies["json.dumps_kwargs"] = {
+            "sort_keys": True,
+            "separators": (",", ":"),
+        }
 
-    def build(self) -> BuildResult:
-        """Build the complete static site."""
+    def build(self, incremental: bool = False, profile: bool = False) -> BuildResult:
+        """Build the complete static site.
+
+        The site is built in a staging directory next to the output
+        directory and swapped into place once it is complete, so the output
+        never holds a half-built site; if the build fails, the previous
+        output is left as it was. Files identical to the previous output's
+        are not rewritten, so they keep their mtimes.
+
+        With ``incremental=True`` the manifest from the previous build is used
+        to re-render only pages whose source tabs changed, to prune the
+        outputs of deleted tabs and to skip static assets that have not
+        changed. Template, base URL or asset URL changes force every page to
+        be rebuilt. With ``profile=True`` the result carries a
+        ``BuildProfile`` of where the build spent its time.
+        """
         result = BuildResult()
+        self._tabs = self._manifest = self._fulltext = None
+        self._profiler = Profiler() if profile else None
+        writes = write_totals()
+        live = self.output_dir
+
+        with self._phase("clean"):
+            previous = BuildManifest.load(live / MANIFEST_NAME) if incremental else None
+            # Any build can scan against the last snapshot, but only an
+            # incremental one trusts the hashes in the last manifest
+            known = Snapshot.load(
+                live / SNAPSHOT_NAME, self.content_dir / "tabs", ".md"
+            )
+            # An incremental build starts from the previous output; a full
+            # one starts empty, but still links in files that did not change
+            self.output_dir = stage(live, clone=previous is not None)
+        set_stage((self.output_dir, live))
+        try:
+            self._build(previous, known, result)
+        finally:
+            set_stage(None)
+            self._sources = None
+            staging, self.output_dir = self.output_dir, live
 
-        # Clean and create output directory
-        if self.output_dir.exists():
-            shutil.rmtree(self.output_dir)
-        self.output_dir.mkdir(parents=True)
+        with self._phase("swap"):
+            if result.success:
+                replace_directory(staging, live)
+            else:
+                shutil.rmtree(staging)
+                # The output is still the previous build's, which update()
+                # knows nothing about
+                self._tabs = self._manifest = self._fulltext = None
+        self._count_writes(result, writes)
+        return self._finish(result)
 
-        # Copy static assets
-        if self.static_dir.exists():
-            shutil.copytree(self.static_dir, self.output_dir / "static")
+    def _build(
+        self,
+        previous: BuildManifest | None,
+        known: Snapshot | None,
+        result: BuildResult,
+    ) -> None:
+        """Build the site into ``output_dir``, the staging directory."""
+        template_hashes = hash_tree(self.templates_dir)
 
-        # Parse all tabs
-        tabs = parse_directory(self.content_dir)
-        if not tabs:
+        # Sources that did not change since the last build keep their hashes
+        with self._phase("scan"):
+            snapshot, digests = self._scan_sources(previous, known, result)
+
+        # Assets come first, since pages link to their fingerprinted names
+        with self._phase("assets"):
+            reusable = previous is not None and (
+                previous.options.get("optimize_assets") == self.optimize_assets
+            )
+            assets = self._build_assets(previous.assets if reusable else None, result)
+
+        if previous is not None and (
+            previous.templates != template_hashes
+            or previous.options != self._output_options()
+            or {name: entry.path for name, entry in previous.assets.items()}
+            != self.assets
+        ):
+            previous = None
+            with self._phase("clean"):
+                self._clear_pages()
+
+        manifest = BuildManifest(
+            options=self._output_options(),
+            templates=template_hashes,
+            assets=assets,
+        )
+        summaries: list[TabSummary] = []
+        dirty_keys: set[str] = set()
+        # A full build indexes lyrics and chords as the tabs stream past; an
+        # incremental one re-reads them only if the search index is rewritten
+        fulltext = FullTextIndexer() if previous is None else None
+
+        def record(tab: Tab, digest: str | None = None) -> bool:
+            """Record a streamed tab, returning whether its page is out of date."""
+            key = self._source_key(tab)
+            with self._phase("manifest"):
+                entry = self._source_entry(tab, digest or digests.get(tab.source_path))
+            manifest.sources[key] = entry
+            summaries.append(tab.summary())
+            if fulltext is not None:
+                with self._phase("search index"):
+                    fulltext.add(tab)
+            if _changed(previous, key, entry.hash):
+                dirty_keys.add(key)
+                return True
+            result.pages_skipped += 1
+            return False
+
+        def tab_jobs(cache: ParseCache | None) -> Iterator[RenderJob]:
+            """Record each streamed tab and yield its page if it changed."""
+            for tab in self._iterate("parse", self._iter_tabs(cache)):
+                if record(tab):
+                    yield (self._tab_page_path(tab), "tab", (tab,))
+
+        # Render tab pages as the tabs are parsed, so only one window of tab
+        # content is in memory at a time; everything after works from the
+        # content-free summaries
+        with self._parse_cache() as cache:
+            if self.pipeline is not None:
+                with self._phase("tab pipeline"):
+                    self._run_pipeline(cache, previous, record, result)
+            else:
+                with self._phase("tab render"):
+                    self._record_pages(result, self._render_pages(tab_jobs(cache)))
+        if not summaries and self.shard is None:
             result.errors.append("No tabs found in content directory")
-            return result
+            return
+
+        with self._phase("group"):
+            summaries.sort(key=tab_sort_key)
+            tabs_by_artist = group_by_artist(summaries)
 
-        # Group tabs by artist
-        tabs_by_artist: dict[str, list[Tab]] = defaultdict(list)
-        for tab in tabs:
-            tabs_by_artist[tab.artist_slug].append(tab)
+            # Work out what else changed since the previous build
+            if previous is None:
+                dirty_artists = set(tabs_by_artist)
+                removed: dict[str, SourceEntry] = {}
+            else:
+                removed = {
+                    key: entry
+                    for key, entry in previous.sources.items()
+                    if key not in manifest.sources
+                }
+                dirty_artists = {
+                    manifest.sources[key].artist_slug for key in dirty_keys
+                }
+                dirty_artists |= {entry.artist_slug for entry in removed.values()}
+                dirty_artists &= set(tabs_by_artist)
 
-        # Generate index page
-        self._render_index(tabs, tabs_by_artist)
-        result.pages_generated += 1
+            # Prune outputs that no remaining source feeds into
+            live_pages = manifest.pages()
+            for entry in removed.values():
+                for page in entry.pages:
+                    if page not in live_pages:
+                        self._remove_page(page)
 
-        # Generate artist pages
-        for artist_slug, artist_tabs in tabs_by_artist.items():
-            self._render_artist_page(artist_slug, artist_tabs)
-            result.pages_generated += 1
+        site_changed = bool(dirty_keys or removed)
 
-        # Generate individual tab pages
-        tabs_output = self.output_dir / "tabs"
-        tabs_output.mkdir(exist_ok=True)
+        # Render the index in-process, then fan artist pages out
+        with self._phase("index render"):
+            if self.shard is not None:
+                # Merging the shards writes the index for the whole catalog
+                pass
+            elif site_changed:
+                index_job = ("index.html", "index", (summaries, tabs_by_artist))
+                self._record_pages(result, self._render_pages([index_job]))
+            else:
+                result.pages_skipped += 1
 
-        for tab in tabs:
-            self._render_tab_page(tab)
-            result.pages_generated += 1
+        with self._phase("artist render"):
+            jobs: list[RenderJob] = []
+            for artist_slug, artist_tabs in tabs_by_artist.items():
+                if artist_slug in dirty_artists:
+                    page = self._artist_page_path(artist_slug)
+                    jobs.append((page, "artist", (artist_slug, artist_tabs)))
+                else:
+                    result.pages_skipped += 1
+            self._record_pages(result, self._render_pages(jobs))
 
         # Generate search index
-        search_index_path = self.output_dir / "search-index.json"
-        result.search_index_size = generate_search_index(
-            tabs, search_index_path, self.base_url
+        with self._phase("search index"):
+            search_index_path = self.output_dir / "search-index.json"
+            # Watch updates leave the full-text indexes uncompressed
+            compressed = sibling(self.output_dir / LYRICS_INDEX_NAME, ".gz")
+            if site_changed or not (search_index_path.exists() and compressed.exists()):
+                result.search_index_size = self._write_search_index(summaries, fulltext)
+            else:
+                result.search_index_size = len(summaries)
+            self._measure_search_index(result)
+
+        with self._phase("manifest"):
+            self._save_manifest(manifest, result)
+            self._save_snapshot(snapshot, result)
+            if self.shard is not None:
+                self._save_shard(summaries)
+        self._tabs = {tab.source_path: tab for tab in summaries}
+        self._manifest = manifest
+        self._fulltext = fulltext
+
+    def merge(self, shard_dirs: list[Path]) -> BuildResult:
+        """Combine the outputs of a sharded build into the full site.
+
+        Each shard's pages and assets are copied in, and the home page, the
+        artist directory and the search indexes are written for the whole
+        catalog from the shards' metadata files and partial indexes, so no
+        tab is parsed again. Every shard of the build must be given, built
+        with the same options as this builder. Like a build, the merge is
+        staged and swapped into place; it writes no manifest, so the next
+        incremental build of the output is a full one.
+        """
+        result = BuildResult()
+        self._tabs = self._manifest = self._fulltext = None
+        writes = write_totals()
+        shards = self._load_shards(shard_dirs, result)
+        if not result.success:
+            return result
+
+        live = self.output_dir
+        self.output_dir = stage(live, clone=False)
+        set_stage((self.output_dir, live))
+        try:
+            self._merge(shards, result)
+        finally:
+            set_stage(None)
+            staging, self.output_dir = self.output_dir, live
+        if result.success:
+            replace_directory(staging, live)
+        else:
+            shutil.rmtree(staging)
+        self._count_writes(result, writes)
+        return result
+
+    def _load_shards(
+        self, shard_dirs: list[Path], result: BuildResult
+    ) -> list[tuple[Path, ShardMetadata]]:
+        """Load each shard's metadata, checking the shards make up one build."""
+        shards = []
+        for directory in shard_dirs:
+            metadata = ShardMetadata.load(
+                directory / SHARD_METADATA_NAME, self.content_dir
+            )
+            if metadata is None:
+                result.errors.append(f"{directory} is not a sharded build's output")
+            elif {**metadata.options, "shard": None} != self._output_options():
+                result.errors.append(f"{directory} was built with different options")
+            else:
+                shards.append((directory, metadata))
+        if not shards or result.errors:
+            return shards
+
+        count = shards[0][1].shard[1]
+        if sorted(metadata.shard for _, metadata in shards) != [
+            (index, count) for index in range(1, count + 1)
+        ]:
+            result.errors.append(f"Expected shards 1/{count} to {count}/{count}")
+        elif any(metadata.assets != shards[0][1].assets for _, metadata in shards):
+            result.errors.append("Shards were built from different static assets")
+        return shards
+
+    def _merge(
+        self, shards: list[tuple[Path, ShardMetadata]], result: BuildResult
+    ) -> None:
+        """Merge the shards into ``output_dir``, the staging directory."""
+        self.assets = shards[0][1].assets
+        copied: dict[Path, Path] = {}
+        for directory, _ in shards:
+            self._copy_shard(directory, copied, result)
+
+        # Ties sort in source order, as they do in an unsharded build
+        summaries = sorted(
+            (tab for _, metadata in shards for tab in metadata.tabs),
+            key=lambda tab: tab.source_path,
         )
+        summaries.sort(key=tab_sort_key)
+        if not summaries:
+            result.errors.append("No tabs found in any shard")
+            return
+        tabs_by_artist = group_by_artist(summaries)
+        index_job = ("index.html", "index", (summaries, tabs_by_artist))
+        self._record_pages(result, self._render_pages([index_job]))
+
+        try:
+            fulltext = merge_fulltext(shards)
+        except (OSError, ValueError, KeyError) as e:
+            result.errors.append(f"Failed to merge search indexes: {e}")
+            return
+        result.search_index_size = self._write_search_index(summaries, fulltext)
+        self._measure_search_index(result)
+
+    def _copy_shard(
+        self, directory: Path, copied: dict[Path, Path], result: BuildResult
+    ) -> None:
+        """Copy a shard's pages and assets, leaving out what the merge writes."""
+        for source in sorted(directory.rglob("*")):
+            relative = source.relative_to(directory)
+            top = relative.parts[0].removesuffix(".gz").removesuffix(".br")
+            if top in MERGED_NAMES or not source.is_file():
+                continue
+            data = source.read_bytes()
+            target = self.output_dir / relative
+            if relative in copied:
+                # Shared assets are the same in every shard
+                if target.read_bytes() != data:
+                    result.errors.append(
+                        f"{relative} differs between {copied[relative]} and {directory}"
+                    )
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+            write_file(target, data)
+            copied[relative] = directory
+
+    def update(self, changed: Iterable[Path]) -> BuildResult:
+        """Apply a batch of changed source paths to the last build in place.
+
+        Only the affected outputs are touched: an edited tab re-renders its
+        own page, its artist page and the search index (plus the index page
+        if its listing changed), and a template edit re-renders every page.
+        An asset edit re-renders every page too when it moves the asset to a
+        new fingerprinted name, and otherwise only rewrites the asset.
+        Falls back to an incremental build if nothing has been built yet.
+        """
+        if self._tabs is None or self._manifest is None:
+            return self.build(incremental=True)
+
+        result = BuildResult()
+        writes = write_totals()
+        tabs_dir = self.content_dir / "tabs"
+        changed = set(changed)
+
+        assets_moved = False
+        if any(path.is_relative_to(self.static_dir) for path in changed):
+            paths = self.assets
+            self._manifest.assets = self._build_assets(self._manifest.assets, result)
+            assets_moved = self.assets != paths
 
+        # Re-parse edited tabs, keeping the old version if the edit is broken
+        dirty: list[Tab] = []
+        removed: list[TabSummary] = []
+        listing_changed = False
+        for path in sorted(changed):
+            if path.suffix != ".md" or not path.is_relative_to(tabs_dir):
+                continue
+            old = self._tabs.get(path)
+            if not path.exists():
+                if old is not None:
+                    removed.append(self._tabs.pop(path))
+                    listing_changed = True
+                continue
+            try:
+                tab = parse_file(path)
+            except Exception as e:
+                result.errors.append(f"Failed to parse {path}: {e}")
+                continue
+            self._tabs[path] = tab.summary()
+            dirty.append(tab)
+            listing_changed |= old is None or _listing_key(old) != _listing_key(tab)
+
+        tabs = sorted(self._tabs.values(), key=tab_sort_key)
+        tabs_by_artist = group_by_artist(tabs)
+
+        for tab in removed:
+            del self._manifest.sources[self._source_key(tab)]
+            self._remove_page(self._tab_page_path(tab))
+            if tab.artist_slug not in tabs_by_artist:
+                self._remove_page(self._artist_page_path(tab.artist_slug))
+        for tab in dirty:
+            self._manifest.sources[self._source_key(tab)] = self._source_entry(tab)
+
+        templates_changed = any(
+            path.is_relative_to(self.templates_dir) for path in changed
+        )
+        if templates_changed:
+            self._manifest.templates = hash_tree(self.templates_dir)
+
+        jobs: Iterable[RenderJob]
+        if templates_changed or assets_moved:
+            jobs = [("index.html", "index", (tabs, tabs_by_artist))]
+            for artist_slug, artist_tabs in tabs_by_artist.items():
+                page = self._artist_page_path(artist_slug)
+                jobs.append((page, "artist", (artist_slug, artist_tabs)))
+            # Tab content is not kept between builds, so stream it back in
+            jobs = chain(
+                jobs,
+                (
+                    (self._tab_page_path(tab), "tab", (tab,))
+                    for tab in self.stream_tabs()
+                    if tab.source_path in self._tabs
+                ),
+            )
+        else:
+            jobs = []
+            if listing_changed:
+                jobs.append(("index.html", "index", (tabs, tabs_by_artist)))
+            artists = {tab.artist_slug for tab in dirty + removed}
+            for artist_slug in sorted(artists & tabs_by_artist.keys()):
+                page = self._artist_page_path(artist_slug)
+                artist_tabs = tabs_by_artist[artist_slug]
+                jobs.append((page, "artist", (artist_slug, artist_tabs)))
+            jobs.extend((self._tab_page_path(tab), "tab", (tab,)) for tab in dirty)
+
+        self._record_pages(result, self._render_pages(jobs))
+
+        result.search_index_size = len(tabs)
+        if dirty or removed:
+            self._update_fulltext(dirty, removed)
+            self._write_search_index(tabs, self._fulltext, fast=True)
+        self._measure_search_index(result)
+
+        self._save_manifest(self._manifest, result)
+        self._count_writes(result, writes)
         return result
 
-    def _render_index(
-        self, tabs: list[Tab], tabs_by_artist: dict[str, list[Tab]]
+    def _update_fulltext(self, dirty: list[Tab], removed: list[TabSummary]) -> None:
+        """Apply edited and deleted tabs to the full-text indexes in memory.
+
+        The indexes are kept from the last build, or read back from its
+        output if it did not build them, so tabs that did not change are
+        not read again.
+        """
+        assert self._tabs is not None
+        if self._fulltext is None:
+            self._fulltext = FullTextIndexer.read(self.output_dir)
+        if self._fulltext is None:
+            # Nothing usable to start from, so index every tab once
+            self._fulltext = FullTextIndexer()
+            for tab in self.stream_tabs():
+                self._fulltext.add(tab)
+            return
+        for summary in removed:
+            self._fulltext.remove(summary)
+        # New tabs go where a build would add them, in order of source path
+        paths = sorted(self._tabs)
+        for tab in dirty:
+            position = bisect.bisect_left(paths, tab.source_path)
+            self._fulltext.replace(tab, position)
+
+    def _output_options(self) -> dict[str, Any]:
+        """Build options that change every page when they change."""
+        return {
+            "base_url": self.base_url,
+            "search_shard_prefix": self.search_shard_prefix,
+            "compact_search": self.compact_search,
+            "page_size": self.page_size,
+            "optimize_assets": self.optimize_assets,
+            "shard": f"{self.shard[0]}/{self.shard[1]}" if self.shard else None,
+        }
+
+    def asset_url(self, name: str) -> str:
+        """URL of a static asset, by its path under the static directory."""
+        return f"{self.base_url}/static/{self.assets.get(name, name)}"
+
+    def _build_assets(
+        self, previous: dict[str, AssetEntry] | None, result: BuildResult
+    ) -> dict[str, AssetEntry]:
+        """Run the asset pipeline and point ``asset()`` at what it wrote."""
+        assets = build_assets(
+            self.static_dir,
+            self.output_dir / "static",
+            previous,
+            optimize=self.optimize_assets,
+        )
+        self.assets = assets.paths()
+        result.assets_written += assets.written
+        result.assets_skipped += assets.skipped
+        result.warnings.extend(assets.warnings)
+        return assets.entries
+
+    def _clear_pages(self) -> None:
+        """Delete every output except the static assets."""
+        for path in self.output_dir.iterdir():
+            if path.name == "static":
+                continue
+            if path.is_dir():
+                shutil.rmtree(path)
+            else:
+                path.unlink()
+
+    def _phase(self, name: str) -> AbstractContextManager[None]:
+        """Time a block as a build phase, if the build is being profiled."""
+        return self._profiler.phase(name) if self._profiler else nullcontext()
+
+    def _iterate(self, phase: str, items: Iterable[T]) -> Iterable[T]:
+        """Charge the time to produce each item to a phase, if profiling."""
+        return self._profiler.iterate(phase, items) if self._profiler else items
+
+    def _iter_tabs(self, cache: ParseCache | None) -> Iterator[Tab]:
+        """Parse every tab in this build's shard, recording parse times if profiling."""
+        paths, all_paths = self._source_paths()
+        return iter_tabs(
+            self.content_dir,
+            workers=self.jobs,
+            cache=cache,
+            record_time=self._profiler.record_parse if self._profiler else None,
+            paths=paths,
+            all_paths=all_paths,
+        )
+
+    def _source_paths(self) -> tuple[list[Path], list[Path]]:
+        """The tab sources in this build's shard, and those in every shard.
+
+        Sources come from the scan of the build in progress if there is
+        one. Every shard's sources are needed to evict parse cache entries,
+        since shards built one after another may share a cache.
+        """
+        all_paths = self._sources
+        if all_paths is None:
+            tabs_dir = self.content_dir / "tabs"
+            all_paths = sorted(tabs_dir.rglob("*.md")) if tabs_dir.is_dir() else []
+        if self.shard is None:
+            return all_paths, all_paths
+        return [path for path in all_paths if self._in_shard(path)], all_paths
+
+    def _in_shard(self, path: Path) -> bool:
+        """Whether a tab source belongs to the shard being built, if any.
+
+        A tab's artist slug is the name of its source's directory, so
+        sources are split between shards before any of them is parsed.
+        """
+        if self.shard is None:
+            return True
+        index, count = self.shard
+        return shard_of(path.parent.name, count) == index
+
+    def _scan_sources(
+        self,
+        previous: BuildManifest | None,
+        known: Snapshot | None,
+        result: BuildResult,
+    ) -> tuple[Snapshot, dict[Path, str]]:
+        """Scan the tab sources, returning the snapshot and reusable hashes.
+
+        The scan is diffed against the ``known`` snapshot from the previous
+        build. Sources it did not see change keep the hash recorded in the
+        ``previous`` manifest instead of being read and hashed again.
+        """
+        snapshot, delta = scan(self.content_dir / "tabs", known, ".md")
+        self._sources = snapshot.paths()
+        result.sources_added = len(delta.added)
+        result.sources_modified = len(delta.modified)
+        result.sources_deleted = len(delta.deleted)
+        if known is None or previous is None:
+            return snapshot, {}
+        changed = delta.changed()
+        digests = {}
+        for path in self._sources:
+            if not self._in_shard(path):
+                continue
+            entry = previous.sources.get(path.relative_to(self.content_dir).as_posix())
+            if entry is not None and path not in changed:
+                digests[path] = entry.hash
+        return snapshot, digests
+
+    def _finish(self, result: BuildResult) -> BuildResult:
+        """Attach the profile to a build's result, if it was profiled."""
+        if self._profiler is not None:
+            result.profile = self._profiler.finish()
+            self._profiler = None
+        return result
+
+    @staticmethod
+    def _count_writes(result: BuildResult, before: WriteStats) -> None:
+        """Record what was written and skipped since the ``before`` snapshot."""
+        writes = write_totals() - before
+        result.files_written = writes.files_written
+        result.bytes_written = writes.bytes_written
+        result.files_skipped = writes.files_skipped
+        result.bytes_skipped = writes.bytes_skipped
+
+    def _parse_cache(self) -> AbstractContextManager[ParseCache | None]:
+        """Open the parse cache, or a stand-in if caching is disabled."""
+        return ParseCache(self.cache_dir) if self.cache_dir else nullcontext()
+
+    def stream_tabs(self) -> Iterator[Tab]:
+        """Read every tab in the build with its content, one at a time.
+
+        Tabs go through the parse cache if there is one, and only a bounded
+        number are held in memory at once.
+        """
+        with self._parse_cache() as cache:
+            yield from self._iterate("parse", self._iter_tabs(cache))
+
+    def _write_search_index(
+        self,
+        tabs: list[TabSummary],
+        fulltext: FullTextIndexer | None = None,
+        fast: bool = False,
+    ) -> int:
+        """Write the search indexes, streaming tab content back in if needed.
+
+        ``fast`` is for watch updates: the search index siblings trade a
+        little size for speed, and the full-text indexes, which take longest
+        to compress, are left uncompressed until the next build.
+        """
+        if fulltext is None:
+            fulltext = FullTextIndexer()
+            for tab in self.stream_tabs():
+                fulltext.add(tab)
+        fulltext.write(self.output_dir, compress=not fast)
+        return generate_search_index(
+            tabs,
+            self.output_dir / "search-index.json",
+            self.base_url,
+            shard_prefix=self.search_shard_prefix,
+            compact=self.compact_search,
+            fast=fast,
+        )
+
+    def _measure_search_index(self, result: BuildResult) -> None:
+        """Record the search index's raw and precompressed sizes."""
+        sizes = search_index_sizes(self.output_dir / "search-index.json")
+        result.search_index_bytes = sizes.get("raw", 0)
+        result.search_index_gzip_bytes = sizes.get("gzip", 0)
+        result.search_index_brotli_bytes = sizes.get("br", 0)
+
+    def _save_manifest(self, manifest: BuildManifest, result: BuildResult) -> None:
+        manifest_path = self.output_dir / MANIFEST_NAME
+        if result.errors:
+            # Force the next incremental build to start from scratch
+            manifest_path.unlink(missing_ok=True)
+        else:
+            manifest.save(manifest_path)
+
+    def _save_shard(self, tabs: list[TabSummary]) -> None:
+        """Write the metadata a merge needs about the tabs in this shard."""
+        assert self.shard is not None
+        metadata = ShardMetadata(
+            shard=self.shard,
+            options=self._output_options(),
+            assets=self.assets,
+            tabs=sorted(tabs, key=lambda tab: tab.source_path),
+        )
+        metadata.save(self.output_dir / SHARD_METADATA_NAME, self.content_dir)
+
+    def _save_snapshot(self, snapshot: Snapshot, result: BuildResult) -> None:
+        snapshot_path = self.output_dir / SNAPSHOT_NAME
+        if result.errors:
+            snapshot_path.unlink(missing_ok=True)
+        else:
+            snapshot.save(snapshot_path)
+
+    def _source_entry(self, tab: TabSummary, digest: str | None = None) -> SourceEntry:
+        """Describe a tab's source hash and the pages it feeds into.
+
+        ``digest`` is the source's hash, if it is already known.
+        """
+        return SourceEntry(
+            hash=digest or hash_file(tab.source_path),
+            artist_slug=tab.artist_slug,
+            pages=[
+                self._tab_page_path(tab),
+                self._artist_page_path(tab.artist_slug),
+                "index.html",
+                "search-index.json",
+                LYRICS_INDEX_NAME,
+                CHORDS_INDEX_NAME,
+            ],
+        )
+
+    def warm_templates(self) -> list[str]:
+        """Compile every template ahead of rendering and return their names.
+
+        Compiled templates stay loaded in this builder's environment, and
+        with a ``cache_dir`` they are also written to the bytecode cache for
+        other processes and later builds to reuse.
+        """
+        names = self.env.list_templates(extensions=["html"])
+        for name in names:
+            self.env.get_template(name)
+        return names
+
+    def _worker_config(self) -> dict[str, Any]:
+        """Constructor arguments for a render worker's own builder."""
+        return {
+            "content_dir": self.content_dir,
+            "templates_dir": self.templates_dir,
+            "static_dir": self.static_dir,
+            "output_dir": self.output_dir,
+            "base_url": self.base_url,
+            "cache_dir": self.cache_dir,
+            "search_shard_prefix": self.search_shard_prefix,
+            "compact_search": self.compact_search,
+            "page_size": self.page_size,
+            "optimize_assets": self.optimize_assets,
+        }
+
+    def _record_pages(
+        self, result: BuildResult, outcomes: Iterable[RenderOutcome]
     ) -> None:
-        """Render the home page."""
-        template = self.env.get_template("index.html")
+        """Count rendered pages and collect render errors."""
+        for outcome in outcomes:
+            if outcome.error is None:
+                result.pages_generated += 1
+            else:
+                result.errors.append(outcome.error)
+            if self._profiler is not None:
+                self._profiler.record_render(outcome.page, outcome.seconds)
+
+    def _render_pages(self, jobs: Iterable[RenderJob]) -> list[RenderOutcome]:
+        """Render pages, returning the outcome of each job.
+
+        Jobs are consumed lazily, so they can be produced while tabs are
+        still being parsed. The index job always runs in this process; with
+        ``jobs > 1`` the remaining pages are sent in batches to worker
+        processes, each of which builds its own Jinja environment, loading
+        templates compiled here from the bytecode cache if there is one.
+        Only a few batches per worker are in flight at once, which bounds how
+        much tab content is held in memory.
+        """
+        if self.jobs == 1 or (
+            isinstance(jobs, list) and sum(job[1] != "index" for job in jobs) < 2
+        ):
+            return [self._run_render_job(job) for job in jobs]
+
+        # Workers then load compiled templates instead of compiling their own
+        self.warm_templates()
+        outcomes: list[RenderOutcome] = []
+        pending: deque[Future[WorkerBatch]] = deque()
+        remote = self._run_local_jobs(jobs, outcomes)
+
+        def collect() -> None:
+            batch, writes = pending.popleft().result()
+            outcomes.extend(batch)
+            add_writes(writes)
+
+        with ProcessPoolExecutor(
+            max_workers=self.jobs,
+            initializer=_init_render_worker,
+            initargs=(type(self), self._worker_config(), self.assets, current_stage()),
+        ) as pool:
+            while batch := list(islice(remote, RENDER_BATCH_SIZE)):
+                pending.append(pool.submit(_render_batch_in_worker, batch))
+                while len(pending) > 2 * self.jobs:
+                    collect()
+            while pending:
+                collect()
+        return outcomes
+
+    def _run_pipeline(
+        self,
+        cache: ParseCache | None,
+        previous: BuildManifest | None,
+        record: Callable[[Tab, str], bool],
+        result: BuildResult,
+    ) -> None:
+        """Parse, render and write every tab on the overlapped pipeline.
+
+        Sources are read and hashed on reader threads, so unchanged tabs are
+        known before they reach the pool; each worker parses a tab (or
+        rebuilds it from the parse cache) and renders its page if needed,
+        and writer threads write the pages while later tabs are rendered.
+        """
+        if not (self.content_dir / "tabs").exists():
+            return
+        paths, all_paths = self._source_paths()
+
+        def prepare(path: Path, job: SourceJob) -> SourceJob:
+            """Look the source up in the parse cache and the last manifest."""
+            if job.stat is None:
+                return job
+            cached = cache.get(path) if cache is not None else None
+            if cached is not None and cached.digest != job.digest:
+                cached = None
+            elif cached is not None and (cached.mtime_ns, cached.size) != (
+                job.stat.st_mtime_ns,
+                job.stat.st_size,
+            ):
+                cache.touch(path, job.stat)
+            key = path.relative_to(self.content_dir).as_posix()
+            return job._replace(
+                cached=cached, render=_changed(previous, key, job.digest)
+            )
 
+        def consume(job: SourceJob, processed: ProcessedSource) -> None:
+            """Record a processed source, in discovery order."""
+            if self._profiler is not None:
+                self._profiler.record_parse(job.path, processed.seconds)
+            if processed.source is None:
+                print(f"Warning: Failed to parse {job.path}: {processed.error}")
+                return
+            if cache is not None and job.cached is None and job.stat is not None:
+                cache.store(processed.source, job.stat)
+            record(processed.source.tab, processed.source.digest)
+            if processed.outcome is not None:
+                self._record_pages(result, [processed.outcome])
+
+        def write_failed(path: Path, error: Exception) -> None:
+            """Report a page that was rendered but could not be written."""
+            page = path.relative_to(self.output_dir).as_posix()
+            result.errors.append(f"Failed to write {page}: {error}")
+            result.pages_generated -= 1
+
+        # Workers then load compiled templates instead of compiling their own
+        self.warm_templates()
+        with ProcessPoolExecutor(
+            max_workers=self.jobs,
+            initializer=_init_render_worker,
+            initargs=(type(self), self._worker_config(), self.assets, current_stage()),
+        ) as pool:
+            pipeline = Pipeline(
+                pool,
+                self.jobs,
+                read=_read_source_job,
+                prepare=prepare,
+                process=_process_sources_in_worker,
+                consume=consume,
+                write=_write_output,
+                limits=self.pipeline,
+                write_failed=write_failed,
+            )
+            pipeline.run(lambda: paths)
+        if cache is not None:
+            cache.evict_missing(self.content_dir / "tabs", all_paths)
+
+    def _run_local_jobs(
+        self, jobs: Iterable[RenderJob], outcomes: list[RenderOutcome]
+    ) -> Iterator[RenderJob]:
+        """Run index jobs in-process as they come, passing the rest on."""
+        for job in jobs:
+            if job[1] == "index":
+                outcomes.append(self._run_render_job(job))
+            else:
+                yield job
+
+    def _run_render_job(self, job: RenderJob) -> RenderOutcome:
+        """Render a single page, catching and reporting any failure."""
+        page, kind, args = job
+        render = {
+            "index": self._render_index,
+            "artist": self._render_artist_page,
+            "tab": self._render_tab_page,
+        }[kind]
+        start = time.perf_counter()
+        error = None
+        try:
+            render(*args)
+        except Exception as e:
+            error = f"Failed to render {page}: {e}"
+        return RenderOutcome(page, error, time.perf_counter() - start)
+
+    def _source_key(self, tab: TabSummary) -> str:
+        """Return the manifest key for a tab's source file."""
+        return tab.source_path.relative_to(self.content_dir).as_posix()
+
+    @staticmethod
+    def _tab_page_path(tab: TabSummary) -> str:
+        return f"tabs/{tab.artist_slug}/{tab.slug}.html"
+
+    @staticmethod
+    def _artist_page_path(artist_slug: str) -> str:
+        return f"artist/{artist_slug}.html"
+
+    def _write_page(self, page: str, html: str) -> None:
+        """Write a rendered page relative to the output directory."""
+        path = self.output_dir / page
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_file(path, html.encode())
+
+    def _remove_page(self, page: str) -> None:
+        """Delete an output page, its continuation pages and emptied parents."""
+        path = self.output_dir / page
+        path.unlink(missing_ok=True)
+        for stale in stale_pages(self.output_dir, page, 0):
+            stale.unlink()
+        with suppress(OSError):
+            path.with_suffix("").rmdir()
+        # rmdir refuses directories that still hold other pages
+        for parent in path.relative_to(self.output_dir).parents[:-1]:
+            try:
+                (self.output_dir / parent).rmdir()
+            except OSError:
+                break
+
+    def _write_listing(self, listing: Listing) -> None:
+        """Render every page of a listing, dropping pages it no longer has."""
+        for page in listing.pages:
+            self._write_page(page.path, self.render_listing_page(listing, page))
+        pages = listing.pages
+        for path in stale_pages(self.output_dir, pages[0].first, len(pages)):
+            path.unlink()
+
+    def render_listing_page(self, listing: Listing, page: Page) -> str:
+        """Render one page of a listing."""
+        template = self.env.get_template(listing.template)
+        return template.render(page=page, **listing.context)
+
+    def index_listings(
+        self, tabs: list[TabSummary], tabs_by_artist: dict[str, list[TabSummary]]
+    ) -> list[Listing]:
+        """The home page and the artist directory.
+
+        Only the first page of tabs and of artists is on the home page, so
+        its size does not grow with the catalog.
+        """
         # Get unique artists with their display names
         artists = [
-            {"slug": slug, "name": artist_tabs[0].metadata.artist, "count": len(artist_tabs)}
+            {
+                "slug": slug,
+                "name": artist_tabs[0].metadata.artist,
+                "count": len(artist_tabs),
+            }
             for slug, artist_tabs in sorted(tabs_by_artist.items())
         ]
+        artist_pages = paginate(artists, "artists.html", self.page_size)
 
         # Get featured tabs
         featured_tabs = [tab for tab in tabs if tab.metadata.featured]
+        featured_tabs = featured_tabs[: self.page_size or None]
 
-        html = template.render(
-            tabs=tabs,
-            artists=artists,
-            featured_tabs=featured_tabs,
-            total_tabs=len(tabs),
-        )
-        (self.output_dir / "index.html").write_text(html)
+        return [
+            Listing(
+                "index.html",
+                paginate(tabs, "index.html", self.page_size),
+                {
+                    "artists": artist_pages[0].items,
+                    "total_artists": len(artists),
+                    "featured_tabs": featured_tabs,
+                    "total_tabs": len(tabs),
+                },
+            ),
+            Listing("artists.html", artist_pages, {"total_artists": len(artists)}),
+        ]
 
-    def _render_artist_page(self, artist_slug: str, tabs: list[Tab]) -> None:
-        """Render an artist's tab listing page."""
-        template = self.env.get_template("artist.html")
+    def artist_listing(self, artist_slug: str, tabs: list[TabSummary]) -> Listing:
+        """An artist's tabs, one page per ``page_size`` tabs."""
+        return Listing(
+            "artist.html",
+            paginate(tabs, self._artist_page_path(artist_slug), self.page_size),
+            {
+                "artist_name": tabs[0].metadata.artist,
+                "artist_slug": artist_slug,
+                "total_tabs": len(tabs),
+            },
+        )
 
-        html = template.render(
-            artist_name=tabs[0].metadata.artist,
-            artist_slug=artist_slug,
-            tabs=tabs,
+    def render_tab(self, tab: Tab) -> str:
+        """Render a single tab page."""
+        template = self.env.get_template("tab.html")
+        return template.render(
+            tab=tab,
+            sections=tab.sections,
+            lines=tab.lines.items(tab.content),
+            transpose=transpose_tab(tab.content, tab.lines, tab.metadata.key),
         )
 
-        artist_dir = self.output_dir / "artist"
-        artist_dir.mkdir(exist_ok=True)
-        (artist_dir / f"{artist_slug}.html").write_text(html)
+    def _render_index(
+        self, tabs: list[TabSummary], tabs_by_artist: dict[str, list[TabSummary]]
+    ) -> None:
+        """Render the home page, the artist directory and their later pages."""
+        for listing in self.index_listings(tabs, tabs_by_artist):
+            self._write_listing(listing)
+
+    def _render_artist_page(self, artist_slug: str, tabs: list[TabSummary]) -> None:
+        """Render an artist's tab listing pages."""
+        self._write_listing(self.artist_listing(artist_slug, tabs))
 
     def _render_tab_page(self, tab: Tab) -> None:
-        """Render a single tab page."""
-        template = self.env.get_template("tab.html")
+        """Render and write a single tab page."""
+        self._write_page(self._tab_page_path(tab), self.render_tab(tab))
 
-        sections = extract_sections(tab.content)
 
-        html = template.render(
-            tab=tab,
-            sections=sections,
-        )
+# Per-process builder used by render workers
+_worker_builder: SiteBuilder | None = None
+
+
+def _init_render_worker(
+    cls: type[SiteBuilder],
+    config: dict[str, Any],
+    assets: dict[str, str],
+    stage: tuple[Path, Path] | None,
+) -> None:
+    """Give each render worker its own builder and Jinja environment."""
+    global _worker_builder
+    _worker_builder = cls(**config)
+    _worker_builder.assets = assets
+    set_stage(stage)
+
+
+def _read_source_job(path: Path) -> SourceJob:
+    """Read and hash a tab source for the pipeline."""
+    try:
+        stat = path.stat()
+        data = path.read_bytes()
+    except OSError as e:
+        return SourceJob(path, None, error=str(e))
+    return SourceJob(path, data, hash_bytes(data), stat)
+
+
+def _process_sources_in_worker(
+    jobs: list[SourceJob],
+) -> list[tuple[ProcessedSource, list[Output]]]:
+    """Process a batch of sources on a pipeline worker."""
+    return [_process_source(job) for job in jobs]
+
+
+def _process_source(job: SourceJob) -> tuple[ProcessedSource, list[Output]]:
+    """Parse a source and render its page if it changed."""
+    assert _worker_builder is not None
+    if job.data is None:
+        return ProcessedSource(None, job.error, 0.0), []
+    start = time.perf_counter()
+    try:
+        if job.cached is not None:
+            tab = cached_tab(job.path, job.cached, decode_source(job.data))
+            source = ParsedSource(tab, job.digest, job.cached.content_offset)
+        else:
+            source = parse_source(job.path, job.data)
+    except Exception as e:
+        return ProcessedSource(None, str(e), time.perf_counter() - start), []
+    seconds = time.perf_counter() - start
+    if not job.render:
+        return ProcessedSource(source, None, seconds), []
+
+    page = _worker_builder._tab_page_path(source.tab)
+    outputs: list[Output] = []
+    error = None
+    start = time.perf_counter()
+    try:
+        html = _worker_builder.render_tab(source.tab)
+        outputs.append((_worker_builder.output_dir / page, html.encode()))
+    except Exception as e:
+        error = f"Failed to render {page}: {e}"
+    outcome = RenderOutcome(page, error, time.perf_counter() - start)
+    return ProcessedSource(source, None, seconds, outcome), outputs
+
+
+def _write_output(path: Path, data: bytes) -> None:
+    """Write a pipelined page, on a writer thread."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_file(path, data)
+
 
-        # Create artist subdirectory
-        tab_dir = self.output_dir / "tabs" / tab.artist_slug
-        tab_dir.mkdir(parents=True, exist_ok=True)
-        (tab_dir / f"{tab.slug}.html").write_text(html)
+def _render_batch_in_worker(jobs: list[RenderJob]) -> WorkerBatch:
+    """Render a batch, returning its outcomes and what the worker wrote."""
+    assert _worker_builder is not None
+    before = write_totals()
+    outcomes = [_worker_builder._run_render_job(job) for job in jobs]
+    return outcomes, write_totals() - before
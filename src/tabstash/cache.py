@@ -0,0 +1,190 @@
+"""Persistent on-disk caches of parsed tab files and compiled templates."""
+
+import hashlib
+import json
+import os
+import sqlite3
+from array import array
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from jinja2 import FileSystemBytecodeCache
+
+from . import __version__
+from .models import Metadata, TabLines, TabMetadata
+
+if TYPE_CHECKING:
+    from .parser import ParsedSource
+
+CACHE_DIR_NAME = ".tabstash-cache"
+PARSE_CACHE_NAME = "parse-cache.sqlite"
+TEMPLATE_CACHE_NAME = "jinja"
+
+# Bump when the layout of cached rows changes
+CACHE_FORMAT_VERSION = 2
+
+
+def schema_fingerprint() -> str:
+    """Fingerprint of everything that makes cached parse results stale.
+
+    Cached metadata is rebuilt without validation, so any change to the
+    ``TabMetadata`` schema (or to TabStash itself) invalidates the cache.
+    So does any change to how lines are classified, since their kinds are
+    cached too.
+    """
+    # The parser imports this module, so it is only imported once needed
+    from .parser import LINE_KINDS_VERSION, LINE_PATTERNS
+
+    schema = json.dumps(TabMetadata.model_json_schema(), sort_keys=True)
+    patterns = json.dumps([pattern.pattern for pattern in LINE_PATTERNS])
+    key = (
+        f"{CACHE_FORMAT_VERSION}:{__version__}:{schema}:{LINE_KINDS_VERSION}:{patterns}"
+    )
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def template_cache(cache_dir: Path) -> FileSystemBytecodeCache:
+    """Jinja bytecode cache kept under the project cache directory.
+
+    Jinja checks each cached template against a hash of its source and its
+    own version, so edited templates are simply recompiled. Builds, render
+    workers and the watch server all share the same files.
+    """
+    directory = cache_dir / TEMPLATE_CACHE_NAME
+    directory.mkdir(parents=True, exist_ok=True)
+    return FileSystemBytecodeCache(str(directory))
+
+
+@dataclass
+class CacheEntry:
+    """Cached parse result for one source file."""
+
+    mtime_ns: int
+    size: int
+    digest: str
+    metadata: Metadata
+    content_offset: int
+    lines: TabLines
+
+
+class ParseCache:
+    """SQLite-backed cache of validated tab metadata and line structure.
+
+    Entries are keyed by source path and carry the file's mtime, size and
+    content hash. The tab body itself is not stored; it is re-read from the
+    source file starting at the cached content offset.
+    """
+
+    def __init__(self, cache_dir: Path):
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        self.path = cache_dir / PARSE_CACHE_NAME
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+            """
+        )
+        fingerprint = schema_fingerprint()
+        row = self.conn.execute(
+            "SELECT value FROM meta WHERE key = 'schema'"
+        ).fetchone()
+        if row is None or row[0] != fingerprint:
+            # Stale rows may also have an older column layout
+            self.conn.execute("DROP TABLE IF EXISTS tabs")
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('schema', ?)",
+                (fingerprint,),
+            )
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS tabs (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                digest TEXT NOT NULL,
+                metadata TEXT NOT NULL,
+                content_offset INTEGER NOT NULL,
+                sections TEXT NOT NULL,
+                line_kinds BLOB NOT NULL,
+                line_bounds BLOB NOT NULL
+            )
+            """
+        )
+        self.conn.commit()
+
+    def __enter__(self) -> "ParseCache":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Commit pending writes and close the database."""
+        self.conn.commit()
+        self.conn.close()
+
+    def get(self, path: Path) -> CacheEntry | None:
+        """Return the cached entry for a source path, if any."""
+        row = self.conn.execute(
+            "SELECT mtime_ns, size, digest, metadata, content_offset, sections,"
+            " line_kinds, line_bounds FROM tabs WHERE path = ?",
+            (str(path),),
+        ).fetchone()
+        if row is None:
+            return None
+        mtime_ns, size, digest, metadata, content_offset, sections, kinds, bounds = row
+        return CacheEntry(
+            mtime_ns=mtime_ns,
+            size=size,
+            digest=digest,
+            # Validated when it was stored
+            metadata=Metadata(**json.loads(metadata)),
+            content_offset=content_offset,
+            lines=TabLines(kinds, array("I", bounds), json.loads(sections)),
+        )
+
+    def store(self, source: "ParsedSource", stat: os.stat_result) -> None:
+        """Record a fresh parse result."""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO tabs"
+            " (path, mtime_ns, size, digest, metadata, content_offset, sections,"
+            " line_kinds, line_bounds)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                str(source.tab.source_path),
+                stat.st_mtime_ns,
+                stat.st_size,
+                source.digest,
+                json.dumps(asdict(source.tab.metadata)),
+                source.content_offset,
+                json.dumps(source.tab.lines.sections),
+                source.tab.lines.kinds,
+                source.tab.lines.bounds.tobytes(),
+            ),
+        )
+
+    def touch(self, path: Path, stat: os.stat_result) -> None:
+        """Update the recorded stat of a file whose content is unchanged."""
+        self.conn.execute(
+            "UPDATE tabs SET mtime_ns = ?, size = ? WHERE path = ?",
+            (stat.st_mtime_ns, stat.st_size, str(path)),
+        )
+
+    def evict_missing(self, root: Path, live_paths: list[Path]) -> int:
+        """Drop entries under ``root`` whose files no longer exist.
+
+        Returns the number of evicted entries.
+        """
+        live = {str(path) for path in live_paths}
+        prefix = str(root) + os.sep
+        stale = [
+            (path,)
+            for (path,) in self.conn.execute("SELECT path FROM tabs")
+            if path.startswith(prefix) and path not in live
+        ]
+        self.conn.executemany("DELETE FROM tabs WHERE path = ?", stale)
+        return len(stale)
@@ -1,13 +1,20 @@
 """Command-line interface for TabStash."""
 
-import http.server
-import os
-import socketserver
+import cProfile
+import threading
+import time
 from pathlib import Path
 
 import click
 
-from .builder import SiteBuilder
+from .builder import DEFAULT_PAGE_SIZE, SiteBuilder
+from .cache import CACHE_DIR_NAME
+from .live import LiveServer, LiveSite
+from .pipeline import DEFAULT_READERS, DEFAULT_WRITERS, StageLimits
+from .profiling import DEFAULT_PROFILE_NAME, BuildProfile
+from .server import DEFAULT_CACHE_BYTES, FileCache, SiteServer
+from .shard import parse_shard
+from .watch import Watcher
 
 
 def get_project_root() -> Path:
@@ -15,6 +22,18 @@ def get_project_root() -> Path:
     return Path.cwd()
 
 
+def _shard_option(
+    ctx: click.Context, param: click.Parameter, value: str | None
+) -> tuple[int, int] | None:
+    """Turn ``--shard K/N`` into ``(K, N)``."""
+    if value is None:
+        return None
+    try:
+        return parse_shard(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e)) from None
+
+
 @click.group()
 def main():
     """TabStash - Static guitar tab site generator."""
@@ -40,7 +59,98 @@ def main():
     default="",
     help="Base URL path for GitHub Pages subpath hosting (e.g., /tabstash)",
 )
-def build(content: str, output: str, base_url: str):
+@click.option(
+    "--incremental",
+    "-i",
+    is_flag=True,
+    help="Only rebuild pages whose sources changed since the last build",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    default=1,
+    type=click.IntRange(min=1),
+    help="Number of worker processes to use",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    help=f"Re-parse every tab and template instead of reusing {CACHE_DIR_NAME}/",
+)
+@click.option(
+    "--search-shards",
+    default=0,
+    type=click.IntRange(min=0),
+    help="Shard the search index by this many leading term characters (0 = off)",
+)
+@click.option(
+    "--compact-search",
+    is_flag=True,
+    help="Write the search index in the smaller columnar layout",
+)
+@click.option(
+    "--page-size",
+    default=DEFAULT_PAGE_SIZE,
+    type=click.IntRange(min=0),
+    help="Tabs or artists per index and artist page (0 = no pagination)",
+)
+@click.option(
+    "--pipeline",
+    is_flag=True,
+    help="Overlap reading, parsing, rendering and writing of tab pages",
+)
+@click.option(
+    "--readers",
+    default=DEFAULT_READERS,
+    type=click.IntRange(min=1),
+    help="Files read at once (with --pipeline)",
+)
+@click.option(
+    "--writers",
+    default=DEFAULT_WRITERS,
+    type=click.IntRange(min=1),
+    help="Pages written at once (with --pipeline)",
+)
+@click.option(
+    "--shard",
+    default=None,
+    callback=_shard_option,
+    help="Build only shard K/N of the tabs, split by artist (see merge)",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Report time per build phase, the slowest files and resource use",
+)
+@click.option(
+    "--profile-output",
+    default=DEFAULT_PROFILE_NAME,
+    help="Where --profile writes its JSON report",
+)
+@click.option(
+    "--cprofile",
+    "cprofile_path",
+    default=None,
+    help="Write cProfile stats for the build (this process only) to this file",
+)
+def build(
+    content: str,
+    output: str,
+    base_url: str,
+    incremental: bool,
+    jobs: int,
+    no_cache: bool,
+    search_shards: int,
+    compact_search: bool,
+    page_size: int,
+    pipeline: bool,
+    readers: int,
+    writers: int,
+    shard: tuple[int, int] | None,
+    profile: bool,
+    profile_output: str,
+    cprofile_path: str | None,
+):
     """Build the static site."""
     root = get_project_root()
 
@@ -50,13 +160,54 @@ def build(content: str, output: str, base_url: str):
         static_dir=root / "static",
         output_dir=root / output,
         base_url=base_url,
+        jobs=jobs,
+        cache_dir=None if no_cache else root / CACHE_DIR_NAME,
+        search_shard_prefix=search_shards,
+        compact_search=compact_search,
+        page_size=page_size,
+        pipeline=StageLimits(readers, writers) if pipeline else None,
+        shard=shard,
     )
 
-    result = builder.build()
+    profiler = cProfile.Profile() if cprofile_path else None
+    if profiler is not None:
+        profiler.enable()
+    result = builder.build(incremental=incremental, profile=profile)
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(root / cprofile_path)
+        click.echo(f"cProfile stats: {root / cprofile_path}")
+    if result.profile is not None:
+        _echo_profile(result.profile)
+        result.profile.write(root / profile_output)
+        click.echo(f"Profile report: {root / profile_output}")
 
+    for warning in result.warnings:
+        click.echo(f"Warning: {warning}", err=True)
     if result.success:
         click.echo(f"Built {result.pages_generated} pages")
+        if result.pages_skipped:
+            click.echo(f"Skipped {result.pages_skipped} unchanged pages")
+        if incremental:
+            click.echo(
+                f"Sources: {result.sources_added} added,"
+                f" {result.sources_modified} modified,"
+                f" {result.sources_deleted} deleted"
+            )
         click.echo(f"Search index: {result.search_index_size} documents")
+        sizes = f"{result.search_index_bytes:,} bytes"
+        sizes += f", {result.search_index_gzip_bytes:,} gzip"
+        if result.search_index_brotli_bytes:
+            sizes += f", {result.search_index_brotli_bytes:,} brotli"
+        click.echo(f"Search index size: {sizes}")
+        click.echo(
+            f"Assets: {result.assets_written} written,"
+            f" {result.assets_skipped} unchanged"
+        )
+        click.echo(
+            f"Files: {result.files_written} written ({result.bytes_written:,} bytes),"
+            f" {result.files_skipped} unchanged ({result.bytes_skipped:,} bytes)"
+        )
         click.echo(f"Output: {root / output}")
     else:
         for error in result.errors:
@@ -64,6 +215,123 @@ def build(content: str, output: str, base_url: str):
         raise SystemExit(1)
 
 
+@main.command()
+@click.argument("shards", nargs=-1, required=True)
+@click.option(
+    "--content",
+    "-c",
+    default="content",
+    help="Content directory the shards were built from",
+)
+@click.option(
+    "--output",
+    "-o",
+    default="dist",
+    help="Output directory for the merged site",
+)
+@click.option(
+    "--base-url",
+    "-b",
+    default="",
+    help="Base URL path the shards were built with",
+)
+@click.option(
+    "--search-shards",
+    default=0,
+    type=click.IntRange(min=0),
+    help="Search index sharding the shards were built with",
+)
+@click.option(
+    "--compact-search",
+    is_flag=True,
+    help="Whether the shards were built with --compact-search",
+)
+@click.option(
+    "--page-size",
+    default=DEFAULT_PAGE_SIZE,
+    type=click.IntRange(min=0),
+    help="Page size the shards were built with",
+)
+def merge(
+    shards: tuple[str, ...],
+    content: str,
+    output: str,
+    base_url: str,
+    search_shards: int,
+    compact_search: bool,
+    page_size: int,
+):
+    """Merge the outputs of build --shard K/N into one site."""
+    root = get_project_root()
+    builder = SiteBuilder(
+        content_dir=root / content,
+        templates_dir=root / "templates",
+        static_dir=root / "static",
+        output_dir=root / output,
+        base_url=base_url,
+        search_shard_prefix=search_shards,
+        compact_search=compact_search,
+        page_size=page_size,
+    )
+    result = builder.merge([root / shard for shard in shards])
+    if result.success:
+        click.echo(f"Merged {len(shards)} shards")
+        click.echo(f"Built {result.pages_generated} pages")
+        click.echo(f"Search index: {result.search_index_size} documents")
+        click.echo(
+            f"Files: {result.files_written} written ({result.bytes_written:,} bytes),"
+            f" {result.files_skipped} unchanged ({result.bytes_skipped:,} bytes)"
+        )
+        click.echo(f"Output: {root / output}")
+    else:
+        for error in result.errors:
+            click.echo(f"Error: {error}", err=True)
+        raise SystemExit(1)
+
+
+def _echo_profile(profile: BuildProfile) -> None:
+    """Print a build profile as a table of phases and the slowest files."""
+    click.echo(f"{'phase':<16} {'wall':>9} {'cpu':>9}")
+    for name, timing in sorted(
+        profile.phases.items(), key=lambda item: -item[1].wall_seconds
+    ):
+        click.echo(
+            f"{name:<16} {timing.wall_seconds:>8.3f}s {timing.cpu_seconds:>8.3f}s"
+        )
+    click.echo(
+        f"{'total':<16} {profile.wall_seconds:>8.3f}s {profile.cpu_seconds:>8.3f}s"
+        f" (+{profile.worker_cpu_seconds:.3f}s in workers)"
+    )
+    for title, timings in (
+        ("Slowest parses", profile.slowest_parses),
+        ("Slowest renders", profile.slowest_renders),
+    ):
+        if timings:
+            click.echo(f"{title}:")
+        for timing in timings[:5]:
+            click.echo(f"  {timing.seconds * 1000:>8.2f} ms  {timing.path}")
+    click.echo(
+        f"Wrote {profile.files_written:,} files, {profile.bytes_written:,} bytes"
+        f" ({profile.bytes_skipped:,} unchanged);"
+        f" peak RSS {profile.peak_rss_bytes / 2**20:.0f} MB"
+    )
+
+
+@main.command()
+def warm():
+    """Compile templates into the cache ahead of a build."""
+    root = get_project_root()
+    builder = SiteBuilder(
+        content_dir=root / "content",
+        templates_dir=root / "templates",
+        static_dir=root / "static",
+        output_dir=root / "dist",
+        cache_dir=root / CACHE_DIR_NAME,
+    )
+    names = builder.warm_templates()
+    click.echo(f"Compiled {len(names)} templates into {CACHE_DIR_NAME}/")
+
+
 @main.command()
 @click.option(
     "--port",
@@ -71,33 +339,147 @@ def build(content: str, output: str, base_url: str):
     default=8000,
     help="Port to serve on",
 )
+@click.option(
+    "--host",
+    default="",
+    help="Address to bind to (default: all interfaces)",
+)
 @click.option(
     "--output",
     "-o",
     default="dist",
     help="Directory to serve",
 )
-def serve(port: int, output: str):
-    """Start a local development server."""
+@click.option(
+    "--cache-size",
+    default=DEFAULT_CACHE_BYTES // 2**20,
+    type=click.IntRange(min=0),
+    help="Megabytes of file contents to keep in memory",
+)
+@click.option(
+    "--quiet",
+    "-q",
+    is_flag=True,
+    help="Don't log each request",
+)
+@click.option(
+    "--watch",
+    "-w",
+    is_flag=True,
+    help="Rebuild affected pages when content, templates or static files change",
+)
+@click.option(
+    "--live",
+    is_flag=True,
+    help="Render pages from content on request instead of serving a build",
+)
+@click.option(
+    "--content",
+    "-c",
+    default="content",
+    help="Content directory to watch or render (with --watch or --live)",
+)
+@click.option(
+    "--base-url",
+    "-b",
+    default="",
+    help="Base URL path to build with (with --watch or --live)",
+)
+def serve(
+    port: int,
+    host: str,
+    output: str,
+    cache_size: int,
+    quiet: bool,
+    watch: bool,
+    live: bool,
+    content: str,
+    base_url: str,
+):
+    """Serve the built site.
+
+    Requests are handled on their own threads, with precompressed files,
+    conditional requests, byte ranges and cache headers, so this can sit
+    behind a load balancer as well as serve local previews. With --live,
+    nothing is built: pages are rendered from content as they are requested.
+    """
     root = get_project_root()
     serve_dir = root / output
 
+    if live:
+        site = LiveSite(
+            SiteBuilder(
+                content_dir=root / content,
+                templates_dir=root / "templates",
+                static_dir=root / "static",
+                output_dir=serve_dir,
+                base_url=base_url,
+                cache_dir=root / CACHE_DIR_NAME,
+                optimize_assets=False,
+            )
+        )
+        with LiveServer((host, port), site, quiet=quiet) as httpd:
+            click.echo(f"Rendering live at http://{host or 'localhost'}:{port}")
+            click.echo("Press Ctrl+C to stop")
+            try:
+                httpd.serve_forever()
+            except KeyboardInterrupt:
+                click.echo("\nStopped")
+        return
+
+    builder = None
+    if watch:
+        builder = SiteBuilder(
+            content_dir=root / content,
+            templates_dir=root / "templates",
+            static_dir=root / "static",
+            output_dir=serve_dir,
+            base_url=base_url,
+            cache_dir=root / CACHE_DIR_NAME,
+            # Plain asset names, so an edited stylesheet doesn't re-render
+            # every page
+            optimize_assets=False,
+        )
+        result = builder.build(incremental=True)
+        for error in result.errors:
+            click.echo(f"Error: {error}", err=True)
+        click.echo(f"Built {result.pages_generated} pages")
+
     if not serve_dir.exists():
         click.echo(f"Error: {serve_dir} does not exist. Run 'tabstash build' first.", err=True)
         raise SystemExit(1)
 
-    os.chdir(serve_dir)
-
-    handler = http.server.SimpleHTTPRequestHandler
-
-    with socketserver.TCPServer(("", port), handler) as httpd:
-        click.echo(f"Serving at http://localhost:{port}")
+    cache = FileCache(cache_size * 2**20)
+    with SiteServer((host, port), serve_dir, cache, quiet=quiet) as httpd:
+        click.echo(f"Serving at http://{host or 'localhost'}:{port}")
         click.echo("Press Ctrl+C to stop")
         try:
-            httpd.serve_forever()
+            if builder is None:
+                httpd.serve_forever()
+            else:
+                threading.Thread(target=httpd.serve_forever, daemon=True).start()
+                _watch_and_rebuild(builder)
         except KeyboardInterrupt:
             click.echo("\nStopped")
 
 
+def _watch_and_rebuild(builder: SiteBuilder) -> None:
+    """Apply targeted rebuilds for every burst of source changes."""
+    watcher = Watcher([builder.content_dir, builder.templates_dir, builder.static_dir])
+    click.echo("Watching for changes...")
+    for changed in watcher.changes():
+        start = time.perf_counter()
+        result = builder.update(changed)
+        elapsed = (time.perf_counter() - start) * 1000
+        for warning in result.warnings:
+            click.echo(f"Warning: {warning}", err=True)
+        for error in result.errors:
+            click.echo(f"Error: {error}", err=True)
+        click.echo(
+            f"{len(changed)} changed, rebuilt {result.pages_generated} pages"
+            f" in {elapsed:.0f} ms"
+        )
+
+
 if __name__ == "__main__":
     main()
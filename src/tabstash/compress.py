@@ -0,0 +1,47 @@
+"""Precompressed ``.gz``/``.br`` siblings for generated files."""
+
+import gzip
+from pathlib import Path
+
+from .output import write_file
+
+try:
+    import brotli
+except ImportError:  # optional: pip install tabstash[compress]
+    brotli = None
+
+COMPRESSED_SUFFIXES = {".gz": "gzip", ".br": "br"}
+
+
+def sibling(path: Path, suffix: str) -> Path:
+    """Return the compressed sibling of a file, e.g. ``app.js.gz``."""
+    return path.with_name(path.name + suffix)
+
+
+def write_compressed(
+    path: Path, data: bytes | None = None, *, fast: bool = False
+) -> None:
+    """Write gzip and (when available) brotli siblings next to ``path``.
+
+    Output is deterministic, so unchanged inputs give byte-identical files.
+    ``fast`` gives up a few percent of size for much quicker compression,
+    which matters for multi-megabyte files that are fetched lazily.
+    """
+    if data is None:
+        data = path.read_bytes()
+    level, quality = (6, 9) if fast else (9, 11)
+    write_file(sibling(path, ".gz"), gzip.compress(data, compresslevel=level, mtime=0))
+    if brotli is not None:
+        write_file(sibling(path, ".br"), brotli.compress(data, quality=quality))
+    else:
+        sibling(path, ".br").unlink(missing_ok=True)
+
+
+def compressed_sizes(path: Path) -> dict[str, int]:
+    """Sizes of a file and its compressed siblings that exist on disk."""
+    sizes = {"raw": path.stat().st_size}
+    for suffix, encoding in COMPRESSED_SUFFIXES.items():
+        compressed = sibling(path, suffix)
+        if compressed.exists():
+            sizes[encoding] = compressed.stat().st_size
+    return sizes
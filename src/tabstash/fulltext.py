@@ -0,0 +1,360 @@
+"""Full-text lyric and chord-sequence indexes over tab content."""
+
+import json
+import re
+from collections.abc import Iterator
+from itertools import accumulate
+from pathlib import Path
+from typing import Any
+
+from .compress import COMPRESSED_SUFFIXES, sibling, write_compressed
+from .models import LineKind, Tab, TabLines, TabSummary
+from .output import write_file
+from .parser import chord_token, tokenize_lines
+from .search import process_term, tokenize
+
+INLINE_CHORD_PATTERN = re.compile(r"\[([^\]\s]+)\]")
+
+FULLTEXT_FORMAT = "tabstash-fulltext-1"
+LYRICS_INDEX_NAME = "lyrics-index.json"
+CHORDS_INDEX_NAME = "chords-index.json"
+
+
+def split_chords_and_lyrics(
+    content: str, lines: TabLines | None = None
+) -> tuple[list[str], list[str]]:
+    """Split tab content into its chord sequence and its lyric words.
+
+    Chord lines contribute every chord in order, inline ``[Am]`` chords in
+    lyric lines count as chords, and section headers and tab-staff lines are
+    skipped. Lyric words are tokenized like the main search index. Pass the
+    tab's ``lines`` to reuse its line classification.
+    """
+    if lines is None:
+        lines = tokenize_lines(content)
+    chords: list[str] = []
+    lyric_lines: list[str] = []
+
+    def inline(match: re.Match[str]) -> str:
+        chord = chord_token(match.group(1))
+        if chord is None:
+            return match.group(0)
+        chords.append(chord)
+        return " "
+
+    for kind, line in lines.items(content):
+        if kind == LineKind.CHORDS:
+            chords.extend(filter(None, map(chord_token, line.split())))
+        elif kind == LineKind.LYRICS:
+            lyric_lines.append(INLINE_CHORD_PATTERN.sub(inline, line.strip()))
+
+    text = "\n".join(lyric_lines)
+    lyrics = [term for t in tokenize(text) if (term := process_term(t))]
+    return chords, lyrics
+
+
+def chord_terms(chords: list[str]) -> list[str]:
+    """Turn a chord sequence into the chord-pair terms the index stores."""
+    return [f"{a} {b}" for a, b in zip(chords, chords[1:], strict=False)]
+
+
+class PositionalIndex:
+    """An inverted index of term positions that supports phrase queries.
+
+    Size stays bounded on large corpora: each document keeps at most
+    ``max_positions`` positions per term, terms found in more than
+    ``max_postings`` documents are dropped as stop terms, and positions are
+    gap-encoded on output. Stop terms, and terms whose positions in a
+    document were cut off, only match by presence in phrase queries, so the
+    caps can widen results but never lose a match. A phrase made only of
+    stop terms matches every document.
+    """
+
+    def __init__(self, max_positions: int = 8, max_postings: int | None = None):
+        self.max_positions = max_positions
+        self.max_postings = max_postings
+        self.ids: list[str] = []
+        self.titles: list[str] = []
+        self.artists: list[str] = []
+        # term -> document number -> positions
+        self.postings: dict[str, dict[int, list[int]]] = {}
+        self.stop: set[str] = set()
+        # term -> its postings as to_dict writes them, until they change
+        self._encoded: dict[str, list[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, doc_id: str, title: str, artist: str, terms: list[str]) -> None:
+        """Index one document's term stream."""
+        self.add_positions(doc_id, title, artist, self._positions(terms))
+
+    def add_positions(
+        self, doc_id: str, title: str, artist: str, found: dict[str, list[int]]
+    ) -> None:
+        """Index one document's term positions, in order of first appearance."""
+        doc = len(self.ids)
+        self.ids.append(doc_id)
+        self.titles.append(title)
+        self.artists.append(artist)
+        self._index(doc, found)
+
+    def replace(
+        self, doc_id: str, title: str, artist: str, terms: list[str], position: int
+    ) -> None:
+        """Index a document again after it changed.
+
+        A document already in the index keeps its number; a new one is
+        inserted as document ``position``, renumbering those after it. Terms
+        that became stop terms stay stop terms.
+        """
+        try:
+            doc = self.ids.index(doc_id)
+        except ValueError:
+            doc = position
+            self._renumber(doc, 1)
+            self.ids.insert(doc, doc_id)
+            self.titles.insert(doc, title)
+            self.artists.insert(doc, artist)
+        else:
+            self._drop(doc)
+            self.titles[doc] = title
+            self.artists[doc] = artist
+        self._index(doc, self._positions(terms))
+
+    def remove(self, doc_id: str) -> None:
+        """Remove a document, renumbering those after it."""
+        if doc_id not in self.ids:
+            return
+        doc = self.ids.index(doc_id)
+        self._drop(doc)
+        del self.ids[doc], self.titles[doc], self.artists[doc]
+        self._renumber(doc + 1, -1)
+
+    def _positions(self, terms: list[str]) -> dict[str, list[int]]:
+        """Where each term first appears, up to ``max_positions`` times."""
+        found: dict[str, list[int]] = {}
+        for position, term in enumerate(terms):
+            positions = found.setdefault(term, [])
+            if len(positions) < self.max_positions:
+                positions.append(position)
+        return found
+
+    def _index(self, doc: int, found: dict[str, list[int]]) -> None:
+        """Add a document's term positions to the postings."""
+        for term, positions in found.items():
+            if term in self.stop:
+                continue
+            self._encoded.pop(term, None)
+            docs = self.postings.setdefault(term, {})
+            docs[doc] = positions
+            if self.max_postings is not None and len(docs) > self.max_postings:
+                del self.postings[term]
+                self.stop.add(term)
+
+    def _drop(self, doc: int) -> None:
+        """Remove a document's postings, keeping its number."""
+        touched = [
+            term
+            for term, docs in self.postings.items()
+            if docs.pop(doc, None) is not None
+        ]
+        for term in touched:
+            self._encoded.pop(term, None)
+            if not self.postings[term]:
+                del self.postings[term]
+
+    def _renumber(self, start: int, by: int) -> None:
+        """Shift document numbers from ``start`` on by ``by``."""
+        self._encoded.clear()
+        for term, docs in self.postings.items():
+            self.postings[term] = {
+                doc + by if doc >= start else doc: positions
+                for doc, positions in docs.items()
+            }
+
+    def documents(self) -> Iterator[tuple[str, str, str, dict[str, list[int]]]]:
+        """Each document's id, title, artist and term positions, in order.
+
+        Terms come in order of first appearance, so re-adding the documents
+        to another index with ``add_positions`` gives the same postings.
+        """
+        found: list[dict[str, list[int]]] = [{} for _ in self.ids]
+        for term, docs in self.postings.items():
+            for doc, positions in docs.items():
+                found[doc][term] = positions
+        for doc, doc_id in enumerate(self.ids):
+            terms = sorted(found[doc].items(), key=lambda item: item[1][0])
+            yield doc_id, self.titles[doc], self.artists[doc], dict(terms)
+
+    def search(self, terms: list[str]) -> list[str]:
+        """Return ids of documents containing the terms at consecutive positions."""
+        anchors = [(i, term) for i, term in enumerate(terms) if term not in self.stop]
+        if terms and not anchors:
+            # Which documents hold stop terms is not kept, so any of them may
+            return list(self.ids)
+        if not anchors or any(term not in self.postings for _, term in anchors):
+            return []
+        docs = set.intersection(*(set(self.postings[term]) for _, term in anchors))
+        matches = []
+        for doc in sorted(docs):
+            starts: set[int] | None = None
+            for offset, term in anchors:
+                positions = self.postings[term][doc]
+                if len(positions) >= self.max_positions:
+                    continue
+                shifted = {p - offset for p in positions}
+                starts = shifted if starts is None else starts & shifted
+            if starts is None or starts:
+                matches.append(self.ids[doc])
+        return matches
+
+    def to_dict(self) -> dict[str, Any]:
+        """Serialize with interned artists and gap-encoded postings.
+
+        Each term maps to a flat run of ``doc gap, count, position gaps...``.
+        Runs are kept between calls and only re-encoded for terms whose
+        postings changed, so re-serializing after a small edit is cheap.
+        """
+        artists = list(dict.fromkeys(self.artists))
+        artist_numbers = {artist: i for i, artist in enumerate(artists)}
+        terms = {}
+        for term, docs in self.postings.items():
+            flat = self._encoded.get(term)
+            if flat is None:
+                flat = self._encoded[term] = _encode(docs)
+            terms[term] = flat
+        return {
+            "format": FULLTEXT_FORMAT,
+            "maxPositions": self.max_positions,
+            "ids": self.ids,
+            "titles": self.titles,
+            "artists": [artist_numbers[artist] for artist in self.artists],
+            "artistNames": artists,
+            "stop": sorted(self.stop),
+            "terms": terms,
+        }
+
+    @classmethod
+    def from_dict(
+        cls, data: dict[str, Any], max_postings: int | None = None
+    ) -> "PositionalIndex":
+        """Load an index serialized by ``to_dict``."""
+        if data.get("format") != FULLTEXT_FORMAT:
+            raise ValueError(f"Not a {FULLTEXT_FORMAT} index")
+        index = cls(data["maxPositions"], max_postings)
+        index.ids = list(data["ids"])
+        index.titles = list(data["titles"])
+        index.artists = [data["artistNames"][artist] for artist in data["artists"]]
+        index.stop = set(data["stop"])
+        for term, flat in data["terms"].items():
+            docs: dict[int, list[int]] = {}
+            doc = i = 0
+            while i < len(flat):
+                doc += flat[i]
+                count = flat[i + 1]
+                docs[doc] = list(accumulate(flat[i + 2 : i + 2 + count]))
+                i += 2 + count
+            index.postings[term] = docs
+            index._encoded[term] = list(flat)
+        return index
+
+
+def _encode(docs: dict[int, list[int]]) -> list[int]:
+    """One term's postings as a flat run of gaps and counts."""
+    flat: list[int] = []
+    previous_doc = 0
+    for doc in sorted(docs):
+        positions = docs[doc]
+        flat += [doc - previous_doc, len(positions)]
+        gaps = zip([0, *positions], positions, strict=False)
+        flat += [b - a for a, b in gaps]
+        previous_doc = doc
+    return flat
+
+
+class FullTextIndexer:
+    """Builds the lyric and chord indexes one tab at a time.
+
+    Only postings are kept, so tabs can be fed in as they stream through a
+    build and their content dropped straight after.
+    """
+
+    def __init__(
+        self,
+        max_lyric_postings: int | None = 10000,
+        max_chord_postings: int | None = 10000,
+    ):
+        self.lyrics = PositionalIndex(max_postings=max_lyric_postings)
+        self.chords = PositionalIndex(max_postings=max_chord_postings)
+
+    @classmethod
+    def read(
+        cls,
+        output_dir: Path,
+        max_lyric_postings: int | None = 10000,
+        max_chord_postings: int | None = 10000,
+    ) -> "FullTextIndexer | None":
+        """Load the indexes a build wrote, or None if they are unusable."""
+        indexer = cls(max_lyric_postings, max_chord_postings)
+        try:
+            indexer.lyrics, indexer.chords = (
+                PositionalIndex.from_dict(
+                    json.loads((output_dir / name).read_bytes()), index.max_postings
+                )
+                for name, index in (
+                    (LYRICS_INDEX_NAME, indexer.lyrics),
+                    (CHORDS_INDEX_NAME, indexer.chords),
+                )
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return indexer
+
+    def add(self, tab: Tab) -> None:
+        """Index one tab's lyrics and chord sequence."""
+        chords, lyrics = split_chords_and_lyrics(tab.content, tab.lines)
+        doc_id = f"{tab.artist_slug}/{tab.slug}"
+        meta = tab.metadata
+        self.lyrics.add(doc_id, meta.title, meta.artist, lyrics)
+        self.chords.add(doc_id, meta.title, meta.artist, chord_terms(chords))
+
+    def replace(self, tab: Tab, position: int) -> None:
+        """Index an edited tab again, as document ``position`` if it is new."""
+        chords, lyrics = split_chords_and_lyrics(tab.content, tab.lines)
+        doc_id = f"{tab.artist_slug}/{tab.slug}"
+        meta = tab.metadata
+        self.lyrics.replace(doc_id, meta.title, meta.artist, lyrics, position)
+        self.chords.replace(
+            doc_id, meta.title, meta.artist, chord_terms(chords), position
+        )
+
+    def remove(self, tab: TabSummary) -> None:
+        """Drop a deleted tab from both indexes."""
+        doc_id = f"{tab.artist_slug}/{tab.slug}"
+        self.lyrics.remove(doc_id)
+        self.chords.remove(doc_id)
+
+    def serialize(self) -> dict[str, bytes]:
+        """Both indexes as JSON, keyed by file name."""
+        return {
+            name: json.dumps(index.to_dict(), separators=(",", ":")).encode()
+            for name, index in (
+                (LYRICS_INDEX_NAME, self.lyrics),
+                (CHORDS_INDEX_NAME, self.chords),
+            )
+        }
+
+    def write(self, output_dir: Path, compress: bool = True) -> None:
+        """Write both indexes plus compressed siblings.
+
+        With ``compress=False`` any old siblings are removed instead, so they
+        are not served in place of the new indexes.
+        """
+        for name, data in self.serialize().items():
+            write_file(output_dir / name, data)
+            if compress:
+                write_compressed(output_dir / name, data, fast=True)
+            else:
+                for suffix in COMPRESSED_SUFFIXES:
+                    sibling(output_dir / name, suffix).unlink(missing_ok=True)
@@ -0,0 +1,131 @@
+"""Fast reader for the YAML frontmatter header of a tab file.
+
+``split_frontmatter`` returns exactly what ``frontmatter.loads`` would, but
+skips most of its work for the headers tabs actually have: a ``---`` block
+of flat ``key: value`` lines. Those are read by a small scanner that only
+accepts values whose YAML meaning is unambiguous; any other YAML goes to
+PyYAML's C loader, and unusual delimiters go to python-frontmatter itself.
+"""
+
+import re
+from typing import Any
+
+import frontmatter
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader
+
+# Same boundary python-frontmatter's YAML handler uses
+BOUNDARY = re.compile(r"^-{3,}\s*$", re.MULTILINE)
+
+_LINE = re.compile(r"([A-Za-z_][A-Za-z0-9_]*):(?: +(.*?))? *")
+_INT = re.compile(r"-?(?:0|[1-9][0-9]*)")
+_DOUBLE_QUOTED = re.compile(r'"([^"\\\x00-\x1f]*)"')
+_SINGLE_QUOTED = re.compile(r"'([^'\x00-\x1f]*)'")
+_PLAIN = re.compile(r"[^\W\d_][\w .'()&/!?,-]*")
+_FLOW_ITEM = re.compile(
+    r" *(?:"
+    r'"([^"\\\x00-\x1f]*)"'
+    r"|'([^'\x00-\x1f]*)'"
+    r"|([^\W\d_][\w .'-]*?)"
+    r"|(-?(?:0|[1-9][0-9]*))"
+    r") *(,|\])"
+)
+
+# Plain words YAML 1.1 resolves to something other than a string
+_RESERVED = {
+    "y", "n", "yes", "no", "on", "off", "true", "false", "null", "~",
+}  # fmt: skip
+
+_UNSCANNED = object()
+
+
+def _scalar(value: str) -> Any:
+    """Read an unambiguous scalar, or return ``_UNSCANNED``."""
+    if match := _DOUBLE_QUOTED.fullmatch(value) or _SINGLE_QUOTED.fullmatch(value):
+        return match.group(1)
+    if _INT.fullmatch(value):
+        return int(value)
+    if value in ("true", "false"):
+        return value == "true"
+    if _PLAIN.fullmatch(value) and value.lower() not in _RESERVED:
+        return value
+    return _UNSCANNED
+
+
+def _flow_list(value: str) -> list[Any] | object:
+    """Read a one-line ``[a, "b", 3]`` list, or return ``_UNSCANNED``."""
+    if value == "[]":
+        return []
+    items: list[Any] = []
+    pos = 1
+    while match := _FLOW_ITEM.match(value, pos):
+        double, single, plain, number = match.group(1, 2, 3, 4)
+        if plain is not None:
+            if plain.lower() in _RESERVED:
+                return _UNSCANNED
+            items.append(plain)
+        elif number is not None:
+            items.append(int(number))
+        else:
+            items.append(double if double is not None else single)
+        pos = match.end()
+        if match.group(5) == "]":
+            return items if pos == len(value) else _UNSCANNED
+    return _UNSCANNED
+
+
+def scan_flat_yaml(block: str) -> dict[str, Any] | None:
+    """Parse a flat YAML mapping, or return None if it is not simple enough.
+
+    Only top-level ``key: value`` lines with quoted strings, plain words,
+    integers, ``true``/``false`` or one-line flow lists are accepted, along
+    with blank lines and whole-line comments.
+    """
+    if "\t" in block:
+        return None
+    data: dict[str, Any] = {}
+    for line in block.split("\n"):
+        if not line or line.isspace() or line.startswith("#"):
+            continue
+        match = _LINE.fullmatch(line)
+        if match is None:
+            return None
+        key, value = match.group(1, 2)
+        if key in data or key.lower() in _RESERVED:
+            return None
+        if value is None:
+            data[key] = None
+            continue
+        parsed = _flow_list(value) if value.startswith("[") else _scalar(value)
+        if parsed is _UNSCANNED:
+            return None
+        data[key] = parsed
+    return data
+
+
+def split_frontmatter(text: str) -> tuple[dict[str, Any], str]:
+    """Split a tab file's text into its metadata and its stripped content.
+
+    ``text`` must already have its newlines normalised. The result matches
+    ``frontmatter.loads(text)``'s ``metadata`` and ``content``, and headers
+    that python-frontmatter rejects raise here as well.
+    """
+    if not text.startswith("---\n"):
+        return frontmatter.parse(text)
+    end = BOUNDARY.search(text, 4)
+    if end is None:
+        return frontmatter.parse(text)
+
+    block = text[4 : end.start()]
+    metadata = scan_flat_yaml(block)
+    if metadata is None:
+        loaded = yaml.load(block, Loader=SafeLoader)
+        metadata = loaded if isinstance(loaded, dict) else {}
+        if not all(isinstance(key, str) for key in metadata):
+            # python-frontmatter fails on these too
+            raise TypeError("frontmatter keys must be strings")
+    return metadata, text[end.end() :].strip()
@@ -0,0 +1,318 @@
+"""On-demand rendering for ``tabstash serve --live``.
+
+Pages are rendered from the content directory when they are requested
+instead of being built into an output directory first, so the server
+starts immediately whatever the size of the catalog. Tab pages only parse
+their own file. Listings and search indexes need the whole catalog, which
+is parsed on first use and afterwards re-parsed one changed file at a
+time, with the tabs directory rescanned for changes at most once per
+``rescan_interval`` seconds however many requests come in. Rendered
+pages are kept in a bounded LRU cache, and an entry is only used while
+the files it was rendered from keep the same mtime and size.
+"""
+
+import functools
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from http import HTTPStatus
+from pathlib import Path
+from typing import NamedTuple
+
+from .builder import SiteBuilder, group_by_artist
+from .fulltext import CHORDS_INDEX_NAME, LYRICS_INDEX_NAME, FullTextIndexer
+from .manifest import hash_bytes
+from .models import TabSummary
+from .parser import parse_file, tab_sort_key
+from .search import build_search_index
+from .server import SiteRequestHandler, SiteServer
+
+DEFAULT_MAX_PAGES = 1024
+DEFAULT_RESCAN_INTERVAL = 0.5
+
+SEARCH_INDEX_NAME = "search-index.json"
+
+# (mtime_ns, size) of a source file
+Stamp = tuple[int, int]
+
+
+class Rendered(NamedTuple):
+    """A rendered response body."""
+
+    body: bytes
+    content_type: str
+    etag: str
+
+    @classmethod
+    def of(cls, body: bytes, content_type: str) -> "Rendered":
+        return cls(body, content_type, f'"{hash_bytes(body)[:16]}"')
+
+
+def _html(html: str) -> Rendered:
+    return Rendered.of(html.encode(), "text/html; charset=utf-8")
+
+
+def _json(data: bytes) -> Rendered:
+    return Rendered.of(data, "application/json; charset=utf-8")
+
+
+def _stamp(path: Path) -> Stamp:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+class LiveSite:
+    """Renders the pages of a site on request, straight from its sources.
+
+    Serves the same pages a build writes, through the builder's templates:
+    tab pages, artist pages, the home page and artist directory with their
+    later pages, and the search indexes. Search indexes are never sharded.
+    """
+
+    def __init__(
+        self,
+        builder: SiteBuilder,
+        max_pages: int = DEFAULT_MAX_PAGES,
+        rescan_interval: float = DEFAULT_RESCAN_INTERVAL,
+    ):
+        self.builder = builder
+        self.max_pages = max_pages
+        self.rescan_interval = rescan_interval
+        self.hits = 0
+        self.misses = 0
+        self._sources: dict[Path, tuple[Stamp, TabSummary | None]] = {}
+        self._scanned = False
+        self._scanned_at = 0.0
+        self._generation = 0
+        self._catalog: list[TabSummary] = []
+        self._catalog_generation = -1
+        self._catalog_lock = threading.Lock()
+        self._fulltext: dict[str, bytes] = {}
+        self._fulltext_generation = -1
+        self._fulltext_lock = threading.Lock()
+        self._pages: OrderedDict[str, tuple[Hashable, Rendered]] = OrderedDict()
+        self._pages_lock = threading.Lock()
+
+    def get(self, url_path: str) -> Rendered | None:
+        """Return the page at a URL path, or None if there is no such page."""
+        path = url_path.strip("/") or "index.html"
+        stamp: Hashable
+        render: Callable[[], Rendered | None]
+        if path.startswith("tabs/"):
+            source = self._tab_source(path)
+            if source is None:
+                return None
+            try:
+                stamp = _stamp(source)
+            except OSError:
+                return None
+            render = functools.partial(self._render_tab, source)
+        elif path == SEARCH_INDEX_NAME:
+            stamp = self.refresh()
+            render = self._render_search_index
+        elif path in (LYRICS_INDEX_NAME, CHORDS_INDEX_NAME):
+            stamp = self.refresh()
+            render = functools.partial(self._render_fulltext, path)
+        elif path.endswith(".html"):
+            stamp = self.refresh()
+            render = functools.partial(self._render_listing, path)
+        else:
+            return None
+
+        key = (stamp, self._template_stamp())
+        with self._pages_lock:
+            cached = self._pages.get(path)
+            if cached is not None and cached[0] == key:
+                self._pages.move_to_end(path)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        page = render()
+        if page is None:
+            return None
+        with self._pages_lock:
+            self._pages[path] = (key, page)
+            self._pages.move_to_end(path)
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+        return page
+
+    def refresh(self) -> int:
+        """Bring the catalog up to date and return its generation.
+
+        The generation goes up whenever a tab is added, changed or removed.
+        The first call parses every tab, through the builder's parse cache if
+        it has one; later calls only re-parse files whose stat changed, and
+        within ``rescan_interval`` of the last scan do not look at the tabs
+        directory at all.
+        """
+        tabs_dir = self.builder.content_dir / "tabs"
+        with self._catalog_lock:
+            now = time.monotonic()
+            if self._scanned and now - self._scanned_at < self.rescan_interval:
+                return self._generation
+            self._scanned_at = now
+            stamps = {}
+            for path in tabs_dir.rglob("*.md") if tabs_dir.is_dir() else ():
+                try:
+                    stamps[path] = _stamp(path)
+                except OSError:
+                    continue
+
+            if not self._scanned:
+                self._scanned = True
+                parsed = {
+                    tab.source_path: tab.summary() for tab in self.builder.stream_tabs()
+                }
+                for path, stamp in stamps.items():
+                    self._sources[path] = (stamp, parsed.get(path))
+                self._generation += 1
+                return self._generation
+
+            changed = False
+            for path, stamp in stamps.items():
+                entry = self._sources.get(path)
+                if entry is not None and entry[0] == stamp:
+                    continue
+                try:
+                    summary: TabSummary | None = parse_file(path).summary()
+                except Exception as e:
+                    print(f"Warning: Failed to parse {path}: {e}")
+                    summary = None
+                self._sources[path] = (stamp, summary)
+                changed = True
+            for path in self._sources.keys() - stamps.keys():
+                del self._sources[path]
+                changed = True
+            if changed:
+                self._generation += 1
+            return self._generation
+
+    def catalog(self) -> list[TabSummary]:
+        """Every tab that parses, sorted for listings."""
+        generation = self.refresh()
+        with self._catalog_lock:
+            if self._catalog_generation != generation:
+                self._catalog = sorted(
+                    (summary for _, summary in self._sources.values() if summary),
+                    key=tab_sort_key,
+                )
+                self._catalog_generation = generation
+            return self._catalog
+
+    def fulltext(self) -> dict[str, bytes]:
+        """Both full-text indexes, rebuilt only when the catalog changes.
+
+        They need every tab's content, so building them streams the whole
+        catalog back in; both index files share the one build.
+        """
+        generation = self.refresh()
+        with self._fulltext_lock:
+            if self._fulltext_generation != generation:
+                indexer = FullTextIndexer()
+                for tab in self.builder.stream_tabs():
+                    indexer.add(tab)
+                self._fulltext = indexer.serialize()
+                self._fulltext_generation = generation
+            return self._fulltext
+
+    def _tab_source(self, path: str) -> Path | None:
+        """The source file for a ``tabs/<artist>/<slug>.html`` path."""
+        parts = path.split("/")
+        if len(parts) != 3 or not parts[2].endswith(".html"):
+            return None
+        if any(not part or part.startswith(".") for part in parts):
+            return None
+        slug = parts[2].removesuffix(".html")
+        return self.builder.content_dir / "tabs" / parts[1] / f"{slug}.md"
+
+    def _template_stamp(self) -> tuple[tuple[str, int], ...]:
+        """Modification times of the templates, which every page depends on."""
+        templates_dir = self.builder.templates_dir
+        return tuple(
+            (path.name, path.stat().st_mtime_ns)
+            for path in sorted(templates_dir.iterdir())
+            if path.is_file()
+        )
+
+    def _render_tab(self, source: Path) -> Rendered:
+        return _html(self.builder.render_tab(parse_file(source)))
+
+    def _render_fulltext(self, name: str) -> Rendered:
+        return _json(self.fulltext()[name])
+
+    def _render_listing(self, path: str) -> Rendered | None:
+        """Render a page of the home page, artist directory or an artist."""
+        tabs = self.catalog()
+        tabs_by_artist = group_by_artist(tabs)
+        if path.startswith("artist/"):
+            slug = path.removeprefix("artist/").split("/")[0].removesuffix(".html")
+            if slug not in tabs_by_artist:
+                return None
+            listings = [self.builder.artist_listing(slug, tabs_by_artist[slug])]
+        else:
+            listings = self.builder.index_listings(tabs, tabs_by_artist)
+        for listing in listings:
+            for page in listing.pages:
+                if page.path == path:
+                    return _html(self.builder.render_listing_page(listing, page))
+        return None
+
+    def _render_search_index(self) -> Rendered:
+        index = build_search_index(self.catalog(), self.builder.base_url)
+        return _json(index.serialize(compact=self.builder.compact_search).encode())
+
+
+class LiveRequestHandler(SiteRequestHandler):
+    """Serves rendered pages, and static assets from the static directory."""
+
+    server: "LiveServer"
+
+    def serve(self, body: bool) -> None:
+        url_path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
+        url_path = url_path.removeprefix(self.server.site.builder.base_url)
+        if url_path.startswith("/static/"):
+            super().serve(body)
+            return
+        try:
+            page = self.server.site.get(url_path)
+        except Exception as e:
+            self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, str(e))
+            return
+        if page is None:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+
+        validators = [("ETag", page.etag), ("Cache-Control", "no-cache")]
+        if_none_match = self.headers.get("If-None-Match", "")
+        if page.etag in [tag.strip() for tag in if_none_match.split(",")]:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_headers(validators)
+            return
+        self.send_response(HTTPStatus.OK)
+        self.send_headers(
+            [
+                ("Content-Type", page.content_type),
+                ("Content-Length", str(len(page.body))),
+                *validators,
+            ]
+        )
+        if body:
+            self.wfile.write(page.body)
+
+    def resolve(self, url_path: str) -> Path | None:
+        prefix = self.server.site.builder.base_url + "/static"
+        return super().resolve(url_path.removeprefix(prefix))
+
+
+class LiveServer(SiteServer):
+    """Serves a site rendered on request, one thread per connection."""
+
+    def __init__(self, address: tuple[str, int], site: LiveSite, quiet: bool = False):
+        self.site = site
+        super().__init__(
+            address, site.builder.static_dir, quiet=quiet, handler=LiveRequestHandler
+        )
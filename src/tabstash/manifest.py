@@ -0,0 +1,99 @@
+"""Build manifest used for incremental builds."""
+
+import hashlib
+import json
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .output import write_file
+
+MANIFEST_NAME = ".tabstash-manifest.json"
+MANIFEST_VERSION = 3
+
+
+def hash_bytes(data: bytes) -> str:
+    """Return the hex digest used for all manifest hashes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: Path) -> str:
+    """Hash a file's contents."""
+    return hash_bytes(path.read_bytes())
+
+
+def hash_tree(root: Path) -> dict[str, str]:
+    """Hash every file under a directory, keyed by relative POSIX path."""
+    if not root.exists():
+        return {}
+    return {
+        path.relative_to(root).as_posix(): hash_file(path)
+        for path in sorted(root.rglob("*"))
+        if path.is_file()
+    }
+
+
+@dataclass
+class SourceEntry:
+    """What the manifest knows about one tab source file."""
+
+    hash: str
+    artist_slug: str
+    pages: list[str] = field(default_factory=list)
+
+
+@dataclass
+class AssetEntry:
+    """A static asset's source hash and the path it was written to."""
+
+    hash: str
+    path: str
+
+
+@dataclass
+class BuildManifest:
+    """Record of the inputs and outputs of the last successful build.
+
+    ``options`` holds the build options that affect every page (such as the
+    base URL). ``sources`` is keyed by the tab's path relative to the content
+    directory, and each entry lists the output pages (relative to the output
+    directory) that the tab feeds into. ``assets`` is keyed by the asset's
+    path relative to the static directory.
+    """
+
+    options: dict[str, Any] = field(default_factory=dict)
+    templates: dict[str, str] = field(default_factory=dict)
+    sources: dict[str, SourceEntry] = field(default_factory=dict)
+    assets: dict[str, AssetEntry] = field(default_factory=dict)
+    version: int = MANIFEST_VERSION
+
+    @classmethod
+    def load(cls, path: Path) -> "BuildManifest | None":
+        """Load a manifest, returning None if it is missing or unusable."""
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            return None
+        try:
+            return cls(
+                options=dict(data["options"]),
+                templates=dict(data["templates"]),
+                sources={
+                    key: SourceEntry(**entry) for key, entry in data["sources"].items()
+                },
+                assets={
+                    key: AssetEntry(**entry) for key, entry in data["assets"].items()
+                },
+            )
+        except (KeyError, TypeError):
+            return None
+
+    def save(self, path: Path) -> None:
+        """Write the manifest as JSON."""
+        write_file(path, json.dumps(asdict(self), indent=2, sort_keys=True).encode())
+
+    def pages(self) -> set[str]:
+        """Return every output page referenced by any source."""
+        return {page for entry in self.sources.values() for page in entry.pages}
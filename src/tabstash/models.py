@@ -1,9 +1,19 @@
-"""Pydantic models for tab metadata and content."""
+"""Pydantic models for tab metadata and content.
 
+Pydantic is only used where untrusted input comes in: frontmatter is
+validated as ``TabMetadata`` and then copied into the plain slotted
+dataclasses the rest of the build passes around, which are several times
+smaller and cheaper to create and pickle.
+"""
+
+from array import array
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from enum import IntEnum
 from pathlib import Path
-from typing import Optional
+from typing import Any
 
-from pydantic import BaseModel, ConfigDict, Field, field_validator
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError, field_validator
 
 
 class TabMetadata(BaseModel):
@@ -11,11 +21,11 @@ class TabMetadata(BaseModel):
 
     title: str
     artist: str
-    key: Optional[str] = None
+    key: str | None = None
     capo: int = Field(default=0, ge=0, le=12)
     tuning: str = "standard"
-    difficulty: Optional[str] = None
-    bpm: Optional[int] = Field(default=None, ge=20, le=300)
+    difficulty: str | None = None
+    bpm: int | None = Field(default=None, ge=20, le=300)
     tags: list[str] = Field(default_factory=list)
     format: str = "full"  # "full" for traditional tabs, "compact" for chord charts
     featured: bool = False
@@ -29,7 +39,7 @@ class TabMetadata(BaseModel):
 
     @field_validator("difficulty")
     @classmethod
-    def valid_difficulty(cls, v: Optional[str]) -> Optional[str]:
+    def valid_difficulty(cls, v: str | None) -> str | None:
         if v is None:
             return None
         valid = {"beginner", "intermediate", "advanced"}
@@ -38,23 +48,126 @@ class TabMetadata(BaseModel):
         return v.lower()
 
 
-class Tab(BaseModel):
-    """A fully parsed tab with metadata and content."""
+# Validates a whole batch of headers in one call into pydantic-core
+_METADATA_BATCH = TypeAdapter(list[TabMetadata])
 
-    model_config = ConfigDict(arbitrary_types_allowed=True)
 
-    metadata: TabMetadata
-    content: str
+@dataclass(slots=True)
+class Metadata:
+    """Validated tab metadata, as carried through a build.
+
+    Mirrors the fields of ``TabMetadata``; instances only ever come from
+    validated input or from the parse cache.
+    """
+
+    title: str
+    artist: str
+    key: str | None = None
+    capo: int = 0
+    tuning: str = "standard"
+    difficulty: str | None = None
+    bpm: int | None = None
+    tags: list[str] = field(default_factory=list)
+    format: str = "full"
+    featured: bool = False
+
+    @classmethod
+    def from_model(cls, model: TabMetadata) -> "Metadata":
+        """Copy a validated ``TabMetadata``."""
+        return cls(**model.__dict__)
+
+
+def validate_metadata(
+    headers: list[dict[str, Any]],
+) -> list[Metadata | ValidationError]:
+    """Validate a batch of raw frontmatter headers.
+
+    The whole batch goes through pydantic in one call. If any header is
+    invalid the batch is validated again one header at a time, so each
+    error is reported against its own header, in the same form
+    ``TabMetadata.model_validate`` would give.
+    """
+    try:
+        return [
+            Metadata.from_model(m) for m in _METADATA_BATCH.validate_python(headers)
+        ]
+    except ValidationError:
+        pass
+    results: list[Metadata | ValidationError] = []
+    for header in headers:
+        try:
+            results.append(Metadata.from_model(TabMetadata.model_validate(header)))
+        except ValidationError as e:
+            results.append(e)
+    return results
+
+
+@dataclass(slots=True)
+class TabSummary:
+    """Everything about a tab except its content.
+
+    Listing pages and the search index only need this, so builds keep
+    summaries in memory and load content only while rendering a tab page.
+    """
+
+    metadata: Metadata
     source_path: Path
     slug: str
     artist_slug: str
 
 
-class SearchDocument(BaseModel):
-    """Document format for the MiniSearch index."""
+class LineKind(IntEnum):
+    """What a line of tab content holds."""
 
-    id: str
-    title: str
-    artist: str
-    tags: list[str]
-    url: str
+    BLANK = 0
+    SECTION = 1
+    CHORDS = 2
+    LYRICS = 3
+    STAFF = 4
+
+
+_LINE_KINDS = tuple(LineKind)
+
+
+@dataclass(slots=True)
+class TabLines:
+    """Tab content split into lines, each classified once.
+
+    ``kinds`` holds one ``LineKind`` per line and ``bounds`` the offset where
+    each line starts, followed by one past the end of the content, so line
+    ``i`` is ``content[bounds[i] : bounds[i + 1] - 1]``.
+    """
+
+    kinds: bytes
+    bounds: array
+    sections: list[str]
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def line(self, content: str, i: int) -> str:
+        """Return the text of line ``i``."""
+        return content[self.bounds[i] : self.bounds[i + 1] - 1]
+
+    def items(self, content: str) -> Iterator[tuple[LineKind, str]]:
+        """Yield the kind and text of every line."""
+        bounds = self.bounds
+        for i, kind in enumerate(self.kinds):
+            yield _LINE_KINDS[kind], content[bounds[i] : bounds[i + 1] - 1]
+
+
+@dataclass(slots=True)
+class Tab(TabSummary):
+    """A fully parsed tab with metadata and content."""
+
+    content: str
+    lines: TabLines
+
+    @property
+    def sections(self) -> list[str]:
+        """Section names like "Verse" or "Chorus", in order."""
+        return self.lines.sections
+
+    def summary(self) -> TabSummary:
+        """Return this tab without its content or sections."""
+        return TabSummary(self.metadata, self.source_path, self.slug, self.artist_slug)
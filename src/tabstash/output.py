@@ -0,0 +1,189 @@
+"""Writing the site: staged builds and write-only-if-changed files.
+
+A build writes into a staging directory next to the output directory and
+swaps it into place when it is done, so a server or deploy sync reading
+the output never sees a half-built site. Every file goes through
+``write_file``, which leaves a file alone when it already holds the same
+bytes, so unchanged files keep their mtimes (and inodes) from build to
+build and rsync or a CDN only sees what really changed.
+"""
+
+import ctypes
+import os
+import shutil
+import sys
+import threading
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+# renameat2(2) arguments for swapping two paths in one step
+AT_FDCWD = -100
+RENAME_EXCHANGE = 2
+
+
+@dataclass
+class WriteStats:
+    """Files and bytes written, and left alone because they were unchanged."""
+
+    files_written: int = 0
+    bytes_written: int = 0
+    files_skipped: int = 0
+    bytes_skipped: int = 0
+
+    def __add__(self, other: "WriteStats") -> "WriteStats":
+        return WriteStats(
+            self.files_written + other.files_written,
+            self.bytes_written + other.bytes_written,
+            self.files_skipped + other.files_skipped,
+            self.bytes_skipped + other.bytes_skipped,
+        )
+
+    def __sub__(self, other: "WriteStats") -> "WriteStats":
+        return WriteStats(
+            self.files_written - other.files_written,
+            self.bytes_written - other.bytes_written,
+            self.files_skipped - other.files_skipped,
+            self.bytes_skipped - other.bytes_skipped,
+        )
+
+
+# Running totals for this process; callers diff snapshots of them. Files
+# may be written from several threads at once, hence the lock.
+_totals = WriteStats()
+_totals_lock = threading.Lock()
+
+# While a build is staged: (staging directory, live output directory)
+_stage: tuple[Path, Path] | None = None
+
+
+def write_totals() -> WriteStats:
+    """A snapshot of everything this process has written or skipped."""
+    with _totals_lock:
+        return replace(_totals)
+
+
+def add_writes(stats: WriteStats) -> None:
+    """Count writes made on this process's behalf, e.g. by a worker."""
+    global _totals
+    with _totals_lock:
+        _totals = _totals + stats
+
+
+def set_stage(stage: tuple[Path, Path] | None) -> None:
+    """Compare files written under a staging directory with the live output."""
+    global _stage
+    _stage = stage
+
+
+def current_stage() -> tuple[Path, Path] | None:
+    """The staging and live directories of the build in progress, if any."""
+    return _stage
+
+
+def _live_path(path: Path) -> Path:
+    """Where the live output keeps the file ``path`` is staging."""
+    if _stage is not None and path.is_relative_to(_stage[0]):
+        return _stage[1] / path.relative_to(_stage[0])
+    return path
+
+
+def _holds(path: Path, data: bytes) -> bool:
+    """Whether ``path`` is a file with exactly these contents."""
+    try:
+        if path.stat().st_size != len(data):
+            return False
+        return path.read_bytes() == data
+    except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+        return False
+
+
+def _temporary(path: Path) -> Path:
+    return path.with_name(f".{path.name}.tmp")
+
+
+def _link(source: Path, target: Path) -> None:
+    """Put a hard link to ``source`` at ``target``, copying if links fail."""
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def write_file(path: Path, data: bytes) -> bool:
+    """Write ``data`` to ``path`` unless it already holds exactly that.
+
+    Files are replaced with a rename rather than written in place, so
+    readers never see a partial file and a staging tree hard-linked to the
+    live output never changes a live file. While a build is staged, an
+    identical file in the live output is linked in instead of written, so
+    it keeps its mtime. Returns whether anything was written.
+    """
+    live = _live_path(path)
+    temporary = _temporary(path)
+    if _holds(live, data):
+        if live != path and not (path.exists() and live.samefile(path)):
+            _link(live, temporary)
+            os.replace(temporary, path)
+        add_writes(WriteStats(files_skipped=1, bytes_skipped=len(data)))
+        return False
+    temporary.write_bytes(data)
+    os.replace(temporary, path)
+    add_writes(WriteStats(files_written=1, bytes_written=len(data)))
+    return True
+
+
+def staging_dir(output_dir: Path) -> Path:
+    """The directory a build of ``output_dir`` is staged in."""
+    return output_dir.with_name(f".{output_dir.name}.staging")
+
+
+def stage(output_dir: Path, clone: bool) -> Path:
+    """Create a fresh staging directory for ``output_dir`` and return it.
+
+    With ``clone`` it starts as a copy of the current output made of hard
+    links, for builds that only rewrite what changed; otherwise it starts
+    empty. Leftovers of an interrupted build are cleared first.
+    """
+    staging = staging_dir(output_dir)
+    if staging.exists():
+        shutil.rmtree(staging)
+    if clone and output_dir.is_dir():
+        shutil.copytree(output_dir, staging, symlinks=True, copy_function=_link)
+    else:
+        staging.mkdir(parents=True)
+    return staging
+
+
+def _exchange(first: Path, second: Path) -> bool:
+    """Swap two paths in one atomic rename, where the platform can."""
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+    except (OSError, AttributeError):  # libc without renameat2
+        return False
+    status = renameat2(
+        AT_FDCWD, os.fsencode(first), AT_FDCWD, os.fsencode(second), RENAME_EXCHANGE
+    )
+    return status == 0
+
+
+def replace_directory(staging: Path, output_dir: Path) -> None:
+    """Move a finished staging directory into ``output_dir``'s place.
+
+    On Linux the two are exchanged in a single rename, so ``output_dir``
+    always holds a complete site. Elsewhere the old output is renamed away
+    first, leaving a moment in which ``output_dir`` does not exist. The old
+    output is deleted afterwards.
+    """
+    if not output_dir.exists():
+        staging.rename(output_dir)
+        return
+    if not _exchange(staging, output_dir):
+        old = output_dir.with_name(f".{output_dir.name}.old")
+        if old.exists():
+            shutil.rmtree(old)
+        output_dir.rename(old)
+        staging.rename(output_dir)
+        staging = old
+    shutil.rmtree(staging)
@@ -0,0 +1,66 @@
+"""Split long listings across numbered pages."""
+
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+_PAGE_NAME = re.compile(r"(\d+)\.html")
+
+
+def page_path(first: str, number: int) -> str:
+    """Output path of page ``number`` of a listing starting at ``first``.
+
+    The first page keeps the listing's usual path and later pages go in a
+    directory named after it, so ``artist/x.html`` continues as
+    ``artist/x/2.html``.
+    """
+    if number == 1:
+        return first
+    return f"{first.removesuffix('.html')}/{number}.html"
+
+
+@dataclass(slots=True)
+class Page:
+    """One page of a listing."""
+
+    items: list[Any]
+    number: int
+    count: int
+    first: str
+
+    @property
+    def path(self) -> str:
+        """This page's output path."""
+        return page_path(self.first, self.number)
+
+    def path_of(self, number: int) -> str:
+        """Output path of another page of the same listing."""
+        return page_path(self.first, number)
+
+
+def paginate(items: list[Any], first: str, size: int) -> list[Page]:
+    """Split ``items`` into pages of at most ``size`` items.
+
+    A ``size`` of 0 puts everything on one page. There is always at least
+    one page, even for an empty listing.
+    """
+    if size <= 0 or len(items) <= size:
+        return [Page(items, 1, 1, first)]
+    count = -(-len(items) // size)
+    return [
+        Page(items[i * size : (i + 1) * size], i + 1, count, first)
+        for i in range(count)
+    ]
+
+
+def stale_pages(output_dir: Path, first: str, count: int) -> list[Path]:
+    """Continuation pages left over from when the listing was longer."""
+    directory = output_dir / first.removesuffix(".html")
+    if not directory.is_dir():
+        return []
+    return [
+        path
+        for path in directory.glob("*.html")
+        if (match := _PAGE_NAME.fullmatch(path.name)) and int(match.group(1)) > count
+    ]
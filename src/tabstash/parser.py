@@ -1,11 +1,37 @@
 """Parse markdown tab files with YAML frontmatter."""
 
+import functools
+import os
 import re
+import time
+from array import array
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
 from pathlib import Path
+from typing import Any, NamedTuple
 
-import frontmatter
+from .cache import CacheEntry, ParseCache
+from .header import split_frontmatter
+from .manifest import hash_bytes
+from .models import LineKind, Metadata, Tab, TabLines, TabSummary, validate_metadata
 
-from .models import Tab, TabMetadata
+# Must match static/js/fulltext.js
+CHORD_PATTERN = re.compile(
+    r"^[A-G][#b]?"
+    r"(?:maj|min|m|M|dim|aug|sus|add|\+|°|ø)?"
+    r"\d{0,2}"
+    r"(?:(?:sus|add|maj|b|#|-)\d{1,2})*"
+    r"(?:/[A-G][#b]?)?$"
+)
+DECORATION_PATTERN = re.compile(r"^(?:\(?x\d+\)?|\|+|-+|/+|\*+|\.+|N\.?C\.?)$")
+SECTION_PATTERN = re.compile(r"^\[([^\]]+)\]")
+STAFF_PATTERN = re.compile(r"^\s*[A-Ga-g]?[#b]?\s*\|[-\d|/\\~*().hpbrx\s]*$")
+
+# Bump when tokenize_lines classifies lines differently with the same
+# patterns; cached line kinds are keyed on both (see cache.schema_fingerprint)
+LINE_KINDS_VERSION = 2
+LINE_PATTERNS = (CHORD_PATTERN, DECORATION_PATTERN, SECTION_PATTERN, STAFF_PATTERN)
 
 
 def slugify(text: str) -> str:
@@ -16,49 +42,358 @@ def slugify(text: str) -> str:
     return text.strip("-")
 
 
-def parse_file(path: Path) -> Tab:
-    """Parse a single markdown tab file."""
-    post = frontmatter.load(path)
-    metadata = TabMetadata.model_validate(post.metadata)
+class ParsedSource(NamedTuple):
+    """A parsed tab plus what the parse cache needs to reuse it."""
+
+    tab: Tab
+    digest: str
+    content_offset: int
+
+
+def decode_source(data: bytes) -> str:
+    """Decode a source file's bytes into text.
+
+    Newlines are normalised the same way ``open()`` does in text mode, which
+    is how python-frontmatter reads files.
+    """
+    return data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def read_source(path: Path) -> tuple[bytes, str]:
+    """Read a source file, returning its raw bytes and decoded text.
+
+    This is the only read of the file.
+    """
+    data = path.read_bytes()
+    return data, decode_source(data)
+
+
+class _Source(NamedTuple):
+    """A source file read and split, with its header not yet validated."""
+
+    path: Path
+    data: bytes
+    text: str
+    header: dict[str, Any]
+    content: str
+
+
+def _split_source(path: Path, data: bytes | None = None) -> _Source:
+    """Read a source file, unless its bytes are given, and split off its frontmatter."""
+    if data is None:
+        data, text = read_source(path)
+    else:
+        text = decode_source(data)
+    header, content = split_frontmatter(text)
+    return _Source(path, data, text, header, content)
+
+
+def _assemble(source: _Source, metadata: Metadata) -> ParsedSource:
+    """Build the parse result for a source whose header has been validated."""
+    content = source.content
+    # The body is always a suffix of the right-stripped file text
+    content_offset = len(source.text.rstrip()) - len(content)
+
+    return ParsedSource(
+        tab=build_tab(source.path, metadata, content, tokenize_lines(content)),
+        digest=hash_bytes(source.data),
+        content_offset=content_offset,
+    )
+
 
+def parse_source(path: Path, data: bytes | None = None) -> ParsedSource:
+    """Parse a tab file, also returning its content hash and body offset.
+
+    ``data`` is the file's contents, if they have already been read.
+    """
+    source = _split_source(path, data)
+    (metadata,) = validate_metadata([source.header])
+    if isinstance(metadata, Exception):
+        raise metadata
+    return _assemble(source, metadata)
+
+
+def build_tab(path: Path, metadata: Metadata, content: str, lines: TabLines) -> Tab:
+    """Assemble a Tab, deriving slugs from the file path."""
     # Derive slugs from file path structure: content/tabs/artist/song.md
     song_slug = path.stem
     artist_slug = path.parent.name
 
     return Tab(
         metadata=metadata,
-        content=post.content,
+        content=content,
+        lines=lines,
         source_path=path,
         slug=song_slug,
         artist_slug=artist_slug,
     )
 
 
-def parse_directory(content_dir: Path) -> list[Tab]:
-    """Parse all markdown files in the tabs directory."""
-    tabs_dir = content_dir / "tabs"
-    if not tabs_dir.exists():
-        return []
+def parse_file(path: Path) -> Tab:
+    """Parse a single markdown tab file."""
+    return parse_source(path).tab
+
+
+# Per-file parse result: (parsed or None, error or None, seconds taken)
+BatchResult = tuple[ParsedSource | None, str | None, float]
+
 
-    tabs = []
-    for md_file in tabs_dir.rglob("*.md"):
+def _parse_batch(paths: list[Path]) -> list[BatchResult]:
+    """Parse a batch of files, returning a result per file.
+
+    All headers in the batch are validated together, and that time is
+    shared equally between the files. Runs in pool workers, so failures are
+    returned rather than raised.
+    """
+    results: list[BatchResult] = [(None, None, 0.0)] * len(paths)
+    seconds = [0.0] * len(paths)
+    sources: list[tuple[int, _Source]] = []
+    for i, path in enumerate(paths):
+        start = time.perf_counter()
         try:
-            tab = parse_file(md_file)
-            tabs.append(tab)
+            sources.append((i, _split_source(path)))
         except Exception as e:
-            print(f"Warning: Failed to parse {md_file}: {e}")
+            results[i] = (None, str(e), time.perf_counter() - start)
+            continue
+        seconds[i] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    validated = validate_metadata([source.header for _, source in sources])
+    share = (time.perf_counter() - start) / max(len(sources), 1)
+    for (i, source), metadata in zip(sources, validated, strict=True):
+        if isinstance(metadata, Exception):
+            results[i] = (None, str(metadata), seconds[i] + share)
+            continue
+        start = time.perf_counter()
+        try:
+            parsed, error = _assemble(source, metadata), None
+        except Exception as e:
+            parsed, error = None, str(e)
+        results[i] = (parsed, error, seconds[i] + share + time.perf_counter() - start)
+    return results
+
+
+def _load_cached(cache: ParseCache, path: Path, stat: os.stat_result) -> Tab | None:
+    """Rebuild a Tab from the parse cache if the file is unchanged.
+
+    A matching mtime and size is trusted as is; otherwise the file is hashed
+    and still reused if only its timestamp moved.
+    """
+    entry = cache.get(path)
+    if entry is None:
+        return None
+    data, text = read_source(path)
+    if (entry.mtime_ns, entry.size) != (stat.st_mtime_ns, stat.st_size):
+        if hash_bytes(data) != entry.digest:
+            return None
+        cache.touch(path, stat)
+    return cached_tab(path, entry, text)
+
+
+def cached_tab(path: Path, entry: CacheEntry, text: str) -> Tab:
+    """Rebuild a Tab from its parse cache entry and its source text."""
+    content = text[entry.content_offset :].rstrip()
+    return build_tab(path, entry.metadata, content, entry.lines)
 
-    # Sort by artist, then title
-    tabs.sort(key=lambda t: (t.metadata.artist.lower(), t.metadata.title.lower()))
+
+def _batches(paths: list[Path], workers: int) -> Iterator[list[Path]]:
+    """Split paths into batches, aiming for a few batches per worker."""
+    size = max(1, min(256, -(-len(paths) // (workers * 4))))
+    for i in range(0, len(paths), size):
+        yield paths[i : i + size]
+
+
+# Per-file outcome: (path, tab or None, error or None, seconds taken)
+Outcome = tuple[Path, Tab | None, str | None, float]
+
+
+class _PendingBatch(NamedTuple):
+    """A batch whose cache hits are loaded and whose misses are parsing."""
+
+    paths: list[Path]
+    outcomes: list[Outcome | None]
+    stats: dict[int, os.stat_result]
+    misses: list[int]
+    parsed: Future[list[BatchResult]] | list[BatchResult]
+
+
+def _start_batch(
+    paths: list[Path], cache: ParseCache | None, pool: ProcessPoolExecutor | None
+) -> _PendingBatch:
+    """Load a batch's cache hits and start parsing the rest."""
+    outcomes: list[Outcome | None] = [None] * len(paths)
+    stats = {}
+    misses = []
+    for i, path in enumerate(paths):
+        if cache is not None:
+            start = time.perf_counter()
+            stats[i] = path.stat()
+            tab = _load_cached(cache, path, stats[i])
+            if tab is not None:
+                outcomes[i] = (path, tab, None, time.perf_counter() - start)
+                continue
+        misses.append(i)
+
+    miss_paths = [paths[i] for i in misses]
+    if pool is not None and miss_paths:
+        parsed = pool.submit(_parse_batch, miss_paths)
+    else:
+        parsed = _parse_batch(miss_paths)
+    return _PendingBatch(paths, outcomes, stats, misses, parsed)
+
+
+def _finish_batch(batch: _PendingBatch, cache: ParseCache | None) -> list[Outcome]:
+    """Collect a batch's parse results, storing fresh parses in the cache."""
+    parsed = batch.parsed
+    if isinstance(parsed, Future):
+        parsed = parsed.result()
+    outcomes = batch.outcomes
+    for i, (source, error, seconds) in zip(batch.misses, parsed, strict=True):
+        path = batch.paths[i]
+        if source is None:
+            outcomes[i] = (path, None, error, seconds)
+            continue
+        outcomes[i] = (path, source.tab, None, seconds)
+        if cache is not None:
+            cache.store(source, batch.stats[i])
+    return [outcome for outcome in outcomes if outcome is not None]
+
+
+def _iter_outcomes(
+    md_files: list[Path], workers: int, cache: ParseCache | None
+) -> Iterator[Outcome]:
+    """Parse files batch by batch, yielding outcomes in discovery order.
+
+    With a pool, a couple of batches per worker are kept in flight, so
+    parsing runs ahead of the consumer by a bounded amount.
+    """
+    pool = None
+    if workers > 1 and len(md_files) > 1:
+        pool = ProcessPoolExecutor(max_workers=workers)
+    window = 2 * workers if pool is not None else 0
+    pending: deque[_PendingBatch] = deque()
+    try:
+        for paths in _batches(md_files, workers):
+            pending.append(_start_batch(paths, cache, pool))
+            while len(pending) > window:
+                yield from _finish_batch(pending.popleft(), cache)
+        while pending:
+            yield from _finish_batch(pending.popleft(), cache)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+def tab_sort_key(tab: TabSummary) -> tuple[str, str]:
+    """Sort key for listings: artist, then title, ignoring case."""
+    return (tab.metadata.artist.lower(), tab.metadata.title.lower())
+
+
+def iter_tabs(
+    content_dir: Path,
+    workers: int = 1,
+    cache: ParseCache | None = None,
+    record_time: Callable[[Path, float], None] | None = None,
+    paths: Iterable[Path] | None = None,
+    all_paths: Iterable[Path] | None = None,
+) -> Iterator[Tab]:
+    """Parse the tabs directory, yielding tabs one at a time.
+
+    Tabs come out in discovery order, not sorted, unless ``paths`` gives
+    the source files to parse (e.g. from a scan). Only a bounded number of
+    files are loaded at once, so memory use does not grow with the size of
+    the corpus. Files that fail to parse are reported with a warning and
+    skipped. With a ``cache``, unchanged files are loaded from it, and once
+    iteration completes entries for deleted files are evicted; when ``paths``
+    is only some of the sources, ``all_paths`` gives all of them, so entries
+    for the rest are kept. ``record_time`` is called with each file and the
+    seconds spent parsing or loading it.
+    """
+    tabs_dir = content_dir / "tabs"
+    if not tabs_dir.exists():
+        return
+
+    md_files = list(tabs_dir.rglob("*.md") if paths is None else paths)
+    for md_file, tab, error, seconds in _iter_outcomes(md_files, workers, cache):
+        if record_time is not None:
+            record_time(md_file, seconds)
+        if tab is None:
+            print(f"Warning: Failed to parse {md_file}: {error}")
+        else:
+            yield tab
+
+    if cache is not None:
+        cache.evict_missing(
+            tabs_dir, md_files if all_paths is None else list(all_paths)
+        )
+
+
+def parse_directory(
+    content_dir: Path, workers: int = 1, cache: ParseCache | None = None
+) -> list[Tab]:
+    """Parse all markdown files in the tabs directory.
+
+    With ``workers > 1`` files are parsed in batches on a process pool. The
+    resulting order and the failure warnings are the same as a serial parse.
+    When a ``cache`` is given, unchanged files are loaded from it instead of
+    being re-parsed, and entries for deleted files are evicted.
+    """
+    tabs = list(iter_tabs(content_dir, workers=workers, cache=cache))
+    tabs.sort(key=tab_sort_key)
     return tabs
 
 
-def extract_sections(content: str) -> list[str]:
-    """Extract section headers like [Verse], [Chorus] from content."""
-    pattern = r"^\[([^\]]+)\]"
+@functools.lru_cache(maxsize=4096)
+def chord_token(token: str) -> str | None:
+    """Return the chord a token spells (ignoring parentheses), if any."""
+    token = token.strip("()")
+    return token if CHORD_PATTERN.match(token) else None
+
+
+@functools.lru_cache(maxsize=4096)
+def _chord_line_token(token: str) -> bool:
+    """Whether a token may appear on a chord line (a chord or decoration)."""
+    return chord_token(token) is not None or bool(DECORATION_PATTERN.match(token))
+
+
+def is_chord_line(line: str) -> bool:
+    """Whether a line holds only chords and decorations, with a chord."""
+    tokens = line.split()
+    return all(map(_chord_line_token, tokens)) and any(map(chord_token, tokens))
+
+
+def tokenize_lines(content: str) -> TabLines:
+    """Classify every line of tab content in a single pass.
+
+    Lines are section headers like ``[Verse]``, chord lines, tab-staff lines
+    like ``e|---0---|``, blank, or otherwise lyrics; a line opening with an
+    inline chord like ``[Am]Today`` is lyrics, not a header. Parsing does
+    this once per tab and everything downstream reads it from ``Tab.lines``.
+    """
+    kinds = bytearray()
+    bounds = array("I", [0])
     sections = []
+    start = 0
     for line in content.split("\n"):
-        match = re.match(pattern, line.strip())
-        if match:
+        start += len(line) + 1
+        bounds.append(start)
+        stripped = line.strip()
+        if not stripped:
+            kinds.append(LineKind.BLANK)
+        elif (match := SECTION_PATTERN.match(stripped)) and not chord_token(
+            match.group(1)
+        ):
             sections.append(match.group(1))
-    return sections
+            kinds.append(LineKind.SECTION)
+        elif STAFF_PATTERN.match(line):
+            kinds.append(LineKind.STAFF)
+        elif is_chord_line(stripped):
+            kinds.append(LineKind.CHORDS)
+        else:
+            kinds.append(LineKind.LYRICS)
+    return TabLines(bytes(kinds), bounds, sections)
+
+
+def extract_sections(content: str) -> list[str]:
+    """Extract section headers like [Verse], [Chorus] from content."""
+    return tokenize_lines(content).sections
@@ -0,0 +1,154 @@
+"""Overlapped build pipeline: build stages joined by bounded asyncio queues.
+
+A plain build reads, parses, renders and writes in turn, so the disk sits
+idle while pages render and the CPU sits idle while files are written. The
+pipeline runs the stages side by side instead: discovery feeds a set of
+reader threads, readers feed a process pool that parses and renders, and
+the pool feeds a set of writer threads. Results are handed back in
+discovery order, so a pipelined build gives the same output as a plain one.
+
+Every queue is bounded, and at most ``window`` items are between discovery
+and the consumer at once, so a slow stage holds the faster ones back
+rather than letting memory grow with the catalog.
+"""
+
+import asyncio
+from collections.abc import Callable, Iterable
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Generic, TypeVar
+
+DEFAULT_READERS = 8
+DEFAULT_WRITERS = 4
+DEFAULT_WINDOW = 64
+# Most jobs sent to the pool in one round trip
+DEFAULT_BATCH = 8
+
+S = TypeVar("S")
+J = TypeVar("J")
+R = TypeVar("R")
+
+# A file to write: (path, contents)
+Output = tuple[Path, bytes]
+
+
+@dataclass
+class StageLimits:
+    """How many reads and writes run at once, and how far work may run ahead.
+
+    Parsing and rendering run on the process pool the pipeline is given, so
+    their concurrency is the pool's size. Jobs that are ready together go to
+    the pool in batches of up to ``batch``, to save round trips.
+    """
+
+    readers: int = DEFAULT_READERS
+    writers: int = DEFAULT_WRITERS
+    window: int = DEFAULT_WINDOW
+    batch: int = DEFAULT_BATCH
+
+
+class Pipeline(Generic[S, J, R]):
+    """Streams paths through read, process, consume and write stages.
+
+    ``read`` runs on a thread and ``prepare`` on the event loop, turning what
+    was read into a job. ``process`` runs batches of jobs on ``pool``,
+    returning a result plus files to write for each. Results are passed to
+    ``consume`` on the event loop in discovery order, while ``write`` runs
+    on a thread for each file as soon as it is produced. If a write raises,
+    ``write_failed`` is called with the file's path and the error and the
+    pipeline carries on; without it, the error stops the pipeline.
+    """
+
+    def __init__(
+        self,
+        pool: Executor,
+        workers: int,
+        read: Callable[[Path], S],
+        prepare: Callable[[Path, S], J],
+        process: Callable[[list[J]], list[tuple[R, list[Output]]]],
+        consume: Callable[[J, R], None],
+        write: Callable[[Path, bytes], object],
+        limits: StageLimits | None = None,
+        write_failed: Callable[[Path, Exception], None] | None = None,
+    ):
+        self.pool = pool
+        self.workers = workers
+        self.read = read
+        self.prepare = prepare
+        self.process = process
+        self.consume = consume
+        self.write = write
+        self.limits = limits or StageLimits()
+        self.write_failed = write_failed
+
+    def run(self, discover: Callable[[], Iterable[Path]]) -> None:
+        """Run every path ``discover`` finds through the pipeline."""
+        asyncio.run(self._run(discover))
+
+    async def _run(self, discover: Callable[[], Iterable[Path]]) -> None:
+        loop = asyncio.get_running_loop()
+        limits = self.limits
+        # Each path's slot is resolved with its job and result once processed
+        order: asyncio.Queue[asyncio.Future[tuple[J, R]] | None]
+        order = asyncio.Queue(limits.window)
+        reads: asyncio.Queue[tuple[Path, asyncio.Future[tuple[J, R]]]]
+        reads = asyncio.Queue(limits.window)
+        jobs: asyncio.Queue[tuple[J, asyncio.Future[tuple[J, R]]]]
+        jobs = asyncio.Queue(limits.window)
+        writes: asyncio.Queue[Output] = asyncio.Queue(limits.window)
+
+        async def reader() -> None:
+            while True:
+                path, slot = await reads.get()
+                data = await asyncio.to_thread(self.read, path)
+                await jobs.put((self.prepare(path, data), slot))
+
+        async def processor() -> None:
+            while True:
+                batch = [await jobs.get()]
+                while len(batch) < limits.batch and not jobs.empty():
+                    batch.append(jobs.get_nowait())
+                results = await loop.run_in_executor(
+                    self.pool, self.process, [job for job, _ in batch]
+                )
+                for (job, slot), (result, outputs) in zip(batch, results, strict=True):
+                    for output in outputs:
+                        await writes.put(output)
+                    slot.set_result((job, result))
+
+        async def writer() -> None:
+            while True:
+                path, data = await writes.get()
+                try:
+                    await asyncio.to_thread(self.write, path, data)
+                except Exception as e:
+                    if self.write_failed is None:
+                        raise
+                    self.write_failed(path, e)
+                finally:
+                    writes.task_done()
+
+        async def consumer() -> None:
+            while (slot := await order.get()) is not None:
+                self.consume(*await slot)
+
+        async with asyncio.TaskGroup() as group:
+            stages = [group.create_task(reader()) for _ in range(limits.readers)]
+            # Two jobs per worker keep the pool busy while results come back
+            stages += [group.create_task(processor()) for _ in range(2 * self.workers)]
+            stages += [group.create_task(writer()) for _ in range(limits.writers)]
+            consuming = group.create_task(consumer())
+
+            paths = await asyncio.to_thread(lambda: list(discover()))
+            for path in paths:
+                slot = loop.create_future()
+                await order.put(slot)
+                await reads.put((path, slot))
+            await order.put(None)
+
+            # Once every result is consumed, only writes can be outstanding
+            await consuming
+            await writes.join()
+            for stage in stages:
+                stage.cancel()
@@ -0,0 +1,180 @@
+"""Build profiling: per-phase timings, slowest files and resource use.
+
+``tabstash build --profile`` records how long each phase of a build takes
+in wall-clock and CPU time, which files were slowest to parse and which
+pages were slowest to render, how much was written and the peak resident
+set size, and writes it all as a JSON report that CI can compare between
+runs.
+"""
+
+import heapq
+import json
+import os
+import sys
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, TypeVar
+
+from .output import write_totals
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+DEFAULT_PROFILE_NAME = "build-profile.json"
+
+# Files listed in each of the slowest-parse and slowest-render tables
+DEFAULT_SLOWEST = 10
+
+T = TypeVar("T")
+
+
+@dataclass
+class PhaseTiming:
+    """Time spent in one build phase, summed over every time it ran."""
+
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    calls: int = 0
+
+
+@dataclass
+class FileTiming:
+    """Time spent on one file or page."""
+
+    path: str
+    seconds: float
+
+
+@dataclass
+class BuildProfile:
+    """Where a build spent its time and memory.
+
+    CPU times are for the building process only; ``worker_cpu_seconds``
+    covers worker processes, which are only accounted for once they exit.
+    """
+
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    worker_cpu_seconds: float = 0.0
+    phases: dict[str, PhaseTiming] = field(default_factory=dict)
+    slowest_parses: list[FileTiming] = field(default_factory=list)
+    slowest_renders: list[FileTiming] = field(default_factory=list)
+    files_written: int = 0
+    bytes_written: int = 0
+    bytes_skipped: int = 0
+    peak_rss_bytes: int = 0
+    worker_peak_rss_bytes: int = 0
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+    def write(self, path: Path) -> None:
+        """Write the profile as a JSON report."""
+        path.write_text(json.dumps(self.to_dict(), indent=2) + "\n")
+
+
+def _worker_cpu_seconds() -> float:
+    """CPU time of every child process that has exited so far."""
+    times = os.times()
+    return times.children_user + times.children_system
+
+
+def peak_rss_bytes(children: bool = False) -> int:
+    """Peak resident set size of this process, or of its largest child."""
+    if resource is None:
+        return 0
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Profiler:
+    """Collects a ``BuildProfile`` while a build runs.
+
+    Phases are timed exclusively: while one phase runs inside another, such
+    as parsing pulled lazily by tab rendering, only the inner one is charged
+    for it. Only the slowest files are kept, so memory does not grow with
+    the catalog.
+    """
+
+    def __init__(self, slowest: int = DEFAULT_SLOWEST):
+        self.slowest = slowest
+        self.profile = BuildProfile()
+        self._stack: list[str] = []
+        self._slice = (0.0, 0.0)
+        self._parses: list[tuple[float, str]] = []
+        self._renders: list[tuple[float, str]] = []
+        self._started = time.perf_counter()
+        self._started_writes = write_totals()
+        self._started_cpu = time.process_time()
+        self._started_worker_cpu = _worker_cpu_seconds()
+
+    def _charge(self) -> None:
+        """Charge the running phase for the time since its slice began."""
+        wall, cpu = time.perf_counter(), time.process_time()
+        if self._stack:
+            timing = self.profile.phases.setdefault(self._stack[-1], PhaseTiming())
+            timing.wall_seconds += wall - self._slice[0]
+            timing.cpu_seconds += cpu - self._slice[1]
+        self._slice = (wall, cpu)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a block of the build as part of the named phase."""
+        self._charge()
+        self._stack.append(name)
+        self.profile.phases.setdefault(name, PhaseTiming()).calls += 1
+        try:
+            yield
+        finally:
+            self._charge()
+            self._stack.pop()
+
+    def iterate(self, name: str, items: Iterable[T]) -> Iterator[T]:
+        """Yield from ``items``, charging the time to produce each to a phase."""
+        iterator = iter(items)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def _keep(self, heap: list[tuple[float, str]], path: str, seconds: float) -> None:
+        if len(heap) < self.slowest:
+            heapq.heappush(heap, (seconds, path))
+        elif self.slowest and seconds > heap[0][0]:
+            heapq.heapreplace(heap, (seconds, path))
+
+    def record_parse(self, path: Path, seconds: float) -> None:
+        self._keep(self._parses, str(path), seconds)
+
+    def record_render(self, page: str, seconds: float) -> None:
+        self._keep(self._renders, page, seconds)
+
+    def finish(self) -> BuildProfile:
+        """Complete the profile."""
+        profile = self.profile
+        profile.wall_seconds = time.perf_counter() - self._started
+        profile.cpu_seconds = time.process_time() - self._started_cpu
+        profile.worker_cpu_seconds = _worker_cpu_seconds() - self._started_worker_cpu
+        profile.slowest_parses = [
+            FileTiming(path, seconds) for seconds, path in sorted(self._parses)[::-1]
+        ]
+        profile.slowest_renders = [
+            FileTiming(page, seconds) for seconds, page in sorted(self._renders)[::-1]
+        ]
+        writes = write_totals() - self._started_writes
+        profile.files_written = writes.files_written
+        profile.bytes_written = writes.bytes_written
+        profile.bytes_skipped = writes.bytes_skipped
+        profile.peak_rss_bytes = peak_rss_bytes()
+        profile.worker_peak_rss_bytes = peak_rss_bytes(children=True)
+        return profile
@@ -0,0 +1,243 @@
+"""Incremental source scanning with a snapshot of directory and file stats.
+
+A build records the mtime of every source directory and the mtime and size
+of every source file in a snapshot saved next to the build manifest. The
+next incremental build only lists directories whose mtime moved, since
+adding, removing or renaming a file always touches its directory; for the
+rest it re-stats the files it already knows about, because editing a file
+in place does not touch its directory. The differences come back as a
+``ScanDelta`` of added, modified and deleted files, and files outside the
+delta can reuse the hashes the previous build recorded.
+"""
+
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .output import write_file
+
+SNAPSHOT_NAME = ".tabstash-scan.json"
+SNAPSHOT_VERSION = 1
+
+# Mtimes this close to the time of a scan are not trusted: a file or
+# directory changed again within the filesystem's timestamp granularity can
+# end up with the same mtime it was recorded with. They are recorded as
+# UNSETTLED instead, so the next scan cannot mistake them for unchanged.
+RACY_NS = 2_000_000_000
+UNSETTLED = -1
+
+# (mtime_ns, size)
+FileStat = tuple[int, int]
+
+
+@dataclass
+class DirectoryEntry:
+    """A scanned directory: its mtime, its files and its subdirectories."""
+
+    mtime_ns: int
+    files: dict[str, FileStat] = field(default_factory=dict)
+    directories: list[str] = field(default_factory=list)
+
+
+@dataclass
+class ScanDelta:
+    """Source files added, modified and deleted since the previous scan."""
+
+    added: set[Path] = field(default_factory=set)
+    modified: set[Path] = field(default_factory=set)
+    deleted: set[Path] = field(default_factory=set)
+
+    def changed(self) -> set[Path]:
+        """Every file that is new or whose contents may have changed."""
+        return self.added | self.modified
+
+
+@dataclass
+class Snapshot:
+    """Stats of every directory under ``root`` and of the files in them.
+
+    ``directories`` is keyed by POSIX path relative to ``root`` ("." for
+    the root itself). Only files whose name ends in ``suffix`` are kept.
+    """
+
+    root: Path
+    suffix: str = ""
+    directories: dict[str, DirectoryEntry] = field(default_factory=dict)
+
+    def files(self) -> dict[Path, FileStat]:
+        """The stat of every file in the snapshot, by path."""
+        return {
+            self.root / directory / name: stat
+            for directory, entry in self.directories.items()
+            for name, stat in entry.files.items()
+        }
+
+    def paths(self) -> list[Path]:
+        """Every file in the snapshot, sorted."""
+        return sorted(self.files())
+
+    @classmethod
+    def load(cls, path: Path, root: Path, suffix: str = "") -> "Snapshot | None":
+        """Load a snapshot of ``root``, returning None if it is unusable."""
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+        if (
+            not isinstance(data, dict)
+            or data.get("version") != SNAPSHOT_VERSION
+            or data.get("root") != str(root)
+            or data.get("suffix") != suffix
+        ):
+            return None
+        try:
+            return cls(
+                root=root,
+                suffix=suffix,
+                directories={
+                    key: DirectoryEntry(
+                        mtime_ns=entry["mtime_ns"],
+                        files={
+                            name: (stat[0], stat[1])
+                            for name, stat in entry["files"].items()
+                        },
+                        directories=list(entry["directories"]),
+                    )
+                    for key, entry in data["directories"].items()
+                },
+            )
+        except (KeyError, TypeError, IndexError, ValueError):
+            return None
+
+    def save(self, path: Path) -> None:
+        """Write the snapshot as JSON."""
+        data = {
+            "version": SNAPSHOT_VERSION,
+            "root": str(self.root),
+            "suffix": self.suffix,
+            "directories": {
+                key: {
+                    "mtime_ns": entry.mtime_ns,
+                    "files": entry.files,
+                    "directories": entry.directories,
+                }
+                for key, entry in self.directories.items()
+            },
+        }
+        write_file(path, json.dumps(data, sort_keys=True).encode())
+
+
+def _settled(mtime_ns: int, now_ns: int) -> int:
+    """An mtime to record, or UNSETTLED if it is too recent to trust."""
+    return mtime_ns if mtime_ns < now_ns - RACY_NS else UNSETTLED
+
+
+def _list_directory(
+    path: str, suffix: str, now_ns: int, settle_files: bool
+) -> DirectoryEntry | None:
+    """Read a directory's listing and stat its files, skipping hidden ones."""
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+        entries = list(os.scandir(path))
+    except OSError:
+        return None
+    directory = DirectoryEntry(_settled(mtime_ns, now_ns))
+    for entry in entries:
+        if entry.name.startswith("."):
+            continue
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                directory.directories.append(entry.name)
+            elif entry.name.endswith(suffix) and entry.is_file():
+                stat = entry.stat()
+                mtime_ns = stat.st_mtime_ns
+                if settle_files:
+                    mtime_ns = _settled(mtime_ns, now_ns)
+                directory.files[entry.name] = (mtime_ns, stat.st_size)
+        except OSError:
+            continue
+    directory.directories.sort()
+    return directory
+
+
+def _restat_directory(
+    path: str, known: DirectoryEntry, now_ns: int, settle_files: bool
+) -> DirectoryEntry:
+    """Re-stat the files of a directory whose listing has not changed."""
+    directory = DirectoryEntry(known.mtime_ns, directories=known.directories)
+    for name in known.files:
+        try:
+            stat = os.stat(os.path.join(path, name))
+        except OSError:
+            # Gone after all; the directory's mtime should have said so
+            continue
+        mtime_ns = stat.st_mtime_ns
+        if settle_files:
+            mtime_ns = _settled(mtime_ns, now_ns)
+        directory.files[name] = (mtime_ns, stat.st_size)
+    return directory
+
+
+def scan(
+    root: Path,
+    previous: Snapshot | None = None,
+    suffix: str = "",
+    settle_files: bool = True,
+) -> tuple[Snapshot, ScanDelta]:
+    """Snapshot the files under ``root`` and diff them against ``previous``.
+
+    Directories whose mtime matches ``previous`` are not listed again; only
+    the files they held are stat'ed again. Hidden files and directories are
+    skipped, and symlinked directories are not followed. Without a
+    ``previous`` snapshot every file counts as added.
+
+    With ``settle_files=False`` file mtimes are recorded as they are, even
+    recent ones, for a watcher that keeps its snapshot in memory and wants
+    each edit reported once; directories are still listed again for as
+    long as their mtimes are too recent to trust.
+    """
+    if previous is not None and (previous.root, previous.suffix) != (root, suffix):
+        previous = None
+    known_directories = previous.directories if previous is not None else {}
+    now_ns = time.time_ns()
+    snapshot = Snapshot(root, suffix)
+    delta = ScanDelta()
+    stack = ["."] if root.is_dir() else []
+    while stack:
+        key = stack.pop()
+        path = os.path.join(root, key)
+        known = known_directories.get(key)
+        entry: DirectoryEntry | None = None
+        if known is not None and known.mtime_ns != UNSETTLED:
+            try:
+                unchanged = os.stat(path).st_mtime_ns == known.mtime_ns
+            except OSError:
+                continue
+            if unchanged:
+                entry = _restat_directory(path, known, now_ns, settle_files)
+        if entry is None:
+            entry = _list_directory(path, suffix, now_ns, settle_files)
+            if entry is None:
+                continue
+        snapshot.directories[key] = entry
+        stack.extend(
+            name if key == "." else f"{key}/{name}" for name in entry.directories
+        )
+
+        # Diff by name, so only changed files are turned into paths
+        known_files = known.files if known is not None else {}
+        for name, stat in entry.files.items():
+            old = known_files.get(name)
+            if old is None:
+                delta.added.add(root / key / name)
+            elif old != stat or old[0] == UNSETTLED:
+                delta.modified.add(root / key / name)
+        delta.deleted.update(
+            root / key / name for name in known_files.keys() - entry.files.keys()
+        )
+
+    for key in known_directories.keys() - snapshot.directories.keys():
+        delta.deleted.update(root / key / name for name in known_directories[key].files)
+    return snapshot, delta
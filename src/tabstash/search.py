@@ -1,28 +1,324 @@
 """Generate search index for MiniSearch."""
 
+import functools
+import hashlib
 import json
+import re
+import unicodedata
+from collections.abc import Iterable
 from pathlib import Path
+from typing import Any
 
-from .models import SearchDocument, Tab
+from .compress import compressed_sizes, write_compressed
+from .models import TabSummary
+from .output import write_file
+
+# Must match the MiniSearch options in static/js/search.js
+FIELDS = ["title", "artist", "tags"]
+STORE_FIELDS = ["title", "artist", "url", "tags"]
+
+# MiniSearch's loadJSON format version this module writes
+SERIALIZATION_VERSION = 2
+
+# Directory, next to the root index file, that holds index shards
+SHARD_DIR_NAME = "search-index"
+
+# Compact layout (see MiniSearchIndex.to_compact) and its field encodings
+COMPACT_FORMAT = "tabstash-compact-1"
+INTERNED_FIELDS = {"artist"}
+DERIVED_FIELDS = {"url"}
+
+
+@functools.cache
+def _separator_table() -> dict[int, str]:
+    """Translation table mapping ``[\\n\\r\\p{Z}\\p{P}]`` (tokenizer.js) to spaces.
+
+    Separators and punctuation only live in the first three planes, so only
+    those are scanned. ``str.translate`` plus a split on spaces is several
+    times faster than a regex with the equivalent character class.
+    """
+    table = {0x0A: " ", 0x0D: " "}
+    for code in range(0x30000):
+        if unicodedata.category(chr(code))[0] in "ZP":
+            table[code] = " "
+    return table
+
+
+_SPACES = re.compile(" +")
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into raw tokens exactly like static/js/tokenizer.js."""
+    return _SPACES.split(text.translate(_separator_table()))
+
+
+def process_term(term: str) -> str:
+    """Normalise a token exactly like static/js/tokenizer.js."""
+    return term.lower()
+
+
+def _field_text(value: Any) -> str:
+    """Stringify a field value the way JavaScript's ``toString`` does."""
+    if isinstance(value, list):
+        return ",".join(_field_text(item) for item in value)
+    return str(value)
+
+
+class MiniSearchIndex:
+    """Builds a MiniSearch index in Python and serializes it for ``loadJSON``.
+
+    This mirrors ``MiniSearch.add`` so the browser only has to deserialize
+    the index instead of tokenizing every document on page load.
+    """
+
+    def __init__(self, fields: list[str], store_fields: list[str]):
+        self.fields = fields
+        self.store_fields = store_fields
+        self.field_ids = {name: i for i, name in enumerate(fields)}
+        self.document_ids: dict[int, str] = {}
+        self.field_length: dict[int, list[int]] = {}
+        self.average_field_length: list[float] = [0] * len(fields)
+        self.stored_fields: dict[int, dict[str, Any]] = {}
+        # term -> field id -> short document id -> term frequency
+        self.index: dict[str, dict[int, dict[int, int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.document_ids)
+
+    def add(self, document: dict[str, Any]) -> None:
+        """Index a document, which must have an ``id`` key."""
+        short_id = len(self.document_ids)
+        self.document_ids[short_id] = document["id"]
+        self.stored_fields[short_id] = {
+            name: document[name] for name in self.store_fields if name in document
+        }
+
+        lengths: list[int] = [0] * len(self.fields)
+        for name, field_id in self.field_ids.items():
+            tokens = tokenize(_field_text(document[name]))
+            lengths[field_id] = len(set(tokens))
+
+            # Running average, computed the same way MiniSearch does
+            average = self.average_field_length[field_id]
+            total = average * short_id + lengths[field_id]
+            self.average_field_length[field_id] = total / (short_id + 1)
+
+            for token in tokens:
+                term = process_term(token)
+                if not term:
+                    continue
+                postings = self.index.setdefault(term, {}).setdefault(field_id, {})
+                postings[short_id] = postings.get(short_id, 0) + 1
+        self.field_length[short_id] = lengths
+
+    def _select(self, terms: Iterable[str] | None) -> tuple[list[str], list[int]]:
+        """Resolve a term subset and the documents its postings point at."""
+        if terms is None:
+            return list(self.index), list(self.document_ids)
+        terms = list(terms)
+        doc_ids = {
+            doc_id
+            for term in terms
+            for postings in self.index[term].values()
+            for doc_id in postings
+        }
+        return terms, sorted(doc_ids)
+
+    def to_dict(self, terms: Iterable[str] | None = None) -> dict[str, Any]:
+        """Return the index in MiniSearch's ``toJSON`` layout.
+
+        With ``terms``, only those terms and the documents they point at are
+        included. Document counts and average field lengths stay global, so
+        scores from such a partial index match the full one.
+        """
+        terms, doc_ids = self._select(terms)
+        return {
+            "documentCount": len(self.document_ids),
+            "nextId": len(self.document_ids),
+            "documentIds": {i: self.document_ids[i] for i in doc_ids},
+            "fieldIds": self.field_ids,
+            "fieldLength": {i: self.field_length[i] for i in doc_ids},
+            "averageFieldLength": self.average_field_length,
+            "storedFields": {i: self.stored_fields[i] for i in doc_ids},
+            "dirtCount": 0,
+            "index": [
+                [term, {str(f): docs for f, docs in self.index[term].items()}]
+                for term in terms
+            ],
+            "serializationVersion": SERIALIZATION_VERSION,
+        }
+
+    def to_compact(self, terms: Iterable[str] | None = None) -> dict[str, Any]:
+        """Return the index in TabStash's compact columnar layout.
+
+        Per-document data is stored as parallel arrays instead of objects,
+        fields in ``INTERNED_FIELDS`` are replaced by indexes into a lookup
+        table, fields in ``DERIVED_FIELDS`` are dropped (search.js rebuilds
+        them from the document id), and postings are flat ``[doc gap, freq]``
+        runs. search.js expands this back into the ``toJSON`` layout.
+        """
+        terms, doc_ids = self._select(terms)
+        stored: dict[str, list[Any]] = {}
+        interned: dict[str, list[Any]] = {}
+        for name in self.store_fields:
+            if name in DERIVED_FIELDS:
+                continue
+            column = [self.stored_fields[i].get(name) for i in doc_ids]
+            if name in INTERNED_FIELDS:
+                table = list(dict.fromkeys(column))
+                positions = {value: i for i, value in enumerate(table)}
+                column = [positions[value] for value in column]
+                interned[name] = table
+            stored[name] = column
+
+        postings = []
+        for term in terms:
+            runs = []
+            for field_id, docs in self.index[term].items():
+                flat, previous = [], 0
+                for doc_id in sorted(docs):
+                    flat += [doc_id - previous, docs[doc_id]]
+                    previous = doc_id
+                runs.append([field_id, flat])
+            postings.append(runs)
+
+        compact = {
+            "format": COMPACT_FORMAT,
+            "documentCount": len(self.document_ids),
+            "fields": self.fields,
+            "averageFieldLength": self.average_field_length,
+            "ids": [self.document_ids[i] for i in doc_ids],
+            "fieldLength": [n for i in doc_ids for n in self.field_length[i]],
+            "stored": stored,
+            "interned": interned,
+            "terms": terms,
+            "postings": postings,
+        }
+        if doc_ids != list(range(len(doc_ids))):
+            compact["docs"] = doc_ids
+        return compact
+
+    def serialize(
+        self, terms: Iterable[str] | None = None, compact: bool = False
+    ) -> str:
+        """Serialize the (partial) index to JSON text."""
+        data = self.to_compact(terms) if compact else self.to_dict(terms)
+        return json.dumps(data, separators=(",", ":"))
+
+    def shards(self, prefix_length: int) -> dict[str, list[str]]:
+        """Group the index terms into shards keyed by term prefix."""
+        groups: dict[str, list[str]] = {}
+        for term in self.index:
+            groups.setdefault(term[:prefix_length], []).append(term)
+        return dict(sorted(groups.items()))
+
+
+def build_search_index(
+    tabs: Iterable[TabSummary], base_url: str = ""
+) -> MiniSearchIndex:
+    """Index every tab with the same options the browser uses."""
+    index = MiniSearchIndex(FIELDS, STORE_FIELDS)
+    for tab in tabs:
+        # The fields the browser searches and shows in results
+        index.add(
+            {
+                "id": f"{tab.artist_slug}/{tab.slug}",
+                "title": tab.metadata.title,
+                "artist": tab.metadata.artist,
+                "tags": tab.metadata.tags,
+                "url": f"{base_url}/tabs/{tab.artist_slug}/{tab.slug}.html",
+            }
+        )
+    return index
+
+
+def write_sharded_index(
+    index: MiniSearchIndex,
+    output_path: Path,
+    prefix_length: int,
+    compact: bool,
+    fast: bool = False,
+) -> set[str]:
+    """Write one partial index per term prefix plus a small root manifest.
+
+    Shards go in a ``search-index/`` directory next to ``output_path`` under
+    content-hashed names, and ``output_path`` maps each prefix to its shard.
+    The browser only fetches the shards a query needs, so the initial
+    download does not grow with the catalog. Returns the shard file names.
+    """
+    shard_dir = output_path.parent / SHARD_DIR_NAME
+    shard_dir.mkdir(parents=True, exist_ok=True)
+
+    files = {}
+    for key, terms in index.shards(prefix_length).items():
+        data = index.serialize(terms, compact=compact).encode()
+        name = hashlib.sha256(data).hexdigest()[:16] + ".json"
+        write_file(shard_dir / name, data)
+        write_compressed(shard_dir / name, data, fast=fast)
+        files[key] = name
+
+    manifest = {
+        "prefixLength": prefix_length,
+        "documentCount": len(index),
+        "shards": files,
+    }
+    data = json.dumps(manifest, separators=(",", ":")).encode()
+    write_file(output_path, data)
+    write_compressed(output_path, data, fast=fast)
+    return set(files.values())
 
 
 def generate_search_index(
-    tabs: list[Tab], output_path: Path, base_url: str = ""
+    tabs: Iterable[TabSummary],
+    output_path: Path,
+    base_url: str = "",
+    shard_prefix: int = 0,
+    compact: bool = False,
+    fast: bool = False,
 ) -> int:
-    """Generate JSON search index for MiniSearch.
+    """Generate a prebuilt search index plus ``.gz``/``.br`` siblings.
+
+    The default layout loads directly with MiniSearch's ``loadJSON``; with
+    ``compact=True`` the smaller columnar layout from ``to_compact`` is used.
+    With ``shard_prefix > 0`` the index is split into shards by the first
+    ``shard_prefix`` characters of each term (see ``write_sharded_index``).
+    ``fast`` compresses the siblings quickly rather than as small as possible
+    (see ``write_compressed``).
 
     Returns the number of documents indexed.
     """
-    documents = [
-        SearchDocument(
-            id=f"{tab.artist_slug}/{tab.slug}",
-            title=tab.metadata.title,
-            artist=tab.metadata.artist,
-            tags=tab.metadata.tags,
-            url=f"{base_url}/tabs/{tab.artist_slug}/{tab.slug}.html",
-        ).model_dump()
-        for tab in tabs
-    ]
-
-    output_path.write_text(json.dumps(documents, indent=2))
-    return len(documents)
+    index = build_search_index(tabs, base_url)
+    shards: set[str] = set()
+    if shard_prefix > 0:
+        shards = write_sharded_index(index, output_path, shard_prefix, compact, fast)
+    else:
+        data = index.serialize(compact=compact).encode()
+        write_file(output_path, data)
+        write_compressed(output_path, data, fast=fast)
+
+    # Shards are named by content, so unchanged ones were left as they were
+    shard_dir = output_path.parent / SHARD_DIR_NAME
+    if shard_dir.exists():
+        for path in shard_dir.iterdir():
+            if path.name.removesuffix(".gz").removesuffix(".br") not in shards:
+                path.unlink()
+        if not shards:
+            shard_dir.rmdir()
+    return len(index)
+
+
+def search_index_sizes(output_path: Path) -> dict[str, int]:
+    """Total raw and compressed bytes of a written search index.
+
+    Covers the root file and, for a sharded index, every shard.
+    """
+    files = [output_path]
+    shard_dir = output_path.parent / SHARD_DIR_NAME
+    if shard_dir.exists():
+        files.extend(sorted(shard_dir.glob("*.json")))
+
+    totals: dict[str, int] = {}
+    for path in files:
+        for encoding, size in compressed_sizes(path).items():
+            totals[encoding] = totals.get(encoding, 0) + size
+    return totals
@@ -0,0 +1,368 @@
+"""Threaded HTTP server for a built site.
+
+Serves the output directory with what a production mirror needs:
+precompressed ``.br``/``.gz`` siblings picked by ``Accept-Encoding``,
+``ETag`` and ``Last-Modified`` validators answered with 304, single byte
+ranges, and ``Cache-Control`` that lets fingerprinted assets be cached for
+good. Each connection gets its own thread, and small files are kept in a
+size-bounded LRU cache that checks a file's mtime and size before trusting
+its entry.
+"""
+
+import email.utils
+import mimetypes
+import os
+import posixpath
+import re
+import threading
+import urllib.parse
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import BinaryIO, NamedTuple
+
+from .assets import FINGERPRINT_LENGTH
+from .compress import COMPRESSED_SUFFIXES, sibling
+
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+# Fingerprinted assets never change under the same name; everything else
+# is revalidated with its ETag
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Encodings to serve, most preferred first
+PREFERRED_ENCODINGS = ("br", "gzip")
+
+_ENCODING_SUFFIXES = {
+    encoding: suffix for suffix, encoding in COMPRESSED_SUFFIXES.items()
+}
+_FINGERPRINTED = re.compile(rf"/static/.+\.[0-9a-f]{{{FINGERPRINT_LENGTH}}}\.\w+")
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)")
+_TEXT_TYPES = ("text/", "application/javascript", "application/json")
+
+
+class FileInfo(NamedTuple):
+    """A file on disk as of one ``stat`` call."""
+
+    path: Path
+    size: int
+    mtime_ns: int
+
+    @classmethod
+    def stat(cls, path: Path) -> "FileInfo":
+        stat = path.stat()
+        return cls(path, stat.st_size, stat.st_mtime_ns)
+
+    @classmethod
+    def fstat(cls, path: Path, f: BinaryIO) -> "FileInfo":
+        """The file ``f``, opened from ``path``, as it is now."""
+        stat = os.fstat(f.fileno())
+        return cls(path, stat.st_size, stat.st_mtime_ns)
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.mtime_ns:x}-{self.size:x}"'
+
+
+class FileCache:
+    """Size-bounded LRU cache of file contents.
+
+    Entries are keyed by path and only used while the file's mtime and size
+    still match, so rewritten files are picked up without any invalidation.
+    Files bigger than ``max_file_bytes`` are never cached.
+    """
+
+    def __init__(
+        self, max_bytes: int = DEFAULT_CACHE_BYTES, max_file_bytes: int | None = None
+    ):
+        self.max_bytes = max_bytes
+        self.max_file_bytes = (
+            max_bytes // 8 if max_file_bytes is None else max_file_bytes
+        )
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Path, tuple[int, int, bytes]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """Bytes of file contents currently cached."""
+        return self._size
+
+    def get(self, info: FileInfo, f: BinaryIO | None = None) -> bytes | None:
+        """Return a file's contents, or None if it is too big to cache.
+
+        On a miss the contents are read from ``f`` if given, so they come
+        from the same open file ``info`` describes.
+        """
+        if info.size > self.max_file_bytes:
+            return None
+        with self._lock:
+            entry = self._entries.get(info.path)
+            if entry is not None and entry[:2] == (info.mtime_ns, info.size):
+                self._entries.move_to_end(info.path)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+
+        data = info.path.read_bytes() if f is None else f.read()
+        if len(data) != info.size:
+            # Rewritten since it was stat'ed; serve it but don't keep it
+            return data
+        with self._lock:
+            old = self._entries.pop(info.path, None)
+            if old is not None:
+                self._size -= len(old[2])
+            self._entries[info.path] = (info.mtime_ns, info.size, data)
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+        return data
+
+
+def accepted_encodings(header: str | None) -> set[str]:
+    """Content codings an ``Accept-Encoding`` header allows."""
+    accepted = set()
+    for part in (header or "").split(","):
+        name, *params = part.split(";")
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name.strip() and quality > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """Read a single ``bytes=`` range as (start, end), end exclusive.
+
+    Returns None for headers to ignore, such as other units or several
+    ranges, and an empty range when the range cannot be satisfied.
+    """
+    match = _RANGE.fullmatch(header.strip())
+    if match is None or match.group(1, 2) == ("", ""):
+        return None
+    first, last = match.group(1, 2)
+    if not first:
+        return max(size - int(last), 0) if int(last) else size, size
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    end = min(int(last) + 1, size) if last else size
+    return start, max(end, start)
+
+
+def content_type(path: Path) -> str:
+    """The Content-Type to serve a file with."""
+    kind = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    return f"{kind}; charset=utf-8" if kind.startswith(_TEXT_TYPES) else kind
+
+
+class SiteRequestHandler(BaseHTTPRequestHandler):
+    """Serves files from the server's ``root``."""
+
+    server: "SiteServer"
+    protocol_version = "HTTP/1.1"
+    server_version = "TabStash"
+    # Drop idle keep-alive connections instead of holding a thread forever
+    timeout = 30
+
+    def do_GET(self) -> None:
+        self.serve(body=True)
+
+    def do_HEAD(self) -> None:
+        self.serve(body=False)
+
+    def log_message(self, format: str, *args) -> None:
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def serve(self, body: bool) -> None:
+        """Answer a GET or HEAD request from the site directory."""
+        url_path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
+        path = self.resolve(url_path)
+        if path is None:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        if path.is_dir():
+            if not url_path.endswith("/"):
+                self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+                self.send_header("Location", url_path + "/")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            path = path / "index.html"
+        try:
+            self.send_file(path, url_path, body)
+        except (FileNotFoundError, NotADirectoryError):
+            self.send_error(HTTPStatus.NOT_FOUND)
+
+    def resolve(self, url_path: str) -> Path | None:
+        """Map a URL path into the site directory, refusing hidden files."""
+        parts = [part for part in posixpath.normpath(url_path).split("/") if part]
+        if "\x00" in url_path or any(part.startswith(".") for part in parts):
+            return None
+        return self.server.root.joinpath(*parts)
+
+    def send_file(self, path: Path, url_path: str, body: bool) -> None:
+        """Send a file, or a precompressed sibling or byte range of it.
+
+        The headers describe the open file the body is read from, so a
+        build swapping the site in mid-request cannot make them disagree.
+        """
+        original = FileInfo.stat(path)
+        info, encoding = original, None
+        range_header = self.headers.get("Range")
+        if range_header is None:
+            info, encoding = self.select_encoding(original)
+        with info.path.open("rb") as f:
+            self.send_open_file(f, info.path, path, url_path, encoding, body)
+
+    def send_open_file(
+        self,
+        f: BinaryIO,
+        file_path: Path,
+        path: Path,
+        url_path: str,
+        encoding: str | None,
+        body: bool,
+    ) -> None:
+        """Send ``f`` (``path`` itself or a compressed sibling of it)."""
+        info = FileInfo.fstat(file_path, f)
+        data = self.server.cache.get(info, f) if body else None
+        if data is not None and len(data) != info.size:
+            # Rewritten in place while it was read: describe what was read
+            info = FileInfo(file_path, len(data), FileInfo.fstat(file_path, f).mtime_ns)
+        range_header = self.headers.get("Range")
+
+        cache_control = REVALIDATE
+        if _FINGERPRINTED.fullmatch(url_path):
+            cache_control = IMMUTABLE
+        validators = [
+            ("ETag", info.etag),
+            (
+                "Last-Modified",
+                email.utils.formatdate(info.mtime_ns / 1e9, usegmt=True),
+            ),
+            ("Cache-Control", cache_control),
+            ("Vary", "Accept-Encoding"),
+        ]
+        if self.not_modified(info):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_headers(validators)
+            return
+
+        start, end = 0, info.size
+        status = HTTPStatus.OK
+        if_range = self.headers.get("If-Range")
+        if range_header is not None and if_range in (None, info.etag):
+            byte_range = parse_range(range_header, info.size)
+            if byte_range is not None and byte_range[0] >= byte_range[1]:
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_headers(
+                    [("Content-Range", f"bytes */{info.size}"), ("Content-Length", "0")]
+                )
+                return
+            if byte_range is not None:
+                start, end = byte_range
+                status = HTTPStatus.PARTIAL_CONTENT
+
+        headers = [
+            ("Content-Type", content_type(path)),
+            ("Content-Length", str(end - start)),
+            ("Accept-Ranges", "bytes"),
+        ]
+        if encoding is not None:
+            headers.append(("Content-Encoding", encoding))
+        if status == HTTPStatus.PARTIAL_CONTENT:
+            headers.append(("Content-Range", f"bytes {start}-{end - 1}/{info.size}"))
+        self.send_response(status)
+        self.send_headers(headers + validators)
+        if body:
+            self.write_body(f, data, start, end)
+
+    def send_headers(self, headers: list[tuple[str, str]]) -> None:
+        """Send response headers and end the header block."""
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+
+    def select_encoding(self, original: FileInfo) -> tuple[FileInfo, str | None]:
+        """Pick the best precompressed sibling the client accepts.
+
+        Siblings older than the file itself are ignored as stale.
+        """
+        accepted = accepted_encodings(self.headers.get("Accept-Encoding"))
+        for encoding in PREFERRED_ENCODINGS:
+            if encoding not in accepted:
+                continue
+            try:
+                info = FileInfo.stat(
+                    sibling(original.path, _ENCODING_SUFFIXES[encoding])
+                )
+            except OSError:
+                continue
+            if info.mtime_ns >= original.mtime_ns:
+                return info, encoding
+        return original, None
+
+    def not_modified(self, info: FileInfo) -> bool:
+        """Whether the request's validators match the file being sent."""
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or info.etag in tags
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is None:
+            return False
+        try:
+            since = email.utils.parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return info.mtime_ns // 1_000_000_000 <= since.timestamp()
+
+    def write_body(self, f: BinaryIO, data: bytes | None, start: int, end: int) -> None:
+        """Write bytes ``start:end`` of a file, from ``data`` if it was cached."""
+        if data is not None:
+            self.wfile.write(memoryview(data)[start:end])
+            return
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = f.read(min(remaining, 1 << 16))
+            if not chunk:
+                # Truncated in place mid-send: the body is short of its
+                # Content-Length, so the connection cannot be reused
+                self.close_connection = True
+                break
+            self.wfile.write(chunk)
+            remaining -= len(chunk)
+
+
+class SiteServer(ThreadingHTTPServer):
+    """Serves a site directory, one thread per connection."""
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        root: Path,
+        cache: FileCache | None = None,
+        quiet: bool = False,
+        handler: type[BaseHTTPRequestHandler] = SiteRequestHandler,
+    ):
+        self.root = root
+        self.cache = FileCache() if cache is None else cache
+        self.quiet = quiet
+        super().__init__(address, handler)
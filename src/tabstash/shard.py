@@ -0,0 +1,160 @@
+"""Sharded builds: splitting a catalog across machines and merging the parts.
+
+``tabstash build --shard K/N`` builds only the tabs whose artist hashes to
+shard K of N: their tab and artist pages, search indexes over just those
+tabs, and a metadata file holding the tabs' summaries. ``tabstash merge``
+then puts the shards' pages together and writes the home page and the
+search indexes for the whole catalog from the metadata files and partial
+indexes, without parsing any tab again.
+"""
+
+import hashlib
+import heapq
+import json
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from .fulltext import (
+    CHORDS_INDEX_NAME,
+    LYRICS_INDEX_NAME,
+    FullTextIndexer,
+    PositionalIndex,
+)
+from .manifest import MANIFEST_NAME
+from .models import Metadata, TabSummary
+from .output import write_file
+from .scan import SNAPSHOT_NAME
+from .search import SHARD_DIR_NAME
+
+SHARD_METADATA_NAME = ".tabstash-shard.json"
+SHARD_FORMAT = "tabstash-shard-1"
+
+# Top-level outputs a merge writes for the whole catalog instead of copying
+# them from the shards (compressed siblings included)
+MERGED_NAMES = {
+    "index.html",
+    "index",
+    "artists.html",
+    "artists",
+    "search-index.json",
+    SHARD_DIR_NAME,
+    LYRICS_INDEX_NAME,
+    CHORDS_INDEX_NAME,
+    MANIFEST_NAME,
+    SNAPSHOT_NAME,
+    SHARD_METADATA_NAME,
+}
+
+
+def parse_shard(spec: str) -> tuple[int, int]:
+    """Parse ``K/N`` into ``(K, N)``, for shard K of N counting from 1."""
+    index, separator, count = spec.partition("/")
+    try:
+        shard = (int(index), int(count))
+    except ValueError:
+        raise ValueError(f"expected K/N, got {spec!r}") from None
+    if not separator or not 1 <= shard[0] <= shard[1]:
+        raise ValueError(f"expected K/N with 1 <= K <= N, got {spec!r}")
+    return shard
+
+
+def shard_of(artist_slug: str, count: int) -> int:
+    """Which of ``count`` shards (counting from 1) builds an artist's tabs.
+
+    Uses a digest rather than ``hash``, which is salted per process, so
+    every machine puts an artist in the same shard.
+    """
+    digest = hashlib.sha256(artist_slug.encode()).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+@dataclass
+class ShardMetadata:
+    """What one shard built, for merging it without re-parsing its tabs.
+
+    ``tabs`` are sorted by source path, the order the shard's lyric and
+    chord indexes hold them in. Source paths are stored relative to the
+    content directory, since shards may be built in different checkouts.
+    """
+
+    shard: tuple[int, int]
+    options: dict[str, Any]
+    assets: dict[str, str]
+    tabs: list[TabSummary]
+
+    @classmethod
+    def load(cls, path: Path, content_dir: Path) -> "ShardMetadata | None":
+        """Load a shard's metadata, returning None if it is missing or unusable."""
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("format") != SHARD_FORMAT:
+            return None
+        try:
+            index, count = data["shard"]
+            return cls(
+                shard=(index, count),
+                options=dict(data["options"]),
+                assets=dict(data["assets"]),
+                tabs=[
+                    TabSummary(
+                        metadata=Metadata(**tab["metadata"]),
+                        source_path=content_dir / tab["source"],
+                        slug=tab["slug"],
+                        artist_slug=tab["artist_slug"],
+                    )
+                    for tab in data["tabs"]
+                ],
+            )
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def save(self, path: Path, content_dir: Path) -> None:
+        """Write the metadata as JSON."""
+        data = {
+            "format": SHARD_FORMAT,
+            "shard": list(self.shard),
+            "options": self.options,
+            "assets": self.assets,
+            "tabs": [
+                {
+                    "source": tab.source_path.relative_to(content_dir).as_posix(),
+                    "slug": tab.slug,
+                    "artist_slug": tab.artist_slug,
+                    "metadata": asdict(tab.metadata),
+                }
+                for tab in self.tabs
+            ],
+        }
+        write_file(path, json.dumps(data, sort_keys=True).encode())
+
+
+def _load_index(path: Path, max_postings: int | None) -> PositionalIndex:
+    return PositionalIndex.from_dict(json.loads(path.read_bytes()), max_postings)
+
+
+def merge_fulltext(shards: list[tuple[Path, ShardMetadata]]) -> FullTextIndexer:
+    """Combine the shards' lyric and chord indexes into one indexer.
+
+    Documents are interleaved by source path, the order an unsharded build
+    adds them in, so the merged indexes come out the same as its indexes.
+    Raises ``ValueError`` if a shard's indexes do not match its metadata.
+    """
+    indexer = FullTextIndexer()
+    streams = []
+    for directory, metadata in shards:
+        lyrics = _load_index(directory / LYRICS_INDEX_NAME, indexer.lyrics.max_postings)
+        chords = _load_index(directory / CHORDS_INDEX_NAME, indexer.chords.max_postings)
+        ids = [f"{tab.artist_slug}/{tab.slug}" for tab in metadata.tabs]
+        if lyrics.ids != ids or chords.ids != ids:
+            raise ValueError(f"the search indexes in {directory} do not match its tabs")
+        indexer.lyrics.stop |= lyrics.stop
+        indexer.chords.stop |= chords.stop
+        paths = [tab.source_path for tab in metadata.tabs]
+        streams.append(zip(paths, lyrics.documents(), chords.documents(), strict=True))
+    for _, lyric, chord in heapq.merge(*streams, key=lambda item: item[0]):
+        indexer.lyrics.add_positions(*lyric)
+        indexer.chords.add_positions(*chord)
+    return indexer
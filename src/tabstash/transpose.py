@@ -0,0 +1,228 @@
+"""Precomputed chord transposition for tab pages.
+
+Each distinct chord line of a tab is compiled once into its tokens and the
+pitch classes of its chord roots and bass notes. Every root in the tab is
+then shifted through all twelve semitones with one ``bytes.translate`` per
+key, and the lines are re-spelled for that key. Tab pages embed the result
+so switching keys in the browser is just swapping text.
+"""
+
+import re
+from typing import Any, NamedTuple
+
+from .models import LineKind, TabLines
+from .parser import chord_token
+
+PITCH_CLASSES = {
+    "C": 0, "C#": 1, "Db": 1, "D": 2, "D#": 3, "Eb": 3, "E": 4, "Fb": 4,
+    "E#": 5, "F": 5, "F#": 6, "Gb": 6, "G": 7, "G#": 8, "Ab": 8, "A": 9,
+    "A#": 10, "Bb": 10, "B": 11, "Cb": 11, "B#": 0,
+}  # fmt: skip
+SHARP_NAMES = ("C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B")
+FLAT_NAMES = ("C", "Db", "D", "Eb", "E", "F", "Gb", "G", "Ab", "A", "Bb", "B")
+
+# Major keys conventionally written with flats; minor keys follow their
+# relative major
+FLAT_KEYS = frozenset({1, 3, 5, 8, 10})
+
+# translate() tables adding n semitones to a pitch class
+_SHIFTS = tuple(
+    bytes((b + n) % 12 if b < 12 else b for b in range(256)) for n in range(12)
+)
+
+_CHORD_PARTS = re.compile(r"([A-G][#b]?)(.*?)(?:/([A-G][#b]?))?")
+_KEY = re.compile(r"\s*([A-G][#b]?)(m(?!aj))?")
+_MINOR = re.compile(r"m(?!aj)")
+_TOKEN = re.compile(r"\S+")
+
+# A chord as written: (text before the root, quality, text after)
+_ChordParts = tuple[str, str, str]
+
+
+class Transposition(NamedTuple):
+    """A tab's chord lines spelled in all twelve keys.
+
+    ``slots`` maps each chord line's number to its index among the tab's
+    distinct chord lines, and ``variants[n]`` holds those distinct lines
+    shifted up ``n`` semitones, labelled ``keys[n]``.
+    """
+
+    slots: dict[int, int]
+    keys: list[str]
+    variants: list[list[str]]
+
+    def to_dict(self) -> dict[str, Any]:
+        """Data embedded in the tab page for the key switcher."""
+        return {"keys": self.keys, "variants": self.variants}
+
+
+def parse_key(key: str | None) -> tuple[int, bool] | None:
+    """Read a key like ``G`` or ``F#m`` as (tonic pitch class, is minor)."""
+    match = _KEY.match(key or "")
+    if match is None:
+        return None
+    return PITCH_CLASSES[match.group(1)], match.group(2) is not None
+
+
+def spelling(tonic: int, minor: bool) -> tuple[str, ...]:
+    """Note names to use in the key with the given tonic."""
+    major = (tonic + 3) % 12 if minor else tonic
+    return FLAT_NAMES if major in FLAT_KEYS else SHARP_NAMES
+
+
+class _Chords:
+    """The distinct chords of a tab, with their roots as pitch-class arrays.
+
+    Chords without a bass note store 255 as their bass, which the shift
+    tables leave alone.
+    """
+
+    def __init__(self) -> None:
+        self.ids: dict[str, int] = {}
+        self.parts: list[_ChordParts] = []
+        self.roots = bytearray()
+        self.basses = bytearray()
+
+    def add(self, token: str) -> int | None:
+        """Return the id of the chord a token spells, or None."""
+        chord_id = self.ids.get(token)
+        if chord_id is not None:
+            return chord_id
+        chord = chord_token(token)
+        match = _CHORD_PARTS.fullmatch(chord) if chord else None
+        if match is None:
+            return None
+        root, quality, bass = match.groups()
+        prefix, _, suffix = token.partition(chord)
+        chord_id = self.ids[token] = len(self.parts)
+        self.parts.append((prefix, quality, suffix))
+        self.roots.append(PITCH_CLASSES[root])
+        self.basses.append(255 if bass is None else PITCH_CLASSES[bass])
+        return chord_id
+
+    def spell(self, shift: int, names: tuple[str, ...]) -> list[str]:
+        """Spell every chord ``shift`` semitones up."""
+        if shift == 0:
+            return list(self.ids)
+        roots = self.roots.translate(_SHIFTS[shift])
+        basses = self.basses.translate(_SHIFTS[shift])
+        return [
+            prefix
+            + names[root]
+            + quality
+            + (f"/{names[bass]}" if bass < 12 else "")
+            + suffix
+            for (prefix, quality, suffix), root, bass in zip(
+                self.parts, roots, basses, strict=True
+            )
+        ]
+
+
+def _place(starts: list[int], texts: list[str]) -> str:
+    """Lay out tokens at their columns, keeping at least one space between.
+
+    A token that grows pushes the next one right; a token that shrinks
+    leaves the following columns where they were, so chords stay over
+    their lyrics.
+    """
+    out = []
+    column = 0
+    for start, text in zip(starts, texts, strict=True):
+        if out and start <= column:
+            start = column + 1
+        out.append(" " * (start - column) + text)
+        column = start + len(text)
+    return "".join(out)
+
+
+def _key_labels(key: str | None, tonic: int, minor: bool, known: bool) -> list[str]:
+    """Label each shift by its key, or by semitones when the key is unknown."""
+    if not known:
+        return ["0"] + [f"+{n}" if n <= 6 else f"-{12 - n}" for n in range(1, 12)]
+    labels = [key.strip() if key else ""]
+    for n in range(1, 12):
+        target = (tonic + n) % 12
+        labels.append(spelling(target, minor)[target] + ("m" if minor else ""))
+    return labels
+
+
+def transpose_tab(
+    content: str, lines: TabLines, key: str | None = None
+) -> Transposition | None:
+    """Spell a tab's chord lines in all twelve keys.
+
+    Returns None for tabs without chord lines. Without a recognisable
+    ``key``, the first chord is taken as the tonic for spelling.
+    """
+    slots: dict[int, int] = {}
+    distinct: dict[str, int] = {}
+    number = lines.kinds.find(LineKind.CHORDS)
+    while number != -1:
+        line = lines.line(content, number)
+        slots[number] = distinct.setdefault(line, len(distinct))
+        number = lines.kinds.find(LineKind.CHORDS, number + 1)
+    if not distinct:
+        return None
+
+    # Each line as token columns and token ids: a chord id, or a plain
+    # token's text
+    chords = _Chords()
+    compiled: list[tuple[list[int], list[int | str]]] = []
+    for line in distinct:
+        starts = []
+        tokens: list[int | str] = []
+        for match in _TOKEN.finditer(line):
+            starts.append(match.start())
+            chord_id = chords.add(match.group())
+            tokens.append(match.group() if chord_id is None else chord_id)
+        compiled.append((starts, tokens))
+
+    parsed_key = parse_key(key)
+    if parsed_key is not None:
+        tonic, minor = parsed_key
+    else:
+        tonic = chords.roots[0]
+        minor = _MINOR.match(chords.parts[0][1]) is not None
+    spelled = [chords.spell(n, spelling((tonic + n) % 12, minor)) for n in range(12)]
+    # Each chord's twelve spellings
+    by_chord = list(zip(*spelled, strict=True))
+
+    # Most chords fit the gap before the next token in every key, so each
+    # (token, gap) cell is padded once for all twelve keys and lines are
+    # joined from cells. Lines where a chord outgrows its gap in some key
+    # are laid out token by token for that key instead.
+    cells: dict[tuple[int | str, int], tuple[tuple[str, ...], int]] = {}
+    spelled_lines = []
+    for starts, tokens in compiled:
+        row = []
+        overflow = 0
+        widths = [b - a for a, b in zip(starts, starts[1:], strict=False)] + [0]
+        for token, width in zip(tokens, widths, strict=True):
+            cell = cells.get((token, width))
+            if cell is None:
+                texts = (token,) * 12 if isinstance(token, str) else by_chord[token]
+                mask = 0
+                if width and max(map(len, texts)) >= width:
+                    for n, text in enumerate(texts):
+                        if len(text) >= width:
+                            mask |= 1 << n
+                if width:
+                    texts = tuple(map(str.ljust, texts, (width,) * 12))
+                cell = cells[token, width] = (texts, mask)
+            row.append(cell[0])
+            overflow |= cell[1]
+        keyed = list(map("".join, zip(*row, strict=True)))
+        if starts[0]:
+            keyed = [" " * starts[0] + line for line in keyed]
+        for n in range(1, 12) if overflow else ():
+            if overflow >> n & 1:
+                texts = [t if isinstance(t, str) else by_chord[t][n] for t in tokens]
+                keyed[n] = _place(starts, texts)
+        spelled_lines.append(keyed)
+
+    # Shift zero keeps the author's spelling
+    variants = [list(lines) for lines in zip(*spelled_lines, strict=True)]
+    variants[0] = list(distinct)
+
+    labels = _key_labels(key, tonic, minor, parsed_key is not None)
+    return Transposition(slots, labels, variants)
@@ -0,0 +1,64 @@
+"""Polling file watcher used by ``tabstash serve --watch``."""
+
+import time
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+from .scan import Snapshot, scan
+
+
+class Watcher:
+    """Watches directory trees by polling and yields debounced change sets.
+
+    Hidden files (editor swap files and the like) are ignored. Each poll is
+    an incremental scan (see ``tabstash.scan``): only directories whose
+    mtime moved are listed again, and the files of the rest are re-stat'ed.
+    Changes are collected until the trees have been quiet for ``debounce``
+    seconds, so a burst of saves turns into a single rebuild. While nothing
+    changes the polling interval doubles, up to ``max_interval``, so an
+    idle watch costs next to nothing.
+    """
+
+    def __init__(
+        self,
+        roots: Iterable[Path],
+        interval: float = 0.025,
+        debounce: float = 0.025,
+        max_interval: float = 0.2,
+    ):
+        self.roots = list(roots)
+        self.interval = interval
+        self.debounce = debounce
+        self.max_interval = max(interval, max_interval)
+        self._snapshots: dict[Path, Snapshot] = {
+            root: scan(root, settle_files=False)[0] for root in self.roots
+        }
+
+    def poll(self) -> set[Path]:
+        """Return paths added, modified or deleted since the last poll."""
+        changed: set[Path] = set()
+        for root in self.roots:
+            snapshot, delta = scan(root, self._snapshots[root], settle_files=False)
+            self._snapshots[root] = snapshot
+            changed |= delta.changed() | delta.deleted
+        return changed
+
+    def changes(self) -> Iterator[set[Path]]:
+        """Yield sets of changed paths forever, one per burst of changes."""
+        pending: set[Path] = set()
+        last_change = 0.0
+        interval = self.interval
+        while True:
+            time.sleep(interval)
+            changed = self.poll()
+            now = time.monotonic()
+            if changed:
+                pending |= changed
+                last_change = now
+                interval = self.interval
+            elif pending:
+                if now - last_change >= self.debounce:
+                    yield pending
+                    pending = set()
+            else:
+                interval = min(interval * 2, self.max_interval)
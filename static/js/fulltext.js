@@ -0,0 +1,115 @@
+/**
+ * TabStash - Lyric phrase and chord-sequence search
+ *
+ * Queries the positional indexes written by tabstash.fulltext. A quoted
+ * query ("today is gonna be") searches lyrics for that phrase; a query made
+ * only of chords (G D Em C) searches for that progression.
+ */
+
+(function(root) {
+    const tokenizer = root.TabStashTokenizer ||
+        (typeof require === 'function' ? require('./tokenizer.js') : null);
+
+    // Must match FULLTEXT_FORMAT in tabstash/fulltext.py and CHORD_PATTERN in tabstash/parser.py
+    const FORMAT = 'tabstash-fulltext-1';
+    const CHORD_PATTERN = /^[A-G][#b]?(?:maj|min|m|M|dim|aug|sus|add|\+|°|ø)?\d{0,2}(?:(?:sus|add|maj|b|#|-)\d{1,2})*(?:\/[A-G][#b]?)?$/;
+
+    function chordToken(token) {
+        const chord = token.replace(/^\(+|\)+$/g, '');
+        return CHORD_PATTERN.test(chord) ? chord : null;
+    }
+
+    // Classify a query: { kind: 'lyrics' | 'chords', terms } or null for a
+    // plain metadata search
+    function parseQuery(query) {
+        const quoted = query.match(/^"(.+)"$/);
+        if (quoted) {
+            const terms = tokenizer.tokenize(quoted[1])
+                .map(tokenizer.processTerm)
+                .filter(Boolean);
+            return terms.length ? { kind: 'lyrics', terms } : null;
+        }
+        const chords = query.split(/\s+/).filter(Boolean).map(chordToken);
+        if (chords.length < 2 || !chords.every(Boolean)) return null;
+        // The chord index stores consecutive chord pairs
+        const terms = chords.slice(1).map((chord, i) => chords[i] + ' ' + chord);
+        return { kind: 'chords', terms };
+    }
+
+    // Wrap a parsed index; postings are decoded per term on first use
+    function load(data) {
+        const stop = new Set(data.stop);
+        const decoded = new Map();
+        const has = term => Object.prototype.hasOwnProperty.call(data.terms, term);
+
+        function postings(term) {
+            if (!decoded.has(term)) {
+                const flat = data.terms[term];
+                const docs = new Map();
+                let doc = 0;
+                for (let k = 0; k < flat.length;) {
+                    doc += flat[k];
+                    const count = flat[k + 1];
+                    k += 2;
+                    const positions = [];
+                    let position = 0;
+                    for (let j = 0; j < count; j++) {
+                        position += flat[k + j];
+                        positions.push(position);
+                    }
+                    k += count;
+                    docs.set(doc, positions);
+                }
+                decoded.set(term, docs);
+            }
+            return decoded.get(term);
+        }
+
+        function result(doc) {
+            return {
+                id: data.ids[doc],
+                title: data.titles[doc],
+                artist: data.artistNames[data.artists[doc]],
+            };
+        }
+
+        // Mirrors PositionalIndex.search: stop terms and cut-off position
+        // lists only have to be present, the rest must line up. A phrase of
+        // nothing but stop terms could be in any document.
+        function search(terms) {
+            const anchors = [];
+            terms.forEach((term, offset) => {
+                if (!stop.has(term)) anchors.push([offset, term]);
+            });
+            if (terms.length && !anchors.length) return data.ids.map((_, doc) => result(doc));
+            if (!anchors.length || !anchors.every(([, term]) => has(term))) return [];
+
+            const lists = anchors.map(([offset, term]) => [offset, postings(term)]);
+            const docs = Array.from(lists[0][1].keys())
+                .filter(doc => lists.every(([, list]) => list.has(doc)))
+                .sort((a, b) => a - b);
+
+            return docs.filter(doc => {
+                let starts = null;
+                lists.forEach(([offset, list]) => {
+                    const positions = list.get(doc);
+                    if (positions.length >= data.maxPositions) return;
+                    const shifted = new Set(positions.map(p => p - offset));
+                    starts = starts === null
+                        ? shifted
+                        : new Set([...starts].filter(start => shifted.has(start)));
+                });
+                return starts === null || starts.size > 0;
+            }).map(result);
+        }
+
+        return { search };
+    }
+
+    const TabStashFullText = { FORMAT, chordToken, parseQuery, load };
+
+    root.TabStashFullText = TabStashFullText;
+    if (typeof module !== 'undefined' && module.exports) {
+        module.exports = TabStashFullText;
+    }
+})(typeof window !== 'undefined' ? window : globalThis);
@@ -4,7 +4,6 @@
 
 (function() {
     let miniSearch = null;
-    let searchData = [];
 
     const searchInput = document.getElementById('search');
     const searchResults = document.getElementById('search-results');
@@ -15,28 +14,172 @@
     // Get base URL from data attribute on body or default to empty
     const baseUrl = document.body.dataset.baseUrl || '';
 
-    // Load search index
-    fetch(baseUrl + '/search-index.json')
-        .then(response => response.json())
-        .then(data => {
-            searchData = data;
-
-            miniSearch = new MiniSearch({
-                fields: ['title', 'artist', 'tags'],
-                storeFields: ['title', 'artist', 'url', 'tags'],
-                searchOptions: {
-                    boost: { title: 2, artist: 1.5 },
-                    fuzzy: 0.2,
-                    prefix: true,
+    // Must match FIELDS and STORE_FIELDS in tabstash/search.py
+    const searchOptions = {
+        fields: ['title', 'artist', 'tags'],
+        storeFields: ['title', 'artist', 'url', 'tags'],
+        tokenize: TabStashTokenizer.tokenize,
+        processTerm: TabStashTokenizer.processTerm,
+        searchOptions: {
+            boost: { title: 2, artist: 1.5 },
+            fuzzy: 0.2,
+            prefix: true,
+        }
+    };
+
+    // With a shard prefix, search-index.json is a manifest mapping term
+    // prefixes to shard files that are fetched on demand
+    const shardPrefix = parseInt(
+        searchInput.closest('.search-container').dataset.shardPrefix || '0', 10);
+    let shardManifest = null;
+    const shardCache = new Map();
+
+    // Must match COMPACT_FORMAT in tabstash/search.py
+    const COMPACT_FORMAT = 'tabstash-compact-1';
+
+    // Expand the columnar layout from MiniSearchIndex.to_compact back into
+    // the object layout MiniSearch serializes to
+    function expandCompactIndex(compact) {
+        const fieldCount = compact.fields.length;
+        const fieldIds = {};
+        compact.fields.forEach((field, i) => { fieldIds[field] = i; });
+
+        const documentIds = {};
+        const fieldLength = {};
+        const storedFields = {};
+        compact.ids.forEach((id, i) => {
+            const shortId = compact.docs ? compact.docs[i] : i;
+            documentIds[shortId] = id;
+            fieldLength[shortId] = compact.fieldLength.slice(i * fieldCount, (i + 1) * fieldCount);
+
+            const stored = { url: baseUrl + '/tabs/' + id + '.html' };
+            Object.entries(compact.stored).forEach(([name, column]) => {
+                stored[name] = name in compact.interned
+                    ? compact.interned[name][column[i]]
+                    : column[i];
+            });
+            storedFields[shortId] = stored;
+        });
+
+        const index = compact.terms.map((term, t) => {
+            const data = {};
+            compact.postings[t].forEach(([fieldId, runs]) => {
+                const freqs = {};
+                let docId = 0;
+                for (let k = 0; k < runs.length; k += 2) {
+                    docId += runs[k];
+                    freqs[docId] = runs[k + 1];
                 }
+                data[fieldId] = freqs;
             });
+            return [term, data];
+        });
 
-            miniSearch.addAll(data);
+        return {
+            documentCount: compact.documentCount,
+            nextId: compact.documentCount,
+            documentIds,
+            fieldIds,
+            fieldLength,
+            averageFieldLength: compact.averageFieldLength,
+            storedFields,
+            dirtCount: 0,
+            index,
+            serializationVersion: 2,
+        };
+    }
+
+    function loadIndex(json) {
+        const data = JSON.parse(json);
+        const plain = data.format === COMPACT_FORMAT ? expandCompactIndex(data) : data;
+        return typeof MiniSearch.loadJS === 'function'
+            ? MiniSearch.loadJS(plain, searchOptions)
+            : MiniSearch.loadJSON(JSON.stringify(plain), searchOptions);
+    }
+
+    // Load the index prebuilt at build time; no tokenizing on page load
+    fetch(baseUrl + '/search-index.json')
+        .then(response => response.text())
+        .then(json => {
+            if (shardPrefix > 0) {
+                shardManifest = JSON.parse(json);
+            } else {
+                miniSearch = loadIndex(json);
+            }
         })
         .catch(err => {
             console.error('Failed to load search index:', err);
         });
 
+    function loadShard(key) {
+        if (!shardCache.has(key)) {
+            const url = baseUrl + '/search-index/' + shardManifest.shards[key];
+            shardCache.set(key, fetch(url)
+                .then(response => response.text())
+                .then(loadIndex));
+        }
+        return shardCache.get(key);
+    }
+
+    // Shards that can hold a term: its own prefix, or every shard the term
+    // is a prefix of when it is shorter than the shard prefix
+    function shardKeysFor(term) {
+        const chars = Array.from(term);
+        if (chars.length >= shardPrefix) {
+            const key = chars.slice(0, shardPrefix).join('');
+            return key in shardManifest.shards ? [key] : [];
+        }
+        return Object.keys(shardManifest.shards).filter(key => key.startsWith(term));
+    }
+
+    function searchShards(query) {
+        const termsByShard = new Map();
+        TabStashTokenizer.tokenize(query)
+            .map(TabStashTokenizer.processTerm)
+            .filter(Boolean)
+            .forEach(term => shardKeysFor(term).forEach(key => {
+                if (!termsByShard.has(key)) termsByShard.set(key, []);
+                termsByShard.get(key).push(term);
+            }));
+
+        const searches = Array.from(termsByShard, ([key, terms]) =>
+            loadShard(key).then(shard => shard.search(terms.join(' '))));
+
+        return Promise.all(searches).then(resultSets => {
+            // Scores for different terms add up, as with MiniSearch's OR
+            const merged = new Map();
+            resultSets.flat().forEach(result => {
+                const existing = merged.get(result.id);
+                if (existing) {
+                    existing.score += result.score;
+                } else {
+                    merged.set(result.id, { ...result });
+                }
+            });
+            return Array.from(merged.values()).sort((a, b) => b.score - a.score);
+        });
+    }
+
+    // Lyric and chord indexes are only fetched once someone searches them
+    const fullTextCache = new Map();
+
+    function loadFullText(kind) {
+        if (!fullTextCache.has(kind)) {
+            fullTextCache.set(kind, fetch(baseUrl + '/' + kind + '-index.json')
+                .then(response => response.json())
+                .then(TabStashFullText.load));
+        }
+        return fullTextCache.get(kind);
+    }
+
+    function searchFullText(fullText) {
+        return loadFullText(fullText.kind).then(index =>
+            index.search(fullText.terms).map(result => ({
+                ...result,
+                url: baseUrl + '/tabs/' + result.id + '.html',
+            })));
+    }
+
     // Debounce helper
     function debounce(fn, delay) {
         let timeout;
@@ -92,6 +235,15 @@
         });
     }
 
+    // Show only the listed tabs (for lyric and chord results)
+    function filterTabListByIds(ids) {
+        if (!tabList) return;
+
+        tabList.querySelectorAll('.tab-item').forEach(item => {
+            item.classList.toggle('hidden', !ids.has(item.dataset.id));
+        });
+    }
+
     // Handle search input
     const handleSearch = debounce(function(e) {
         const query = e.target.value.trim();
@@ -102,9 +254,24 @@
             return;
         }
 
+        const fullText = TabStashFullText.parseQuery(query);
+        if (fullText) {
+            searchFullText(fullText).then(results => {
+                if (searchInput.value.trim() !== query) return;
+                renderResults(results);
+                filterTabListByIds(new Set(results.map(result => result.id)));
+            });
+            return;
+        }
+
         if (miniSearch) {
             const results = miniSearch.search(query);
             renderResults(results);
+        } else if (shardManifest) {
+            searchShards(query).then(results => {
+                // Ignore results for a query the user has already replaced
+                if (searchInput.value.trim() === query) renderResults(results);
+            });
         }
 
         filterTabList(query);
@@ -0,0 +1,21 @@
+/**
+ * TabStash - Search tokenizer
+ *
+ * Shared by search.js and mirrored by tabstash.search on the Python side,
+ * which prebuilds the MiniSearch index. The two must split and normalise
+ * text identically; tests/test_search.py checks that they do.
+ */
+
+(function(root) {
+    const SPACE_OR_PUNCTUATION = /[\n\r\p{Z}\p{P}]+/u;
+
+    const TabStashTokenizer = {
+        tokenize: (text) => text.split(SPACE_OR_PUNCTUATION),
+        processTerm: (term) => term.toLowerCase(),
+    };
+
+    root.TabStashTokenizer = TabStashTokenizer;
+    if (typeof module !== 'undefined' && module.exports) {
+        module.exports = TabStashTokenizer;
+    }
+})(typeof window !== 'undefined' ? window : globalThis);
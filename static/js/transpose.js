@@ -0,0 +1,57 @@
+/**
+ * TabStash - Key switcher for tab pages
+ *
+ * The build embeds every chord line already spelled in all twelve keys
+ * (see tabstash/transpose.py), so switching key only swaps text.
+ *
+ * Usage:
+ *   const transposer = new Transposer(data, contentElement);
+ *   transposer.setShift(2);  // up a whole tone
+ */
+
+class Transposer {
+    constructor(data, container) {
+        this.keys = data.keys;
+        this.variants = data.variants;
+        this.lines = container.querySelectorAll('.chord-line');
+        this.shift = 0;
+    }
+
+    setShift(shift) {
+        const texts = this.variants[shift];
+        if (!texts) return;
+        this.shift = shift;
+        this.lines.forEach(line => {
+            line.textContent = texts[line.dataset.chords];
+        });
+    }
+
+    get key() {
+        return this.keys[this.shift];
+    }
+}
+
+(function () {
+    if (typeof document === 'undefined') return;
+    const data = document.getElementById('transpose-data');
+    const select = document.getElementById('key-select');
+    if (!data || !select) return;
+
+    const transposer = new Transposer(
+        JSON.parse(data.textContent),
+        document.getElementById('tab-content')
+    );
+    const badge = document.getElementById('key-badge');
+
+    select.addEventListener('change', () => {
+        transposer.setShift(Number(select.value));
+        if (badge) {
+            badge.textContent = `Key: ${transposer.key}`;
+        }
+    });
+})();
+
+// Export for use in other scripts
+if (typeof module !== 'undefined' && module.exports) {
+    module.exports = Transposer;
+}
@@ -0,0 +1,158 @@
+"""Tests for the static asset pipeline."""
+
+import json
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from tabstash.assets import (
+    ASSET_MANIFEST_NAME,
+    build_assets,
+    fingerprint,
+    minify_css,
+    minify_js,
+)
+
+PROJECT_ROOT = Path(__file__).parent.parent
+STATIC_DIR = PROJECT_ROOT / "static"
+
+requires_node = pytest.mark.skipif(
+    shutil.which("node") is None, reason="node not installed"
+)
+
+
+class TestMinifyCss:
+    """Tests for minify_css."""
+
+    def test_strips_comments_and_spaces(self):
+        """Test that comments, spacing and final semicolons go."""
+        css = "/* theme */\n.a > .b ,\n.c {\n    color : red;\n    margin: 0 auto;\n}\n"
+        assert minify_css(css) == ".a>.b,.c{color :red;margin:0 auto}"
+
+    def test_keeps_significant_spaces(self):
+        """Test that descendant selectors, strings and calc() survive."""
+        css = '.a :hover { content: "a  b"; width: calc(100% - 2px) }'
+        assert minify_css(css) == '.a :hover{content:"a  b";width:calc(100% - 2px)}'
+
+    def test_idempotent(self):
+        """Test that minifying the shipped stylesheet twice changes nothing."""
+        css = minify_css((STATIC_DIR / "css" / "style.css").read_text())
+        assert minify_css(css) == css
+
+
+class TestMinifyJs:
+    """Tests for minify_js."""
+
+    def test_strips_comments_and_spaces(self):
+        """Test that comments and indentation go but statements stay apart."""
+        js = "// header\nconst a = 1; /* note */\nlet b = a\nreturn b\n"
+        assert minify_js(js) == "const a=1;let b=a\nreturn b\n"
+
+    def test_keeps_literals(self):
+        """Test that strings, templates and regexes are copied verbatim."""
+        js = "x = '// not a comment' + `${ a  +  b }  /* no */` + /[/ ]+/g.source;"
+        assert minify_js(js) == (
+            "x='// not a comment'+`${ a  +  b }  /* no */`+/[/ ]+/g.source;\n"
+        )
+
+    def test_division_is_not_a_regex(self):
+        """Test that slashes after values are read as division."""
+        assert minify_js("a = b / c / d;\ne = (f) / 2;") == "a=b/c/d;e=(f)/2;\n"
+
+    def test_regex_after_statement_head(self):
+        """Test that a slash after if (...) starts a regex, but not after a call."""
+        js = "if (ok) /a  'b/.test(s);\nx = f(a) / 2 / (b + c);"
+        assert minify_js(js) == "if(ok)/a  'b/.test(s);x=f(a)/2/(b+c);\n"
+
+    def test_unary_operators_stay_apart(self):
+        """Test that a + +b is not turned into a ++b."""
+        assert minify_js("a = b + +c - -d;") == "a=b+ +c- -d;\n"
+
+    @requires_node
+    @pytest.mark.parametrize(
+        "script", sorted(p.name for p in (STATIC_DIR / "js").glob("*.js"))
+    )
+    def test_shipped_scripts_still_parse(self, script: str, tmp_path: Path):
+        """Test that node accepts every minified shipped script."""
+        minified = tmp_path / script
+        minified.write_text(minify_js((STATIC_DIR / "js" / script).read_text()))
+        subprocess.run(["node", "--check", str(minified)], check=True)
+
+    @requires_node
+    def test_minified_fulltext_behaves_the_same(self, tmp_path: Path):
+        """Test that minified query parsing matches the original."""
+        for name in ("tokenizer.js", "fulltext.js"):
+            text = (STATIC_DIR / "js" / name).read_text()
+            (tmp_path / name).write_text(minify_js(text))
+        queries = ['"today is gonna be"', "G D Em C", "(Am) F/C", "wonderwall"]
+        script = (
+            "const ft = require(process.argv[1]);"
+            f"console.log(JSON.stringify({json.dumps(queries)}.map(ft.parseQuery)));"
+        )
+
+        def run(path: Path) -> str:
+            return subprocess.run(
+                ["node", "-e", script, str(path)],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+
+        assert run(tmp_path / "fulltext.js") == run(STATIC_DIR / "js" / "fulltext.js")
+
+
+class TestBuildAssets:
+    """Tests for build_assets."""
+
+    def test_fingerprints_and_compresses(self, tmp_path: Path):
+        """Test that assets get hashed names, siblings and a manifest."""
+        output = tmp_path / "out"
+        result = build_assets(STATIC_DIR, output)
+        css = result.entries["css/style.css"].path
+        assert css.startswith("css/style.") and css.endswith(".css")
+        minified = (output / css).read_bytes()
+        assert css == fingerprint("css/style.css", minified)
+        assert (output / (css + ".gz")).exists()
+        assert json.loads((output / ASSET_MANIFEST_NAME).read_text()) == (
+            result.paths()
+        )
+
+    def test_skips_unchanged_assets(self, tmp_path: Path):
+        """Test that only changed assets are rewritten and old names removed."""
+        static_dir = tmp_path / "static"
+        shutil.copytree(STATIC_DIR, static_dir)
+        output = tmp_path / "out"
+        first = build_assets(static_dir, output)
+
+        css = static_dir / "css" / "style.css"
+        css.write_text(css.read_text() + "\n.extra { color: red; }\n")
+        second = build_assets(static_dir, output, first.entries)
+        assert second.written == 1
+        assert second.skipped == len(first.entries) - 1
+        old = first.entries["css/style.css"].path
+        assert not (output / old).exists()
+        assert not (output / (old + ".gz")).exists()
+        assert (output / second.entries["css/style.css"].path).exists()
+
+    def test_unminifiable_script_is_copied(self, tmp_path: Path):
+        """Test that a script the minifier rejects is copied with a warning."""
+        static_dir = tmp_path / "static"
+        static_dir.mkdir()
+        script = "const s = 'unterminated\n"
+        (static_dir / "broken.js").write_text(script)
+        result = build_assets(static_dir, tmp_path / "out")
+        assert (tmp_path / "out" / result.paths()["broken.js"]).read_text() == script
+        assert len(result.warnings) == 1
+        assert "broken.js" in result.warnings[0]
+
+    def test_copies_without_optimizing(self, tmp_path: Path):
+        """Test that development builds copy assets under their own names."""
+        output = tmp_path / "out"
+        result = build_assets(STATIC_DIR, output, optimize=False)
+        assert result.paths()["js/search.js"] == "js/search.js"
+        assert (output / "js" / "search.js").read_bytes() == (
+            STATIC_DIR / "js" / "search.js"
+        ).read_bytes()
+        assert not (output / "js" / "search.js.gz").exists()
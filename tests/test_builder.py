@@ -0,0 +1,821 @@
+"""Tests for the static site builder."""
+
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from tabstash import builder as builder_module
+from tabstash import search as search_module
+from tabstash.builder import SiteBuilder
+from tabstash.cache import ParseCache
+from tabstash.manifest import MANIFEST_NAME, BuildManifest, hash_file
+from tabstash.pipeline import StageLimits
+from tabstash.scan import SNAPSHOT_NAME
+from tabstash.shard import SHARD_METADATA_NAME
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+def write_tab(content_dir: Path, artist: str, song: str, title: str) -> Path:
+    """Write a minimal tab file and return its path."""
+    path = content_dir / "tabs" / artist / f"{song}.md"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(f"""---
+title: {title}
+artist: {artist.replace("-", " ").title()}
+---
+
+[Verse]
+G  C  D
+Some words here
+""")
+    return path
+
+
+def copy_templates(templates_dir: Path) -> Path:
+    """Copy the project templates somewhere a test can edit them."""
+    templates_dir.mkdir()
+    for template in (PROJECT_ROOT / "templates").iterdir():
+        (templates_dir / template.name).write_text(template.read_text())
+    return templates_dir
+
+
+@pytest.fixture
+def site(tmp_path: Path) -> SiteBuilder:
+    """A builder over a small three-tab catalog."""
+    content_dir = tmp_path / "content"
+    write_tab(content_dir, "artist-one", "song-a", "Song A")
+    write_tab(content_dir, "artist-one", "song-b", "Song B")
+    write_tab(content_dir, "artist-two", "song-c", "Song C")
+    return SiteBuilder(
+        content_dir=content_dir,
+        templates_dir=PROJECT_ROOT / "templates",
+        static_dir=PROJECT_ROOT / "static",
+        output_dir=tmp_path / "dist",
+    )
+
+
+class TestBuild:
+    """Tests for full builds."""
+
+    def test_full_build(self, site: SiteBuilder):
+        """Test that a full build renders every page."""
+        result = site.build()
+        assert result.success
+        # index + 2 artists + 3 tabs
+        assert result.pages_generated == 6
+        assert result.pages_skipped == 0
+        assert result.search_index_size == 3
+        assert (site.output_dir / "tabs" / "artist-one" / "song-a.html").exists()
+        assert (site.output_dir / "artist" / "artist-two.html").exists()
+        assert (site.output_dir / "static" / site.assets["js/search.js"]).exists()
+
+    def test_section_anchors(self, site: SiteBuilder):
+        """Test that each section header gets the anchor its nav pill targets."""
+        write_tab(site.content_dir, "artist-one", "song-a", "Song A")
+        path = site.content_dir / "tabs" / "artist-one" / "song-a.md"
+        path.write_text(path.read_text() + "\n[Chorus]\nAm  F\nI'm singing\n")
+        site.build()
+        html = (site.output_dir / "tabs" / "artist-one" / "song-a.html").read_text()
+        assert '<span id="section-1" class="section-header">[Verse]</span>' in html
+        assert '<span id="section-2" class="section-header">[Chorus]</span>' in html
+        assert 'href="#section-2"' in html
+        assert "I&#39;m singing\n" in html
+
+    def test_embeds_key_variants(self, site: SiteBuilder):
+        """Test that tab pages carry their chords in every key."""
+        site.build()
+        html = (site.output_dir / "tabs" / "artist-one" / "song-a.html").read_text()
+        assert '<span class="chord-line" data-chords="0">G  C  D</span>' in html
+        data = html.split('id="transpose-data">')[1].split("</script>")[0]
+        assert json.loads(data)["variants"][2] == ["A  D  E"]
+
+    def test_writes_manifest(self, site: SiteBuilder):
+        """Test that the build manifest records sources and their pages."""
+        site.build()
+        manifest = BuildManifest.load(site.output_dir / MANIFEST_NAME)
+        assert manifest is not None
+        entry = manifest.sources["tabs/artist-one/song-a.md"]
+        assert entry.artist_slug == "artist-one"
+        assert "tabs/artist-one/song-a.html" in entry.pages
+        assert "artist/artist-one.html" in entry.pages
+
+    def test_empty_content(self, tmp_path: Path):
+        """Test that a build with no tabs reports an error."""
+        builder = SiteBuilder(
+            content_dir=tmp_path / "content",
+            templates_dir=PROJECT_ROOT / "templates",
+            static_dir=PROJECT_ROOT / "static",
+            output_dir=tmp_path / "dist",
+        )
+        result = builder.build()
+        assert not result.success
+
+    def test_keeps_only_summaries(self, site: SiteBuilder):
+        """Test that no tab content stays in memory after a build."""
+        site.build()
+        assert site._tabs is not None
+        assert len(site._tabs) == 3
+        assert not any(hasattr(tab, "content") for tab in site._tabs.values())
+
+    def test_parallel_build_matches_serial(self, site: SiteBuilder, tmp_path: Path):
+        """Test that rendering on worker processes gives identical output."""
+        site.build()
+        parallel = SiteBuilder(
+            content_dir=site.content_dir,
+            templates_dir=site.templates_dir,
+            static_dir=site.static_dir,
+            output_dir=tmp_path / "dist-parallel",
+            jobs=2,
+        )
+        result = parallel.build()
+        assert result.success
+        assert result.pages_generated == 6
+        for page in site.output_dir.rglob("*.html"):
+            relative = page.relative_to(site.output_dir)
+            assert (parallel.output_dir / relative).read_text() == page.read_text()
+
+    @pytest.mark.parametrize("jobs", [1, 2])
+    def test_render_errors_are_collected(
+        self, site: SiteBuilder, tmp_path: Path, jobs: int
+    ):
+        """Test that a failing page is reported without aborting the build."""
+        templates_dir = copy_templates(tmp_path / "templates")
+        (templates_dir / "tab.html").write_text("{{ tab.missing.value }}")
+        builder = SiteBuilder(
+            content_dir=site.content_dir,
+            templates_dir=templates_dir,
+            static_dir=site.static_dir,
+            output_dir=site.output_dir,
+            jobs=jobs,
+        )
+        result = builder.build()
+        assert not result.success
+        assert len(result.errors) == 3
+        assert any("tabs/artist-one/song-a.html" in error for error in result.errors)
+        # index + 2 artists still rendered
+        assert result.pages_generated == 3
+
+
+class TestPagination:
+    """Tests for paginated index and artist pages."""
+
+    def test_splits_listings(self, site: SiteBuilder):
+        """Test that long listings continue on numbered pages."""
+        site.page_size = 2
+        result = site.build()
+        assert result.success
+        out = site.output_dir
+        assert (out / "index" / "2.html").exists()
+        assert not (out / "index" / "3.html").exists()
+        assert (out / "artist" / "artist-one.html").exists()
+        assert not (out / "artist" / "artist-one" / "2.html").exists()
+        assert (out / "artists.html").exists()
+        html = (out / "index.html").read_text()
+        assert 'href="/index/2.html"' in html
+        assert "Song C" not in html.split("all-tabs-section")[1]
+        assert "Song C" in (out / "index" / "2.html").read_text()
+
+    def test_shrinking_listing_drops_pages(self, site: SiteBuilder):
+        """Test that pages past the end of a shorter listing are removed."""
+        site.page_size = 1
+        site.build(incremental=True)
+        artist_dir = site.output_dir / "artist" / "artist-one"
+        assert (artist_dir / "2.html").exists()
+
+        (site.content_dir / "tabs" / "artist-one" / "song-b.md").unlink()
+        site.build(incremental=True)
+        assert not (artist_dir / "2.html").exists()
+        assert (site.output_dir / "index" / "2.html").exists()
+        assert not (site.output_dir / "index" / "3.html").exists()
+
+    def test_removed_artist_drops_all_pages(self, site: SiteBuilder):
+        """Test that an artist's continuation pages go with the artist."""
+        site.page_size = 1
+        site.build()
+        paths = sorted((site.content_dir / "tabs" / "artist-one").glob("*.md"))
+        for path in paths:
+            path.unlink()
+        site.update(paths)
+        assert not (site.output_dir / "artist" / "artist-one.html").exists()
+        assert not (site.output_dir / "artist" / "artist-one").exists()
+
+    def test_zero_page_size_keeps_one_page(self, site: SiteBuilder):
+        """Test that a page size of 0 turns pagination off."""
+        site.page_size = 0
+        site.build()
+        assert not (site.output_dir / "index").exists()
+        assert "Song C" in (site.output_dir / "index.html").read_text()
+
+
+class TestProfile:
+    """Tests for profiled builds."""
+
+    def test_records_phases(self, site: SiteBuilder, tmp_path: Path):
+        """Test that a profiled build times its phases and files."""
+        assert site.build().profile is None
+        profile = site.build(profile=True).profile
+        assert {"assets", "parse", "tab render", "index render", "search index"} <= set(
+            profile.phases
+        )
+        assert profile.phases["parse"].calls == 4
+        assert len(profile.slowest_parses) == 3
+        assert {timing.path for timing in profile.slowest_renders} >= {
+            "index.html",
+            "tabs/artist-one/song-a.html",
+        }
+        seconds = [timing.seconds for timing in profile.slowest_renders]
+        assert seconds == sorted(seconds, reverse=True)
+        # Nothing changed since the unprofiled build
+        assert profile.bytes_written == 0
+        assert profile.bytes_skipped > 0
+        assert profile.peak_rss_bytes > 0
+
+        report = tmp_path / "profile.json"
+        profile.write(report)
+        assert json.loads(report.read_text())["files_written"] == profile.files_written
+
+    def test_incremental_writes_less(self, site: SiteBuilder):
+        """Test that bytes written only count this build's outputs."""
+        full = site.build(incremental=True, profile=True).profile
+        noop = site.build(incremental=True, profile=True).profile
+        assert noop.files_written < full.files_written
+        assert noop.bytes_written < full.bytes_written
+
+
+class TestTemplateCache:
+    """Tests for the persistent template bytecode cache."""
+
+    def cached_builder(self, site: SiteBuilder, templates_dir: Path) -> SiteBuilder:
+        """A builder like ``site`` with a cache dir and its own templates."""
+        return SiteBuilder(
+            content_dir=site.content_dir,
+            templates_dir=templates_dir,
+            static_dir=site.static_dir,
+            output_dir=site.output_dir,
+            cache_dir=site.content_dir.parent / "cache",
+        )
+
+    def test_warm_builder_skips_compiling(
+        self, site: SiteBuilder, tmp_path: Path, monkeypatch
+    ):
+        """Test that a second builder loads compiled templates from disk."""
+        templates_dir = copy_templates(tmp_path / "templates")
+        names = self.cached_builder(site, templates_dir).warm_templates()
+        assert "tab.html" in names
+
+        warm = self.cached_builder(site, templates_dir)
+        monkeypatch.setattr(warm.env, "compile", pytest.fail)
+        assert warm.build().success
+
+    def test_edited_template_is_recompiled(self, site: SiteBuilder, tmp_path: Path):
+        """Test that a changed template is not served from the cache."""
+        templates_dir = copy_templates(tmp_path / "templates")
+        self.cached_builder(site, templates_dir).build()
+
+        base = templates_dir / "base.html"
+        base.write_text(base.read_text().replace("TabStash", "TabStash!"))
+        assert self.cached_builder(site, templates_dir).build().success
+        assert "TabStash!" in (site.output_dir / "index.html").read_text()
+
+
+class TestIncrementalBuild:
+    """Tests for manifest-driven incremental builds."""
+
+    def test_unchanged_site_skips_everything(self, site: SiteBuilder):
+        """Test that a rebuild with no changes renders nothing."""
+        site.build(incremental=True)
+        result = site.build(incremental=True)
+        assert result.success
+        assert result.pages_generated == 0
+        assert result.pages_skipped == 6
+        assert result.search_index_size == 3
+        assert result.assets_written == 0
+        assert result.assets_skipped == len(site.assets)
+
+    def test_changed_tab_rebuilds_its_pages(self, site: SiteBuilder):
+        """Test that editing one tab rebuilds its page, artist and index."""
+        site.build(incremental=True)
+        write_tab(site.content_dir, "artist-one", "song-a", "Song A Remix")
+
+        result = site.build(incremental=True)
+        # tab page + artist page + index
+        assert result.pages_generated == 3
+        assert result.pages_skipped == 3
+        page = site.output_dir / "tabs" / "artist-one" / "song-a.html"
+        assert "Song A Remix" in page.read_text()
+        assert "Song A Remix" in (site.output_dir / "search-index.json").read_text()
+
+    def test_deleted_tab_is_pruned(self, site: SiteBuilder):
+        """Test that deleting an artist's only tab prunes its outputs."""
+        site.build(incremental=True)
+        (site.content_dir / "tabs" / "artist-two" / "song-c.md").unlink()
+
+        result = site.build(incremental=True)
+        assert result.success
+        assert not (site.output_dir / "tabs" / "artist-two").exists()
+        assert (site.output_dir / "tabs" / "artist-one").is_dir()
+        assert not (site.output_dir / "artist" / "artist-two.html").exists()
+        assert (site.output_dir / "artist" / "artist-one.html").exists()
+        assert result.search_index_size == 2
+
+    def test_template_change_forces_full_rebuild(
+        self, site: SiteBuilder, tmp_path: Path
+    ):
+        """Test that a changed template invalidates the whole manifest."""
+        templates_dir = copy_templates(tmp_path / "templates")
+        builder = SiteBuilder(
+            content_dir=site.content_dir,
+            templates_dir=templates_dir,
+            static_dir=site.static_dir,
+            output_dir=site.output_dir,
+        )
+        builder.build(incremental=True)
+
+        base = templates_dir / "base.html"
+        base.write_text(base.read_text().replace("TabStash", "TabStash!"))
+        result = builder.build(incremental=True)
+        assert result.pages_generated == 6
+        assert result.pages_skipped == 0
+
+
+class TestStagedOutput:
+    """Tests for building into a staging directory and swapping it in."""
+
+    def test_unchanged_files_keep_their_mtime(self, site: SiteBuilder):
+        """Test that a rebuild only rewrites the files whose bytes changed."""
+        first = site.build()
+        assert first.bytes_written > 0
+        index = (site.output_dir / "index.html").stat()
+        write_tab(site.content_dir, "artist-two", "song-c", "Song C Live")
+
+        result = site.build()
+        assert result.success
+        assert 0 < result.bytes_written < result.bytes_skipped
+        stat = (site.output_dir / "index.html").stat()
+        assert (stat.st_ino, stat.st_mtime_ns) != (index.st_ino, index.st_mtime_ns)
+        page = site.output_dir / "tabs" / "artist-one" / "song-a.html"
+        assert page.stat().st_nlink == 1
+        leftovers = site.output_dir.parent.glob(".dist*")
+        assert not list(leftovers)
+
+    def test_identical_rebuild_writes_nothing(self, site: SiteBuilder):
+        """Test that rebuilding an unchanged site leaves every file as it was."""
+        site.build()
+        before = {
+            path: path.stat().st_mtime_ns
+            for path in site.output_dir.rglob("*")
+            if path.is_file()
+        }
+        result = site.build()
+        assert result.files_written == 0
+        assert result.files_skipped > 0
+        after = {
+            path: path.stat().st_mtime_ns
+            for path in site.output_dir.rglob("*")
+            if path.is_file()
+        }
+        assert after == before
+
+    def test_incremental_build_leaves_old_files_alone(
+        self, site: SiteBuilder, tmp_path: Path
+    ):
+        """Test that a changed page is replaced, not written through its link."""
+        site.build(incremental=True)
+        page = site.output_dir / "tabs" / "artist-one" / "song-a.html"
+        kept = tmp_path / "kept.html"
+        kept.hardlink_to(page)
+        write_tab(site.content_dir, "artist-one", "song-a", "Song A Remix")
+
+        result = site.build(incremental=True)
+        assert result.pages_generated == 3
+        assert "Song A Remix" in page.read_text()
+        assert "Song A Remix" not in kept.read_text()
+
+    def test_failed_build_keeps_previous_output(
+        self, site: SiteBuilder, tmp_path: Path
+    ):
+        """Test that a failing build leaves the last good site in place."""
+        site.build()
+        index = (site.output_dir / "index.html").read_text()
+        templates_dir = copy_templates(tmp_path / "templates")
+        (templates_dir / "tab.html").write_text("{{ tab.missing.value }}")
+        broken = SiteBuilder(
+            content_dir=site.content_dir,
+            templates_dir=templates_dir,
+            static_dir=site.static_dir,
+            output_dir=site.output_dir,
+        )
+        assert not broken.build().success
+        assert (site.output_dir / "index.html").read_text() == index
+        assert (site.output_dir / "tabs" / "artist-one" / "song-a.html").exists()
+        assert not (tmp_path / ".dist.staging").exists()
+
+
+class TestSourceScan:
+    """Tests for scanning sources against the last build's snapshot."""
+
+    def settle(self, site: SiteBuilder) -> None:
+        """Backdate the content so the next scan trusts its mtimes."""
+        old = time.time() - 60
+        for path in [site.content_dir, *site.content_dir.rglob("*")]:
+            os.utime(path, (old, old))
+
+    def test_reports_source_changes(self, site: SiteBuilder):
+        """Test that an incremental build reports what the scan found."""
+        self.settle(site)
+        site.build(incremental=True)
+        write_tab(site.content_dir, "artist-one", "song-a", "Song A Remix")
+        (site.content_dir / "tabs" / "artist-two" / "song-c.md").unlink()
+        write_tab(site.content_dir, "artist-three", "song-d", "Song D")
+
+        result = site.build(incremental=True)
+        assert result.success
+        assert (result.sources_added, result.sources_modified) == (1, 1)
+        assert result.sources_deleted == 1
+        assert (site.output_dir / SNAPSHOT_NAME).exists()
+
+    def test_unchanged_sources_are_not_hashed(
+        self, site: SiteBuilder, monkeypatch: pytest.MonkeyPatch
+    ):
+        """Test that only sources the scan saw change are hashed again."""
+        self.settle(site)
+        site.build(incremental=True)
+        edited = write_tab(site.content_dir, "artist-one", "song-a", "Song A Remix")
+        hashed: list[Path] = []
+
+        def counting_hash_file(path: Path) -> str:
+            hashed.append(path)
+            return hash_file(path)
+
+        monkeypatch.setattr("tabstash.builder.hash_file", counting_hash_file)
+        result = site.build(incremental=True)
+        assert result.success
+        assert hashed == [edited]
+        assert result.sources_modified == 1
+
+
+class TestPipelineBuild:
+    """Tests for builds on the overlapped pipeline."""
+
+    def pipelined(self, site: SiteBuilder, output_dir: Path, **kwargs) -> SiteBuilder:
+        return SiteBuilder(
+            content_dir=site.content_dir,
+            templates_dir=site.templates_dir,
+            static_dir=site.static_dir,
+            output_dir=output_dir,
+            pipeline=StageLimits(readers=2, writers=2, window=2),
+            **kwargs,
+        )
+
+    @pytest.mark.parametrize("jobs", [1, 2])
+    def test_matches_plain_build(self, site: SiteBuilder, tmp_path: Path, jobs: int):
+        """Test that a pipelined build writes exactly what a plain one does."""
+        site.build()
+        builder = self.pipelined(site, tmp_path / "dist-pipeline", jobs=jobs)
+        result = builder.build()
+        assert result.success
+        assert result.pages_generated == 6
+        plain = sorted(
+            p.relative_to(site.output_dir) for p in site.output_dir.rglob("*")
+        )
+        piped = sorted(
+            p.relative_to(builder.output_dir) for p in builder.output_dir.rglob("*")
+        )
+        assert piped == plain
+        for relative in plain:
+            page = site.output_dir / relative
+            # The scan snapshot records when it was taken
+            if page.is_file() and relative.name != SNAPSHOT_NAME:
+                assert (builder.output_dir / relative).read_bytes() == page.read_bytes()
+
+    def test_incremental_and_cached(self, site: SiteBuilder, tmp_path: Path):
+        """Test that unchanged tabs are neither re-rendered nor re-parsed."""
+        builder = self.pipelined(site, site.output_dir, cache_dir=tmp_path / "cache")
+        builder.build(incremental=True)
+        write_tab(site.content_dir, "artist-one", "song-a", "Song A Remix")
+
+        result = builder.build(incremental=True)
+        assert result.pages_generated == 3
+        assert result.pages_skipped == 3
+        page = site.output_dir / "tabs" / "artist-one" / "song-a.html"
+        assert "Song A Remix" in page.read_text()
+        with ParseCache(tmp_path / "cache") as cache:
+            for source in (site.content_dir / "tabs").rglob("*.md"):
+                assert cache.get(source).digest == hash_file(source)
+
+    def test_reports_broken_tabs(self, site: SiteBuilder, tmp_path: Path, capsys):
+        """Test that a tab that fails to parse is skipped with a warning."""
+        broken = site.content_dir / "tabs" / "artist-two" / "broken.md"
+        broken.write_text("---\ntitle: [unclosed\n---\n")
+        result = self.pipelined(site, site.output_dir).build()
+        assert result.success
+        assert result.search_index_size == 3
+        assert f"Failed to parse {broken}" in capsys.readouterr().out
+
+    def test_reports_failed_writes(
+        self, site: SiteBuilder, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ):
+        """Test that a page that cannot be written fails the build, not the run."""
+        write_output = builder_module._write_output
+
+        def failing_write(path: Path, data: bytes) -> None:
+            if path.name == "song-a.html":
+                raise OSError("disk full")
+            write_output(path, data)
+
+        monkeypatch.setattr(builder_module, "_write_output", failing_write)
+        result = self.pipelined(site, tmp_path / "dist-pipeline").build()
+        assert result.errors == [
+            "Failed to write tabs/artist-one/song-a.html: disk full"
+        ]
+        assert result.pages_generated == 5
+
+
+class TestShardedBuild:
+    """Tests for building shards and merging them."""
+
+    def builder(self, site: SiteBuilder, output_dir: Path, **kwargs) -> SiteBuilder:
+        return SiteBuilder(
+            content_dir=site.content_dir,
+            templates_dir=site.templates_dir,
+            static_dir=site.static_dir,
+            output_dir=output_dir,
+            **kwargs,
+        )
+
+    def build_shards(self, site: SiteBuilder, tmp_path: Path, **kwargs) -> list[Path]:
+        """Build both shards of the site and return their output directories."""
+        shard_dirs = []
+        for index in (1, 2):
+            output_dir = tmp_path / f"shard-{index}"
+            shard = self.builder(site, output_dir, shard=(index, 2), **kwargs)
+            assert shard.build().success
+            shard_dirs.append(output_dir)
+        return shard_dirs
+
+    def test_shard_builds_its_artists_only(self, site: SiteBuilder, tmp_path: Path):
+        """Test that a shard renders its artists' pages but not the index."""
+        shard_dirs = self.build_shards(site, tmp_path)
+        first = shard_dirs[0]
+        assert (first / "tabs" / "artist-one" / "song-a.html").exists()
+        assert not (first / "tabs" / "artist-two").exists()
+        assert (first / "artist" / "artist-one.html").exists()
+        assert not (first / "index.html").exists()
+        assert (
+            json.loads((first / "search-index.json").read_text())["documentCount"] == 2
+        )
+        assert (first / SHARD_METADATA_NAME).exists()
+
+    @pytest.mark.parametrize("pipeline", [None, StageLimits(window=2)])
+    def test_shards_share_a_parse_cache(
+        self, site: SiteBuilder, tmp_path: Path, pipeline: StageLimits | None
+    ):
+        """Test that building one shard keeps the other shards' cache entries."""
+        self.build_shards(
+            site, tmp_path, cache_dir=tmp_path / "cache", pipeline=pipeline
+        )
+        with ParseCache(tmp_path / "cache") as cache:
+            for source in (site.content_dir / "tabs").rglob("*.md"):
+                assert cache.get(source) is not None, source
+
+    @pytest.mark.parametrize("pipeline", [None, StageLimits(window=2)])
+    def test_shard_parses_its_sources_only(
+        self, site: SiteBuilder, tmp_path: Path, capsys, pipeline: StageLimits | None
+    ):
+        """Test that sources are split by directory before they are parsed."""
+        broken = site.content_dir / "tabs" / "artist-two" / "broken.md"
+        broken.write_text("---\ntitle: [unclosed\n---\n")
+        shard = self.builder(site, tmp_path / "shard", shard=(1, 2), pipeline=pipeline)
+        result = shard.build()
+        assert result.success
+        assert result.search_index_size == 2
+        assert "Failed to parse" not in capsys.readouterr().out
+
+    @pytest.mark.parametrize("pipeline", [None, StageLimits(window=2)])
+    def test_merge_matches_plain_build(
+        self, site: SiteBuilder, tmp_path: Path, pipeline: StageLimits | None
+    ):
+        """Test that merged shards give the same site as one plain build."""
+        site.build()
+        shard_dirs = self.build_shards(site, tmp_path, pipeline=pipeline)
+        merged = self.builder(site, tmp_path / "merged")
+        result = merged.merge(shard_dirs)
+        assert result.success, result.errors
+        assert result.search_index_size == 3
+
+        plain = {
+            p.relative_to(site.output_dir)
+            for p in site.output_dir.rglob("*")
+            if p.is_file() and p.name not in (MANIFEST_NAME, SNAPSHOT_NAME)
+        }
+        assert {
+            p.relative_to(merged.output_dir)
+            for p in merged.output_dir.rglob("*")
+            if p.is_file()
+        } == plain
+        for relative in plain:
+            assert (merged.output_dir / relative).read_bytes() == (
+                site.output_dir / relative
+            ).read_bytes(), relative
+
+    def test_merge_needs_every_shard(self, site: SiteBuilder, tmp_path: Path):
+        """Test that a merge missing a shard fails and leaves no output."""
+        shard_dirs = self.build_shards(site, tmp_path)
+        merged = self.builder(site, tmp_path / "merged")
+        result = merged.merge(shard_dirs[:1])
+        assert result.errors == ["Expected shards 1/2 to 2/2"]
+        assert not merged.output_dir.exists()
+
+    def test_merge_needs_matching_options(self, site: SiteBuilder, tmp_path: Path):
+        """Test that shards built with other options are refused."""
+        shard_dirs = self.build_shards(site, tmp_path)
+        merged = self.builder(site, tmp_path / "merged", base_url="/tabs")
+        result = merged.merge(shard_dirs)
+        assert not result.success
+        assert "built with different options" in result.errors[0]
+
+
+class TestUpdate:
+    """Tests for targeted rebuilds used by watch mode."""
+
+    def test_tab_edit_rebuilds_tab_artist_and_search(self, site: SiteBuilder):
+        """Test that editing a tab body leaves the index page alone."""
+        site.build()
+        index_mtime = (site.output_dir / "index.html").stat().st_mtime_ns
+        path = site.content_dir / "tabs" / "artist-one" / "song-a.md"
+        path.write_text(path.read_text().replace("Some words", "Other words"))
+
+        start = time.perf_counter()
+        result = site.update({path})
+        assert time.perf_counter() - start < 0.1
+
+        assert result.success
+        # tab page + artist page
+        assert result.pages_generated == 2
+        page = site.output_dir / "tabs" / "artist-one" / "song-a.html"
+        assert "Other words" in page.read_text()
+        assert (site.output_dir / "index.html").stat().st_mtime_ns == index_mtime
+
+    @pytest.mark.parametrize("incremental", [False, True])
+    def test_fulltext_updated_without_reparsing(
+        self,
+        site: SiteBuilder,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+        incremental: bool,
+    ):
+        """Test that only changed tabs are read to update the lyric index."""
+        site.build()
+        if incremental:
+            # Starts from the indexes on disk rather than ones in memory
+            site.build(incremental=True)
+        parsed: list[Path] = []
+        parse_file = builder_module.parse_file
+
+        def recording_parse_file(path: Path):
+            parsed.append(path)
+            return parse_file(path)
+
+        def no_iter_tabs(*args, **kwargs):
+            raise AssertionError("every tab was read again")
+
+        monkeypatch.setattr(builder_module, "parse_file", recording_parse_file)
+        monkeypatch.setattr(builder_module, "iter_tabs", no_iter_tabs)
+        edited = site.content_dir / "tabs" / "artist-one" / "song-b.md"
+        edited.write_text(edited.read_text().replace("Some words", "Other words"))
+        added = write_tab(site.content_dir, "artist-one", "song-aa", "Song AA")
+        deleted = site.content_dir / "tabs" / "artist-two" / "song-c.md"
+        deleted.unlink()
+        assert site.update({edited, added, deleted}).success
+        assert sorted(parsed) == sorted([edited, added])
+        monkeypatch.undo()
+
+        fresh = SiteBuilder(
+            content_dir=site.content_dir,
+            templates_dir=site.templates_dir,
+            static_dir=site.static_dir,
+            output_dir=tmp_path / "fresh",
+        )
+        fresh.build()
+        for name in ["lyrics-index.json", "chords-index.json"]:
+            updated = json.loads((site.output_dir / name).read_bytes())
+            assert updated == json.loads((fresh.output_dir / name).read_bytes())
+            assert "artist-one/song-aa" in updated["ids"]
+
+    def test_update_compresses_search_index_fast(
+        self, site: SiteBuilder, monkeypatch: pytest.MonkeyPatch
+    ):
+        """Test that only builds compress the search index as small as they can."""
+        modes: list[bool] = []
+        write_compressed = search_module.write_compressed
+
+        def recording_write_compressed(path: Path, data: bytes, *, fast: bool = False):
+            modes.append(fast)
+            write_compressed(path, data, fast=fast)
+
+        monkeypatch.setattr(
+            search_module, "write_compressed", recording_write_compressed
+        )
+        site.build()
+        assert modes == [False]
+        path = write_tab(site.content_dir, "artist-two", "song-c", "Song C Live")
+        site.update({path})
+        assert modes == [False, True]
+        assert not (site.output_dir / "lyrics-index.json.gz").exists()
+        site.build(incremental=True)
+        assert modes == [False, True, False]
+        assert (site.output_dir / "lyrics-index.json.gz").exists()
+
+    def test_title_edit_rebuilds_index(self, site: SiteBuilder):
+        """Test that a change visible on the index re-renders it."""
+        site.build()
+        path = write_tab(site.content_dir, "artist-two", "song-c", "Song C Live")
+        result = site.update({path})
+        assert result.pages_generated == 3
+        assert "Song C Live" in (site.output_dir / "index.html").read_text()
+        assert "Song C Live" in (site.output_dir / "search-index.json").read_text()
+
+    def test_deleted_tab_is_pruned(self, site: SiteBuilder):
+        """Test that deleting a tab removes its page and empty artist page."""
+        site.build()
+        path = site.content_dir / "tabs" / "artist-two" / "song-c.md"
+        path.unlink()
+        result = site.update({path})
+        assert result.search_index_size == 2
+        assert not (site.output_dir / "tabs" / "artist-two").exists()
+        assert not (site.output_dir / "artist" / "artist-two.html").exists()
+
+        # The manifest follows along, so an incremental build has nothing to do
+        result = site.build(incremental=True)
+        assert result.pages_generated == 0
+
+    def test_broken_edit_keeps_old_page(self, site: SiteBuilder):
+        """Test that an unparseable edit is reported and keeps the old page."""
+        site.build()
+        path = site.content_dir / "tabs" / "artist-one" / "song-a.md"
+        path.write_text("---\ntitle: Song A\n---\n")
+        result = site.update({path})
+        assert not result.success
+        assert (site.output_dir / "tabs" / "artist-one" / "song-a.html").exists()
+
+    def test_template_edit_rebuilds_everything(self, site: SiteBuilder, tmp_path: Path):
+        """Test that a template change re-renders every page."""
+        templates_dir = copy_templates(tmp_path / "templates")
+        builder = SiteBuilder(
+            content_dir=site.content_dir,
+            templates_dir=templates_dir,
+            static_dir=site.static_dir,
+            output_dir=site.output_dir,
+        )
+        builder.build()
+        base = templates_dir / "base.html"
+        base.write_text(base.read_text().replace("TabStash", "TabStash!"))
+        result = builder.update({base})
+        assert result.pages_generated == 6
+        assert "TabStash!" in (builder.output_dir / "index.html").read_text()
+
+    def test_static_edit_copies_one_file(self, site: SiteBuilder, tmp_path: Path):
+        """Test that without fingerprints an asset change only copies it."""
+        static_dir = tmp_path / "static"
+        (static_dir / "css").mkdir(parents=True)
+        css = static_dir / "css" / "style.css"
+        css.write_text("body {}")
+        builder = SiteBuilder(
+            content_dir=site.content_dir,
+            templates_dir=site.templates_dir,
+            static_dir=static_dir,
+            output_dir=site.output_dir,
+            optimize_assets=False,
+        )
+        builder.build()
+        css.write_text("body { color: red; }")
+        result = builder.update({css})
+        assert result.pages_generated == 0
+        output = builder.output_dir / "static" / "css" / "style.css"
+        assert output.read_text() == "body { color: red; }"
+
+    def test_fingerprinted_edit_rebuilds_pages(self, site: SiteBuilder, tmp_path: Path):
+        """Test that an asset moving to a new name re-renders pages that link it."""
+        static_dir = tmp_path / "static"
+        (static_dir / "css").mkdir(parents=True)
+        css = static_dir / "css" / "style.css"
+        css.write_text("body {}")
+        builder = SiteBuilder(
+            content_dir=site.content_dir,
+            templates_dir=site.templates_dir,
+            static_dir=static_dir,
+            output_dir=site.output_dir,
+        )
+        builder.build()
+        old = builder.assets["css/style.css"]
+        css.write_text("body { color: red; }")
+        result = builder.update({css})
+        assert result.pages_generated == 6
+        new = builder.assets["css/style.css"]
+        assert new != old
+        assert not (builder.output_dir / "static" / old).exists()
+        assert f"/static/{new}" in (builder.output_dir / "index.html").read_text()
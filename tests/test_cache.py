@@ -0,0 +1,116 @@
+"""Tests for the persistent parse cache."""
+
+import os
+import re
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from tabstash.cache import PARSE_CACHE_NAME, ParseCache, schema_fingerprint
+from tabstash.parser import parse_directory
+
+
+@pytest.fixture
+def content_dir(tmp_path: Path) -> Path:
+    """A content tree with a couple of tabs, one using CRLF line endings."""
+    oasis = tmp_path / "content" / "tabs" / "oasis"
+    oasis.mkdir(parents=True)
+    (oasis / "wonderwall.md").write_text(
+        "---\ntitle: Wonderwall\nartist: Oasis\ntags: [acoustic]\n---\n\n"
+        "[Intro]\nEm7  G  Dsus4  A7sus4\n\n[Chorus]\nAnd all the roads\n\n"
+    )
+    (oasis / "half-the-world-away.md").write_bytes(
+        b"---\r\ntitle: Half the World Away\r\nartist: Oasis\r\n---\r\n"
+        b"[Verse]\r\nC  F\r\nI would like to leave this city\r\n"
+    )
+    return tmp_path / "content"
+
+
+def cached_parse(content_dir: Path, cache_dir: Path):
+    with ParseCache(cache_dir) as cache:
+        return parse_directory(content_dir, cache=cache)
+
+
+def cached_paths(cache_dir: Path) -> set[str]:
+    with sqlite3.connect(cache_dir / PARSE_CACHE_NAME) as conn:
+        return {path for (path,) in conn.execute("SELECT path FROM tabs")}
+
+
+class TestParseCache:
+    """Tests for cache hits, misses and eviction."""
+
+    def test_cache_hit_matches_fresh_parse(self, content_dir: Path, tmp_path: Path):
+        """Test that tabs rebuilt from the cache equal freshly parsed ones."""
+        cache_dir = tmp_path / "cache"
+        fresh = parse_directory(content_dir)
+        assert cached_parse(content_dir, cache_dir) == fresh
+        assert cached_parse(content_dir, cache_dir) == fresh
+        assert fresh[0].sections == ["Verse"]
+        assert fresh[1].sections == ["Intro", "Chorus"]
+
+    def test_hit_skips_parsing(self, content_dir: Path, tmp_path: Path, monkeypatch):
+        """Test that unchanged files are not handed to the parser."""
+        cache_dir = tmp_path / "cache"
+        cached_parse(content_dir, cache_dir)
+
+        def fail(paths):
+            assert paths == []
+            return []
+
+        monkeypatch.setattr("tabstash.parser._parse_batch", fail)
+        assert len(cached_parse(content_dir, cache_dir)) == 2
+
+    def test_modified_file_is_reparsed(self, content_dir: Path, tmp_path: Path):
+        """Test that an edited file does not come from the cache."""
+        cache_dir = tmp_path / "cache"
+        cached_parse(content_dir, cache_dir)
+
+        path = content_dir / "tabs" / "oasis" / "wonderwall.md"
+        path.write_text(path.read_text().replace("Wonderwall", "Wonderwall (Live)"))
+        tabs = cached_parse(content_dir, cache_dir)
+        assert tabs[1].metadata.title == "Wonderwall (Live)"
+
+    def test_touched_file_is_reused(
+        self, content_dir: Path, tmp_path: Path, monkeypatch
+    ):
+        """Test that a new mtime with identical content still hits."""
+        cache_dir = tmp_path / "cache"
+        cached_parse(content_dir, cache_dir)
+
+        path = content_dir / "tabs" / "oasis" / "wonderwall.md"
+        os.utime(path, ns=(0, 0))
+        monkeypatch.setattr("tabstash.parser._parse_batch", lambda paths: [])
+        assert len(cached_parse(content_dir, cache_dir)) == 2
+
+    def test_deleted_file_is_evicted(self, content_dir: Path, tmp_path: Path):
+        """Test that entries for deleted sources are dropped."""
+        cache_dir = tmp_path / "cache"
+        cached_parse(content_dir, cache_dir)
+        assert len(cached_paths(cache_dir)) == 2
+
+        (content_dir / "tabs" / "oasis" / "wonderwall.md").unlink()
+        cached_parse(content_dir, cache_dir)
+        assert len(cached_paths(cache_dir)) == 1
+
+    def test_schema_change_invalidates(
+        self, content_dir: Path, tmp_path: Path, monkeypatch
+    ):
+        """Test that a different metadata schema empties the cache."""
+        cache_dir = tmp_path / "cache"
+        cached_parse(content_dir, cache_dir)
+
+        monkeypatch.setattr("tabstash.cache.schema_fingerprint", lambda: "changed")
+        ParseCache(cache_dir).close()
+        assert cached_paths(cache_dir) == set()
+
+    def test_fingerprint_covers_line_classification(self, monkeypatch):
+        """Test that changing how lines are classified changes the fingerprint."""
+        before = schema_fingerprint()
+        monkeypatch.setattr(
+            "tabstash.parser.LINE_PATTERNS", (re.compile(r"^\[([^\]]+)\]$"),)
+        )
+        assert schema_fingerprint() != before
+        monkeypatch.undo()
+        monkeypatch.setattr("tabstash.parser.LINE_KINDS_VERSION", 0)
+        assert schema_fingerprint() != before
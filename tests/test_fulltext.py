@@ -0,0 +1,255 @@
+"""Tests for full-text lyric and chord search."""
+
+import json
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from tabstash.fulltext import (
+    CHORDS_INDEX_NAME,
+    LYRICS_INDEX_NAME,
+    FullTextIndexer,
+    PositionalIndex,
+    chord_terms,
+    chord_token,
+    split_chords_and_lyrics,
+)
+from tabstash.parser import parse_directory
+from tabstash.search import process_term, tokenize
+
+PROJECT_ROOT = Path(__file__).parent.parent
+FULLTEXT_JS = PROJECT_ROOT / "static" / "js" / "fulltext.js"
+
+requires_node = pytest.mark.skipif(
+    shutil.which("node") is None, reason="node not installed"
+)
+
+SONG = """[Intro]
+Em7  G  Dsus4  A7sus4  (x2)
+
+[Verse 1]
+Em7              G
+Today is gonna be the day
+         Dsus4                 A7sus4
+That they're gonna throw it back to you
+
+[Solo]
+e|---0---3---|
+B|---0---3---|
+Play [Am] along [F/C] here
+"""
+
+
+def lyric_terms(text: str) -> list[str]:
+    """Tokenize a lyric query like the index does."""
+    return [term for t in tokenize(text) if (term := process_term(t))]
+
+
+def shipped_indexes() -> tuple[PositionalIndex, PositionalIndex]:
+    """Full-text indexes over the tabs shipped in content/."""
+    indexer = FullTextIndexer()
+    for tab in parse_directory(PROJECT_ROOT / "content"):
+        indexer.add(tab)
+    return indexer.lyrics, indexer.chords
+
+
+class TestSplitChordsAndLyrics:
+    """Tests for separating chords from lyrics."""
+
+    def test_recognises_chords(self):
+        """Test that common chord spellings are chords and words are not."""
+        for chord in ["G", "Em7", "Dsus4", "A7sus4", "F#m", "Bb", "D/F#", "Cadd9"]:
+            assert chord_token(chord) == chord
+        assert chord_token("(G)") == "G"
+        for word in ["About", "I", "Am?", "Go", "day"]:
+            assert chord_token(word) is None
+
+    def test_splits_chords_from_lyrics(self):
+        """Test that chord lines, headers and tab staves stay out of lyrics."""
+        chords, lyrics = split_chords_and_lyrics(SONG)
+        assert chords == [
+            "Em7", "G", "Dsus4", "A7sus4", "Em7", "G", "Dsus4", "A7sus4", "Am", "F/C"
+        ]  # fmt: skip
+        assert lyrics[:6] == ["today", "is", "gonna", "be", "the", "day"]
+        assert lyrics[-3:] == ["play", "along", "here"]
+        assert "e" not in lyrics
+
+    def test_lyric_line_starting_with_chord_letter(self):
+        """Test that a lyric line is not mistaken for chords."""
+        chords, lyrics = split_chords_and_lyrics("A love like ours")
+        assert chords == []
+        assert lyrics == ["a", "love", "like", "ours"]
+
+    def test_lyric_line_starting_with_inline_chord(self):
+        """Test that a leading inline chord does not make a line a header."""
+        chords, lyrics = split_chords_and_lyrics("[Am]Today is the [G]day")
+        assert chords == ["Am", "G"]
+        assert lyrics == ["today", "is", "the", "day"]
+
+
+class TestPositionalIndex:
+    """Tests for phrase and chord-sequence queries."""
+
+    def test_phrase_query(self):
+        """Test that phrases only match words in order."""
+        index = PositionalIndex()
+        index.add("a/one", "One", "A", lyric_terms("today is gonna be the day"))
+        index.add("b/two", "Two", "B", lyric_terms("the day is today gonna be"))
+        assert index.search(lyric_terms("gonna be the day")) == ["a/one"]
+        assert index.search(lyric_terms("today gonna")) == ["b/two"]
+        assert index.search(lyric_terms("gonna be")) == ["a/one", "b/two"]
+        assert index.search(lyric_terms("never heard")) == []
+
+    def test_chord_sequence_query(self):
+        """Test that chord progressions match in order."""
+        index = PositionalIndex()
+        index.add("a/one", "One", "A", chord_terms(["G", "D", "Em", "C"]))
+        index.add("b/two", "Two", "B", chord_terms(["C", "Em", "D", "G"]))
+        assert index.search(chord_terms(["G", "D", "Em", "C"])) == ["a/one"]
+        assert index.search(chord_terms(["Em", "D"])) == ["b/two"]
+
+    def test_shipped_tabs(self):
+        """Test queries against the shipped tabs."""
+        lyrics, chords = shipped_indexes()
+        assert lyrics.search(lyric_terms("by now you should've somehow")) == [
+            "oasis/wonderwall"
+        ]
+        assert "oasis/wonderwall" in chords.search(
+            chord_terms(["Em7", "G", "Dsus4", "A7sus4"])
+        )
+
+    def test_common_terms_become_stop_terms(self):
+        """Test that terms over the postings cap are dropped but still match."""
+        index = PositionalIndex(max_postings=2)
+        for i in range(3):
+            index.add(f"a/{i}", "T", "A", lyric_terms(f"the song number{i}"))
+        assert "the" in index.stop
+        assert "the" not in index.postings
+        assert index.search(lyric_terms("the song number1")) == ["a/1"]
+        assert index.search(lyric_terms("the")) == ["a/0", "a/1", "a/2"]
+
+    def test_position_cap_never_loses_matches(self):
+        """Test that cut-off position lists still match by presence."""
+        index = PositionalIndex(max_positions=2)
+        index.add("a/one", "One", "A", lyric_terms("la la la la la la end"))
+        assert len(index.postings["la"][0]) == 2
+        assert index.search(lyric_terms("la end")) == ["a/one"]
+
+    def test_replace_and_remove_match_a_rebuild(self):
+        """Test that editing documents in place gives the index a rebuild would."""
+        index = PositionalIndex()
+        index.add("a/one", "One", "A", lyric_terms("today is the day"))
+        index.add("b/two", "Two", "B", lyric_terms("silver and gold"))
+        index.replace("a/one", "One", "A", lyric_terms("the day is done"), 0)
+        index.replace("a/three", "Three", "A", lyric_terms("gold day"), 1)
+        index.remove("b/two")
+
+        rebuilt = PositionalIndex()
+        rebuilt.add("a/one", "One", "A", lyric_terms("the day is done"))
+        rebuilt.add("a/three", "Three", "A", lyric_terms("gold day"))
+        assert index.to_dict() == rebuilt.to_dict()
+        assert index.search(lyric_terms("gold day")) == ["a/three"]
+
+    def test_serialized_layout(self):
+        """Test that postings are gap encoded and artists interned."""
+        index = PositionalIndex()
+        index.add("a/one", "One", "A", ["x", "y", "x"])
+        index.add("a/two", "Two", "A", ["y"])
+        data = index.to_dict()
+        assert data["artistNames"] == ["A"]
+        assert data["artists"] == [0, 0]
+        assert data["terms"]["x"] == [0, 2, 0, 2]
+        assert data["terms"]["y"] == [0, 1, 1, 1, 1, 0]
+
+    def test_loads_and_re_adds_documents(self):
+        """Test that a loaded index re-adds its documents into the same index."""
+        index = PositionalIndex(max_positions=2)
+        index.add("a/one", "One", "A", lyric_terms("la la la the end of it"))
+        index.add("b/two", "Two", "B", lyric_terms("end of the la"))
+        loaded = PositionalIndex.from_dict(index.to_dict())
+        assert loaded.postings == index.postings
+        copy = PositionalIndex(max_positions=2)
+        for document in loaded.documents():
+            copy.add_positions(*document)
+        # Term order included, since it decides the serialized bytes
+        assert json.dumps(copy.to_dict()) == json.dumps(index.to_dict())
+
+    def test_writes_index_files(self, tmp_path):
+        """Test that both indexes are written with compressed siblings."""
+        indexer = FullTextIndexer()
+        for tab in parse_directory(PROJECT_ROOT / "content"):
+            indexer.add(tab)
+        indexer.write(tmp_path)
+        for name in (LYRICS_INDEX_NAME, CHORDS_INDEX_NAME):
+            data = json.loads((tmp_path / name).read_text())
+            assert len(data["ids"]) == 5
+            assert (tmp_path / (name + ".gz")).exists()
+
+
+@requires_node
+class TestFullTextJs:
+    """Tests for fulltext.js against indexes built in Python."""
+
+    def run_js(self, body: str, payload: object) -> object:
+        """Run a snippet with ``ft`` and ``input`` bound, returning its JSON."""
+        script = (
+            f"const ft = require({json.dumps(str(FULLTEXT_JS))});"
+            "const input = JSON.parse(require('fs').readFileSync(0, 'utf8'));"
+            f"process.stdout.write(JSON.stringify((() => {{ {body} }})()));"
+        )
+        output = subprocess.run(
+            ["node", "-e", script],
+            input=json.dumps(payload),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        return json.loads(output)
+
+    def test_parse_query(self):
+        """Test that quoted queries search lyrics and chord runs search chords."""
+        queries = ['"Today is gonna"', "G D Em C", "Oasis", "G", '""']
+        parsed = self.run_js("return input.map(q => ft.parseQuery(q));", queries)
+        assert parsed == [
+            {"kind": "lyrics", "terms": ["today", "is", "gonna"]},
+            {"kind": "chords", "terms": ["G D", "D Em", "Em C"]},
+            None,
+            None,
+            None,
+        ]
+
+    def test_matches_python_search(self):
+        """Test that fulltext.js returns the same documents as Python."""
+        lyrics, chords = shipped_indexes()
+        lyrics.max_positions = chords.max_positions = 3
+        queries = [
+            (lyrics, lyric_terms(q))
+            for q in ["you", "i want you to want me", "silver and gold", "the day"]
+        ] + [
+            (chords, chord_terms(q.split()))
+            for q in ["G C D G", "Em7 G", "Am G", "C D Em7", "A B"]
+        ]
+        common = PositionalIndex(max_postings=1)
+        common.add("a/one", "One", "A", lyric_terms("the day"))
+        common.add("b/two", "Two", "B", lyric_terms("the night"))
+        queries += [(common, lyric_terms(q)) for q in ["the", "the night"]]
+        payload = [[index.to_dict(), terms] for index, terms in queries]
+        found = self.run_js(
+            "return input.map(([data, terms]) => ft.load(data).search(terms));",
+            payload,
+        )
+        expected = [
+            [
+                {
+                    "id": doc_id,
+                    "title": index.titles[index.ids.index(doc_id)],
+                    "artist": index.artists[index.ids.index(doc_id)],
+                }
+                for doc_id in index.search(terms)
+            ]
+            for index, terms in queries
+        ]
+        assert found == expected
+        assert any(found)
@@ -0,0 +1,113 @@
+"""Tests for the fast frontmatter reader."""
+
+from pathlib import Path
+
+import frontmatter
+import pytest
+
+from tabstash.header import scan_flat_yaml, split_frontmatter
+from tabstash.parser import read_source
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+BODY = "\n\n[Verse]\nG  C  D\nSome words here\n"
+
+# Headers that exercise the scanner, the YAML fallback and the
+# python-frontmatter fallback
+HEADERS = [
+    'title: "Song"\nartist: "Band"',
+    "title: Song\nartist: Band & Friends",
+    "title: 'It''s'\nartist: Band",
+    "title: Song # comment\nartist: Band",
+    "title: Song\nartist: Band\ncapo: 0\nbpm: 120\nfeatured: true",
+    "title: No\nartist: Yes",
+    "title: Song\nartist: Band\nfeatured: True",
+    "title: Song\nartist: Band\nkey: ~",
+    "title: Song\nartist: Band\nkey:",
+    "title: Song\nartist: Band\nkey: 0x1F",
+    "title: Song\nartist: Band\ncapo: 07",
+    "title: Song\nartist: Band\nbpm: 1.5",
+    "title: Song\nartist: Band\nyear: 2003-01-01",
+    'title: "Say \\"hi\\""\nartist: Band',
+    "title: Song\nartist: Band\ntags: []",
+    "title: Song\nartist: Band\ntags: [rock, \"90s\", 3, 'a, b']",
+    "title: Song\nartist: Band\ntags: [rock, no]",
+    "title: Song\nartist: Band\ntags: [rock, ]",
+    "title: Song\nartist: Band\ntags:\n  - rock\n  - pop",
+    "title: Song\nartist: Band\nmeta:\n  nested: true",
+    "title: Song\ntitle: Again\nartist: Band",
+    "# leading comment\n\ntitle: Song\nartist: Band\n",
+    "title: Sigur Rós\nartist: Hoppípolla",
+    "title: Song\nartist: Band\non: stage",
+    "title:Song\nartist: Band",
+    "",
+    "- a\n- b",
+]
+
+# Whole files, including unusual delimiters
+FILES = [f"---\n{header}\n---{BODY}" for header in HEADERS] + [
+    f"----\ntitle: Song\nartist: Band\n----{BODY}",
+    f"---  \ntitle: Song\nartist: Band\n---  {BODY}",
+    f"\n\n---\ntitle: Song\nartist: Band\n---{BODY}",
+    "---\ntitle: Song\nartist: Band\n---",
+    f"---\ntitle: Song\nartist: Band\n---\n\n\n---\nmore{BODY}",
+    f"---\n---{BODY}",
+    f'{{"title": "Song", "artist": "Band"}}{BODY}',
+    f"no frontmatter at all{BODY}",
+    "---\ntitle: Song\nartist: Band\n",
+]
+
+
+def corpus() -> list[str]:
+    """Every shipped and fixture tab plus the edge-case files."""
+    paths = sorted((PROJECT_ROOT / "content").rglob("*.md"))
+    paths += sorted((PROJECT_ROOT / "tests" / "fixtures").rglob("*.md"))
+    return [read_source(path)[1] for path in paths] + FILES
+
+
+class TestSplitFrontmatter:
+    """Tests for split_frontmatter."""
+
+    @pytest.mark.parametrize("text", corpus())
+    def test_matches_python_frontmatter(self, text: str):
+        """Test that the fast reader agrees with frontmatter.loads."""
+        try:
+            post = frontmatter.loads(text)
+        except Exception:
+            with pytest.raises(Exception):  # noqa: B017
+                split_frontmatter(text)
+            return
+        metadata, content = split_frontmatter(text)
+        assert metadata == post.metadata
+        assert [type(v) for v in metadata.values()] == [
+            type(v) for v in post.metadata.values()
+        ]
+        assert content == post.content
+
+    def test_shipped_tabs_use_the_scanner(self):
+        """Test that real headers never need the YAML loader."""
+        for path in sorted((PROJECT_ROOT / "content").rglob("*.md")):
+            text = read_source(path)[1]
+            block = text[4 : text.index("\n---", 4)]
+            assert scan_flat_yaml(block) is not None, path
+
+
+class TestScanFlatYaml:
+    """Tests for the flat header scanner."""
+
+    def test_reads_flat_values(self):
+        """Test quoted, plain, integer, boolean and list values."""
+        block = 'title: "F#m Blues"\nartist: Band\ncapo: 2\nfeatured: false\n'
+        block += 'tags: [rock, "90s"]'
+        assert scan_flat_yaml(block) == {
+            "title": "F#m Blues",
+            "artist": "Band",
+            "capo": 2,
+            "featured": False,
+            "tags": ["rock", "90s"],
+        }
+
+    def test_declines_ambiguous_values(self):
+        """Test that values with other YAML meanings are left to PyYAML."""
+        for block in ["capo: 07", "title: No", "key: ~", "tags:\n  - a", "a: b: c"]:
+            assert scan_flat_yaml(block) is None, block
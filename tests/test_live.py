@@ -0,0 +1,200 @@
+"""Tests for on-demand rendering."""
+
+import http.client
+import json
+import os
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from tabstash.builder import SiteBuilder
+from tabstash.live import LiveServer, LiveSite
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+def write_tab(content_dir: Path, artist: str, song: str, title: str) -> None:
+    """Write a minimal tab file."""
+    path = content_dir / "tabs" / artist / f"{song}.md"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(f"""---
+title: {title}
+artist: {artist.replace("-", " ").title()}
+---
+
+[Verse]
+G  C  D
+Some words here
+""")
+
+
+@pytest.fixture
+def site(tmp_path: Path) -> LiveSite:
+    """A live site over a small three-tab catalog."""
+    content_dir = tmp_path / "content"
+    write_tab(content_dir, "artist-one", "song-a", "Song A")
+    write_tab(content_dir, "artist-one", "song-b", "Song B")
+    write_tab(content_dir, "artist-two", "song-c", "Song C")
+    builder = SiteBuilder(
+        content_dir=content_dir,
+        templates_dir=PROJECT_ROOT / "templates",
+        static_dir=PROJECT_ROOT / "static",
+        output_dir=tmp_path / "dist",
+        optimize_assets=False,
+        page_size=2,
+    )
+    return LiveSite(builder, rescan_interval=0)
+
+
+def touch(path: Path, text: str) -> None:
+    """Rewrite a file so its stat is sure to change."""
+    mtime = path.stat().st_mtime_ns
+    path.write_text(text)
+    os.utime(path, ns=(mtime + 10**9, mtime + 10**9))
+
+
+class TestLiveSite:
+    """Tests for rendering pages from sources."""
+
+    def test_renders_without_output(self, site: LiveSite):
+        """Test that every kind of page renders and nothing is written."""
+        tab = site.get("/tabs/artist-one/song-a.html")
+        assert b"Song A" in tab.body
+        assert tab.content_type.startswith("text/html")
+        assert b"Song A" in site.get("/").body
+        assert b"Song C" in site.get("/artist/artist-two.html").body
+        assert b"Artist Two" in site.get("/artists.html").body
+        search = json.loads(site.get("/search-index.json").body)
+        assert search["documentCount"] == 3
+        assert site.get("/lyrics-index.json") is not None
+        assert not site.builder.output_dir.exists()
+
+    def test_matches_build(self, site: LiveSite):
+        """Test that a live tab page is the page a build writes."""
+        site.builder.build()
+        path = "tabs/artist-one/song-b.html"
+        assert site.get(path).body == (site.builder.output_dir / path).read_bytes()
+
+    def test_later_pages(self, site: LiveSite):
+        """Test that paginated listings are served past their first page."""
+        assert b"Song C" in site.get("/index/2.html").body
+        assert site.get("/index/3.html") is None
+
+    def test_unknown_paths(self, site: LiveSite):
+        """Test that paths with no page return None."""
+        for path in [
+            "/tabs/artist-one/missing.html",
+            "/tabs/../song-a.html",
+            "/artist/nobody.html",
+            "/robots.txt",
+        ]:
+            assert site.get(path) is None, path
+
+    def test_caches_until_source_changes(self, site: LiveSite):
+        """Test that pages are cached and re-rendered once a source changes."""
+        first = site.get("/tabs/artist-one/song-a.html")
+        assert site.get("/tabs/artist-one/song-a.html") is first
+        assert site.hits == 1
+        path = site.builder.content_dir / "tabs" / "artist-one" / "song-a.md"
+        touch(path, path.read_text().replace("Song A", "Song Z"))
+        assert b"Song Z" in site.get("/tabs/artist-one/song-a.html").body
+
+    def test_listings_follow_catalog(self, site: LiveSite):
+        """Test that added and deleted tabs show up in listings."""
+        assert b"New Song" not in site.get("/artist/artist-two.html").body
+        write_tab(site.builder.content_dir, "artist-two", "new", "New Song")
+        assert b"New Song" in site.get("/artist/artist-two.html").body
+        (site.builder.content_dir / "tabs" / "artist-two" / "new.md").unlink()
+        assert b"New Song" not in site.get("/artist/artist-two.html").body
+
+    def test_rescans_at_most_once_per_interval(self, site: LiveSite):
+        """Test that listings skip the scan until the interval has passed."""
+        site.rescan_interval = 60
+        site.get("/artist/artist-two.html")
+        write_tab(site.builder.content_dir, "artist-two", "new", "New Song")
+        assert b"New Song" not in site.get("/artist/artist-two.html").body
+        site.rescan_interval = 0
+        assert b"New Song" in site.get("/artist/artist-two.html").body
+
+    def test_fulltext_built_once_per_catalog(
+        self, site: LiveSite, monkeypatch: pytest.MonkeyPatch
+    ):
+        """Test that both full-text indexes share one build until a tab changes."""
+        streamed = []
+        stream_tabs = site.builder.stream_tabs
+
+        def counting_stream_tabs():
+            streamed.append(True)
+            return stream_tabs()
+
+        monkeypatch.setattr(site.builder, "stream_tabs", counting_stream_tabs)
+        site.refresh()
+        streamed.clear()
+        site.get("/lyrics-index.json")
+        site.get("/chords-index.json")
+        assert len(streamed) == 1
+        write_tab(site.builder.content_dir, "artist-two", "new", "New Song")
+        assert b"artist-two/new" in site.get("/chords-index.json").body
+        assert len(streamed) == 2
+
+    def test_bounded_cache(self, site: LiveSite):
+        """Test that the least recently used page is evicted."""
+        site.max_pages = 1
+        site.get("/tabs/artist-one/song-a.html")
+        site.get("/tabs/artist-one/song-b.html")
+        site.get("/tabs/artist-one/song-a.html")
+        assert site.hits == 0
+
+
+@pytest.fixture
+def server(site: LiveSite) -> Iterator[LiveServer]:
+    """A live server for the site on a free port."""
+    httpd = LiveServer(("127.0.0.1", 0), site, quiet=True)
+    thread = threading.Thread(
+        target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    )
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def get(
+    server: LiveServer, path: str, **headers: str
+) -> tuple[http.client.HTTPResponse, bytes]:
+    """Make one GET request, with header names given in snake_case."""
+    connection = http.client.HTTPConnection(*server.server_address, timeout=5)
+    connection.request(
+        "GET", path, headers={k.replace("_", "-"): v for k, v in headers.items()}
+    )
+    response = connection.getresponse()
+    body = response.read()
+    connection.close()
+    return response, body
+
+
+class TestLiveServer:
+    """Tests for serving rendered pages over HTTP."""
+
+    def test_serves_pages(self, server: LiveServer):
+        """Test a rendered page and its revalidation."""
+        response, body = get(server, "/tabs/artist-two/song-c.html")
+        assert response.status == 200
+        assert b"Song C" in body
+        etag = response.getheader("ETag")
+        response, body = get(server, "/tabs/artist-two/song-c.html", if_none_match=etag)
+        assert response.status == 304
+        assert body == b""
+
+    def test_serves_static_files(self, server: LiveServer):
+        """Test that assets come straight from the static directory."""
+        response, body = get(server, "/static/css/style.css")
+        assert response.status == 200
+        assert body == (PROJECT_ROOT / "static" / "css" / "style.css").read_bytes()
+
+    def test_not_found(self, server: LiveServer):
+        """Test that unknown pages and assets are 404s."""
+        assert get(server, "/tabs/nobody/nothing.html")[0].status == 404
+        assert get(server, "/static/missing.css")[0].status == 404
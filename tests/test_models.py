@@ -1,9 +1,11 @@
 """Tests for Pydantic models."""
 
+from dataclasses import asdict, fields
+
 import pytest
 from pydantic import ValidationError
 
-from tabstash.models import TabMetadata
+from tabstash.models import Metadata, TabMetadata, validate_metadata
 
 
 class TestTabMetadata:
@@ -107,3 +109,33 @@ class TestTabMetadata:
         """Test valid BPM values."""
         meta = TabMetadata(title="Test", artist="Test", bpm=120)
         assert meta.bpm == 120
+
+
+class TestValidateMetadata:
+    """Tests for batched metadata validation."""
+
+    def test_metadata_mirrors_model(self):
+        """Test that Metadata has the same fields and defaults as TabMetadata."""
+        assert [f.name for f in fields(Metadata)] == list(TabMetadata.model_fields)
+        model = TabMetadata(title="Test", artist="Test")
+        assert asdict(Metadata(title="Test", artist="Test")) == model.model_dump()
+
+    def test_batch_matches_single(self):
+        """Test that a batch validates like one model at a time."""
+        headers = [
+            {"title": " Song ", "artist": "Band", "difficulty": "BEGINNER"},
+            {"title": "Other", "artist": "Band", "tags": ["rock"], "extra": 1},
+        ]
+        results = validate_metadata(headers)
+        assert [asdict(meta) for meta in results] == [
+            TabMetadata.model_validate(header).model_dump() for header in headers
+        ]
+
+    def test_errors_are_per_header(self):
+        """Test that one invalid header does not fail the rest of the batch."""
+        results = validate_metadata(
+            [{"title": "Song", "artist": "Band"}, {"title": "Song"}]
+        )
+        assert isinstance(results[0], Metadata)
+        assert isinstance(results[1], ValidationError)
+        assert "artist" in str(results[1])
@@ -0,0 +1,75 @@
+"""Tests for staged, write-only-if-changed output."""
+
+from pathlib import Path
+
+import pytest
+
+from tabstash.output import (
+    replace_directory,
+    set_stage,
+    stage,
+    write_file,
+    write_totals,
+)
+
+
+@pytest.fixture
+def live(tmp_path: Path) -> Path:
+    """An output directory holding one page."""
+    output_dir = tmp_path / "dist"
+    output_dir.mkdir()
+    (output_dir / "page.html").write_bytes(b"old")
+    return output_dir
+
+
+class TestWriteFile:
+    """Tests for skipping files that already hold the same bytes."""
+
+    def test_skips_identical_contents(self, live: Path):
+        """Test that an identical file is not rewritten."""
+        path = live / "page.html"
+        inode = path.stat().st_ino
+        before = write_totals()
+        assert not write_file(path, b"old")
+        assert write_file(path, b"new")
+        assert path.read_bytes() == b"new"
+        assert path.stat().st_ino != inode
+        stats = write_totals() - before
+        assert (stats.files_written, stats.bytes_written) == (1, 3)
+        assert (stats.files_skipped, stats.bytes_skipped) == (1, 3)
+
+    def test_links_unchanged_files_into_stage(self, live: Path):
+        """Test that a staged file identical to the live one is linked in."""
+        staging = stage(live, clone=False)
+        set_stage((staging, live))
+        try:
+            assert not write_file(staging / "page.html", b"old")
+            assert write_file(staging / "new.html", b"new")
+        finally:
+            set_stage(None)
+        assert (staging / "page.html").samefile(live / "page.html")
+        assert not (live / "new.html").exists()
+
+
+class TestReplaceDirectory:
+    """Tests for swapping a staged build into place."""
+
+    def test_swaps_in_staged_output(self, live: Path):
+        """Test that the staged tree replaces the output and is cleaned up."""
+        staging = stage(live, clone=True)
+        (staging / "page.html").unlink()
+        (staging / "new.html").write_bytes(b"new")
+        assert (live / "page.html").exists()
+
+        replace_directory(staging, live)
+        assert sorted(path.name for path in live.iterdir()) == ["new.html"]
+        assert [path.name for path in live.parent.iterdir()] == ["dist"]
+
+    def test_creates_missing_output(self, tmp_path: Path):
+        """Test that a first build simply moves the staging directory."""
+        output_dir = tmp_path / "dist"
+        staging = stage(output_dir, clone=True)
+        (staging / "index.html").write_bytes(b"hi")
+        replace_directory(staging, output_dir)
+        assert (output_dir / "index.html").read_bytes() == b"hi"
+        assert not staging.exists()
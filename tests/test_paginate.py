@@ -0,0 +1,52 @@
+"""Tests for listing pagination."""
+
+from pathlib import Path
+
+from tabstash.paginate import page_path, paginate, stale_pages
+
+
+class TestPaginate:
+    """Tests for paginate."""
+
+    def test_splits_into_pages(self):
+        """Test that items are split in order with a short last page."""
+        pages = paginate(list(range(5)), "index.html", 2)
+        assert [page.items for page in pages] == [[0, 1], [2, 3], [4]]
+        assert [page.number for page in pages] == [1, 2, 3]
+        assert {page.count for page in pages} == {3}
+        assert [page.path for page in pages] == [
+            "index.html",
+            "index/2.html",
+            "index/3.html",
+        ]
+
+    def test_always_one_page(self):
+        """Test that empty listings and a size of 0 give a single page."""
+        assert len(paginate([], "index.html", 10)) == 1
+        assert paginate(list(range(5)), "index.html", 0)[0].items == list(range(5))
+
+
+class TestPagePath:
+    """Tests for page_path."""
+
+    def test_nested_listing(self):
+        """Test that later pages go in a directory named after the first."""
+        assert page_path("artist/band.html", 1) == "artist/band.html"
+        assert page_path("artist/band.html", 4) == "artist/band/4.html"
+
+
+class TestStalePages:
+    """Tests for stale_pages."""
+
+    def test_finds_pages_past_the_end(self, tmp_path: Path):
+        """Test that only numbered pages beyond the count are stale."""
+        directory = tmp_path / "artist" / "band"
+        directory.mkdir(parents=True)
+        for name in ("2.html", "3.html", "4.html", "notes.html"):
+            (directory / name).write_text("")
+        stale = stale_pages(tmp_path, "artist/band.html", 2)
+        assert sorted(path.name for path in stale) == ["3.html", "4.html"]
+
+    def test_missing_directory(self, tmp_path: Path):
+        """Test that a listing that never had later pages has none stale."""
+        assert stale_pages(tmp_path, "index.html", 1) == []
@@ -4,7 +4,15 @@ from pathlib import Path
 
 import pytest
 
-from tabstash.parser import extract_sections, parse_file, slugify
+from tabstash.models import LineKind, Tab
+from tabstash.parser import (
+    extract_sections,
+    iter_tabs,
+    parse_directory,
+    parse_file,
+    slugify,
+    tokenize_lines,
+)
 
 
 class TestSlugify:
@@ -64,6 +72,41 @@ Play [Am] chord here
         assert sections == ["Verse"]
 
 
+class TestTokenizeLines:
+    """Tests for line classification."""
+
+    def test_classifies_each_line(self):
+        """Test that every kind of line is recognised once."""
+        content = "[Verse]\nG  C  D\nSome words here\n\ne|---0---3---|\nA love"
+        lines = tokenize_lines(content)
+        assert list(lines.items(content)) == [
+            (LineKind.SECTION, "[Verse]"),
+            (LineKind.CHORDS, "G  C  D"),
+            (LineKind.LYRICS, "Some words here"),
+            (LineKind.BLANK, ""),
+            (LineKind.STAFF, "e|---0---3---|"),
+            (LineKind.LYRICS, "A love"),
+        ]
+        assert lines.sections == ["Verse"]
+
+    def test_leading_inline_chord_is_lyrics(self):
+        """Test that a lyric line starting with an inline chord is no header."""
+        content = "[Verse]\n[Am]Today is gonna be the [G]day"
+        lines = tokenize_lines(content)
+        assert [kind for kind, _ in lines.items(content)] == [
+            LineKind.SECTION,
+            LineKind.LYRICS,
+        ]
+        assert lines.sections == ["Verse"]
+
+    def test_offsets_slice_lines(self):
+        """Test that line bounds address the original content."""
+        content = "[Intro]\n\nEm  G\nlast"
+        lines = tokenize_lines(content)
+        assert len(lines) == 4
+        assert [lines.line(content, i) for i in range(4)] == content.split("\n")
+
+
 class TestParseFile:
     """Tests for file parsing."""
 
@@ -99,3 +142,71 @@ Test content
         tab = parse_file(tab_file)
         assert tab.slug == "test-song"
         assert tab.artist_slug == "test-artist"
+
+
+class TestParseDirectory:
+    """Tests for directory parsing."""
+
+    @pytest.fixture
+    def content_dir(self, tmp_path: Path) -> Path:
+        """Create a small content tree with one broken tab."""
+        songs = [
+            ("zed", "last", "Last"),
+            ("abba", "waterloo", "Waterloo"),
+            ("abba", "sos", "SOS"),
+            ("muse", "uprising", "Uprising"),
+        ]
+        for artist, song, title in songs:
+            path = tmp_path / "tabs" / artist / f"{song}.md"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(f"---\ntitle: {title}\nartist: {artist}\n---\n\n[Verse]\n")
+        (tmp_path / "tabs" / "muse" / "broken.md").write_text("---\ntitle: x\n---\n")
+        return tmp_path
+
+    def test_sorted_by_artist_then_title(self, content_dir: Path):
+        """Test that tabs come back sorted by artist and title."""
+        tabs = parse_directory(content_dir)
+        assert [t.metadata.title for t in tabs] == [
+            "SOS",
+            "Waterloo",
+            "Uprising",
+            "Last",
+        ]
+
+    def test_missing_tabs_dir(self, tmp_path: Path):
+        """Test that a missing tabs directory yields no tabs."""
+        assert parse_directory(tmp_path) == []
+
+    def test_parallel_matches_serial(self, content_dir: Path, capsys):
+        """Test that a process pool parse matches the serial parse."""
+        serial = parse_directory(content_dir)
+        serial_out = capsys.readouterr().out
+        parallel = parse_directory(content_dir, workers=2)
+        parallel_out = capsys.readouterr().out
+
+        assert parallel == serial
+        assert parallel_out == serial_out
+        assert "broken.md" in serial_out
+
+    def test_iter_tabs_streams_in_discovery_order(self, content_dir: Path, capsys):
+        """Test that iter_tabs yields lazily and skips broken files."""
+        stream = iter_tabs(content_dir)
+        first = next(stream)
+        assert isinstance(first, Tab)
+        tabs = [first, *stream]
+        assert sorted(t.metadata.title for t in tabs) == [
+            "Last",
+            "SOS",
+            "Uprising",
+            "Waterloo",
+        ]
+        assert "broken.md" in capsys.readouterr().out
+
+    def test_summary_drops_content(self, content_dir: Path):
+        """Test that a summary keeps the metadata but not the content."""
+        tab = parse_directory(content_dir)[0]
+        summary = tab.summary()
+        assert not hasattr(summary, "content")
+        assert not hasattr(summary, "sections")
+        assert summary.metadata == tab.metadata
+        assert summary.slug == tab.slug
@@ -0,0 +1,99 @@
+"""Tests for the overlapped build pipeline."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from tabstash.pipeline import Pipeline, StageLimits
+
+
+def double(jobs: list[int]) -> list[tuple[int, list[tuple[Path, bytes]]]]:
+    """Double each job, asking for one file per job to be written."""
+    return [(job * 2, [(Path(f"{job}.txt"), str(job).encode())]) for job in jobs]
+
+
+class TestPipeline:
+    """Tests for ordering, writes and backpressure."""
+
+    def test_consumes_in_discovery_order(self):
+        """Test that results come back in order and every file is written."""
+        paths = [Path(str(i)) for i in range(50)]
+        consumed: list[tuple[int, int]] = []
+        written: list[Path] = []
+
+        def read(path: Path) -> int:
+            # Later paths finish reading first
+            time.sleep((50 - int(path.name)) / 10000)
+            return int(path.name)
+
+        with ThreadPoolExecutor(2) as pool:
+            Pipeline(
+                pool,
+                2,
+                read=read,
+                prepare=lambda path, data: data,
+                process=double,
+                consume=lambda job, result: consumed.append((job, result)),
+                write=lambda path, data: written.append(path),
+                limits=StageLimits(readers=4, writers=2, window=8, batch=3),
+            ).run(lambda: paths)
+        assert consumed == [(i, i * 2) for i in range(50)]
+        assert sorted(written) == sorted(Path(f"{i}.txt") for i in range(50))
+
+    def test_bounds_work_in_flight(self):
+        """Test that a slow consumer holds the earlier stages back."""
+        lock = threading.Lock()
+        read = consumed = 0
+        ahead = 0
+
+        def count_read(path: Path) -> int:
+            nonlocal read, ahead
+            with lock:
+                read += 1
+                ahead = max(ahead, read - consumed)
+            return 1
+
+        def slow_consume(job: int, result: int) -> None:
+            nonlocal consumed
+            time.sleep(0.001)
+            consumed += 1
+
+        with ThreadPoolExecutor(1) as pool:
+            Pipeline(
+                pool,
+                1,
+                read=count_read,
+                prepare=lambda path, data: data,
+                process=double,
+                consume=slow_consume,
+                write=lambda path, data: None,
+                limits=StageLimits(window=4),
+            ).run(lambda: [Path(str(i)) for i in range(100)])
+        assert consumed == 100
+        # The window, plus the one being consumed
+        assert ahead <= 5
+
+    def test_reports_failed_writes(self):
+        """Test that a failed write is reported and the others still happen."""
+        written: list[Path] = []
+        failed: list[tuple[Path, str]] = []
+
+        def write(path: Path, data: bytes) -> None:
+            if path == Path("3.txt"):
+                raise OSError("disk full")
+            written.append(path)
+
+        with ThreadPoolExecutor(1) as pool:
+            Pipeline(
+                pool,
+                1,
+                read=lambda path: int(path.name),
+                prepare=lambda path, data: data,
+                process=double,
+                consume=lambda job, result: None,
+                write=write,
+                write_failed=lambda path, error: failed.append((path, str(error))),
+            ).run(lambda: [Path(str(i)) for i in range(10)])
+        assert failed == [(Path("3.txt"), "disk full")]
+        assert len(written) == 9
@@ -0,0 +1,47 @@
+"""Tests for build profiling."""
+
+import time
+
+from tabstash.profiling import Profiler
+
+
+class TestProfiler:
+    """Tests for phase timing and the slowest-file tables."""
+
+    def test_nested_phases_are_exclusive(self):
+        """Test that time in an inner phase is not charged to the outer one."""
+        profiler = Profiler()
+        with profiler.phase("outer"), profiler.phase("inner"):
+            time.sleep(0.05)
+        phases = profiler.profile.phases
+        assert phases["inner"].wall_seconds >= 0.05
+        assert phases["outer"].wall_seconds < 0.05
+
+    def test_iterate_charges_production(self):
+        """Test that producing items is charged, consuming them is not."""
+
+        def slow():
+            for i in range(2):
+                time.sleep(0.05)
+                yield i
+
+        profiler = Profiler()
+        with profiler.phase("consume"):
+            for _ in profiler.iterate("produce", slow()):
+                time.sleep(0.01)
+        phases = profiler.profile.phases
+        assert phases["produce"].calls == 3
+        assert phases["produce"].wall_seconds >= 0.1
+        assert 0.02 <= phases["consume"].wall_seconds < 0.1
+
+    def test_keeps_slowest(self):
+        """Test that only the slowest files are kept, slowest first."""
+        profiler = Profiler(slowest=2)
+        for i, seconds in enumerate([0.3, 0.1, 0.5, 0.2]):
+            profiler.record_render(f"page-{i}.html", seconds)
+        profile = profiler.finish()
+        assert [t.path for t in profile.slowest_renders] == [
+            "page-2.html",
+            "page-0.html",
+        ]
+        assert profile.slowest_parses == []
@@ -0,0 +1,108 @@
+"""Tests for snapshot-based source scanning."""
+
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from tabstash.scan import UNSETTLED, Snapshot, scan
+
+
+def write(path: Path, text: str = "tab") -> Path:
+    """Write a file, creating its directory."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return path
+
+
+def settle(root: Path) -> None:
+    """Backdate everything under root so its mtimes can be trusted."""
+    old = time.time() - 60
+    for path in [root, *root.rglob("*")]:
+        os.utime(path, (old, old))
+
+
+@pytest.fixture
+def tabs(tmp_path: Path) -> Path:
+    """A small settled tree of tab sources."""
+    root = tmp_path / "tabs"
+    write(root / "artist-one" / "song-a.md")
+    write(root / "artist-one" / "song-b.md")
+    write(root / "artist-two" / "song-c.md")
+    settle(root)
+    return root
+
+
+class TestScan:
+    """Tests for scanning and diffing source trees."""
+
+    def test_first_scan_adds_everything(self, tabs: Path):
+        """Test that without a snapshot every matching file is added."""
+        write(tabs / "artist-two" / "notes.txt")
+        write(tabs / "artist-two" / ".draft.md")
+        snapshot, delta = scan(tabs, suffix=".md")
+        assert snapshot.paths() == [
+            tabs / "artist-one" / "song-a.md",
+            tabs / "artist-one" / "song-b.md",
+            tabs / "artist-two" / "song-c.md",
+        ]
+        assert delta.added == set(snapshot.paths())
+        assert not delta.modified and not delta.deleted
+
+    def test_reports_added_modified_and_deleted(self, tabs: Path):
+        """Test that each kind of change lands in the delta."""
+        previous, _ = scan(tabs, suffix=".md")
+        write(tabs / "artist-one" / "song-a.md", "edited")
+        (tabs / "artist-one" / "song-b.md").unlink()
+        write(tabs / "artist-three" / "song-d.md")
+        _, delta = scan(tabs, previous, ".md")
+        assert delta.added == {tabs / "artist-three" / "song-d.md"}
+        assert delta.modified == {tabs / "artist-one" / "song-a.md"}
+        assert delta.deleted == {tabs / "artist-one" / "song-b.md"}
+
+    def test_unchanged_directories_are_not_listed(
+        self, tabs: Path, monkeypatch: pytest.MonkeyPatch
+    ):
+        """Test that only directories whose mtime moved are read again."""
+        previous, _ = scan(tabs, suffix=".md")
+        write(tabs / "artist-two" / "song-d.md")
+        listed: list[str] = []
+        scandir = os.scandir
+
+        def counting_scandir(path):
+            listed.append(Path(path).name)
+            return scandir(path)
+
+        monkeypatch.setattr(os, "scandir", counting_scandir)
+        snapshot, delta = scan(tabs, previous, ".md")
+        assert listed == ["artist-two"]
+        assert delta.changed() == {tabs / "artist-two" / "song-d.md"}
+        assert len(snapshot.paths()) == 4
+
+    def test_recent_changes_stay_unsettled(self, tabs: Path):
+        """Test that a file changed just now is checked again next time."""
+        path = write(tabs / "artist-one" / "song-a.md", "edited")
+        snapshot, _ = scan(tabs, suffix=".md")
+        assert snapshot.files()[path][0] == UNSETTLED
+        _, delta = scan(tabs, snapshot, ".md")
+        assert delta.modified == {path}
+
+
+class TestSnapshot:
+    """Tests for saving and loading snapshots."""
+
+    def test_round_trip(self, tabs: Path, tmp_path: Path):
+        """Test that a saved snapshot loads back equal."""
+        snapshot, _ = scan(tabs, suffix=".md")
+        snapshot.save(tmp_path / "scan.json")
+        assert Snapshot.load(tmp_path / "scan.json", tabs, ".md") == snapshot
+
+    def test_rejects_other_trees_and_bad_files(self, tabs: Path, tmp_path: Path):
+        """Test that a snapshot of something else is not used."""
+        snapshot, _ = scan(tabs, suffix=".md")
+        snapshot.save(tmp_path / "scan.json")
+        assert Snapshot.load(tmp_path / "scan.json", tmp_path, ".md") is None
+        assert Snapshot.load(tmp_path / "scan.json", tabs, ".txt") is None
+        (tmp_path / "scan.json").write_text("{")
+        assert Snapshot.load(tmp_path / "scan.json", tabs, ".md") is None
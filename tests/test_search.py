@@ -0,0 +1,261 @@
+"""Tests for search index generation."""
+
+import gzip
+import json
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from tabstash import compress
+from tabstash.parser import parse_directory
+from tabstash.search import (
+    MiniSearchIndex,
+    build_search_index,
+    generate_search_index,
+    process_term,
+    search_index_sizes,
+    tokenize,
+)
+
+PROJECT_ROOT = Path(__file__).parent.parent
+TOKENIZER_JS = PROJECT_ROOT / "static" / "js" / "tokenizer.js"
+SEARCH_JS = PROJECT_ROOT / "static" / "js" / "search.js"
+
+requires_node = pytest.mark.skipif(
+    shutil.which("node") is None, reason="node not installed"
+)
+
+# Strings that exercise the edges of the separator class
+TRICKY_STRINGS = [
+    "",
+    "What's Up?",
+    "Rock & Roll",
+    "semi-charmed life",
+    "  leading and trailing  ",
+    "tabs\tand\nnewlines\r\nhere",
+    "Guns N' Roses — “Patience”",
+    "Sigur Rós · Hoppípolla",
+    "Motörhead ¡Ace of Spades!",
+    "ΣΊΣΥΦΟΣ",
+    "İstanbul",
+    "東京事変「丸の内サディスティック」",
+    "100% (live) [remastered] {demo}",
+    "no break thin　ideographic",
+    "emoji 🎸 guitar",
+]
+
+
+def corpus() -> list[str]:
+    """Tokenizer test corpus: the shipped tabs plus the tricky strings."""
+    texts = list(TRICKY_STRINGS)
+    for tab in parse_directory(PROJECT_ROOT / "content"):
+        texts.extend([tab.metadata.title, tab.metadata.artist, tab.content])
+        texts.append(",".join(tab.metadata.tags))
+    return texts
+
+
+class TestTokenizer:
+    """Tests for the Python/JavaScript tokenizer pair."""
+
+    def test_splits_on_space_and_punctuation(self):
+        """Test that tokens split like MiniSearch's default tokenizer."""
+        assert tokenize("What's Up?") == ["What", "s", "Up", ""]
+        assert tokenize("acoustic,90s") == ["acoustic", "90s"]
+
+    def test_process_term_lowercases(self):
+        """Test that terms are lowercased."""
+        assert process_term("Oasis") == "oasis"
+
+    @requires_node
+    def test_matches_javascript_tokenizer(self):
+        """Test that tokenizer.js and tabstash.search agree on the corpus."""
+        script = (
+            f"const t = require({json.dumps(str(TOKENIZER_JS))});"
+            "let input = '';"
+            "process.stdin.on('data', d => input += d);"
+            "process.stdin.on('end', () => {"
+            "  const texts = JSON.parse(input);"
+            "  const out = texts.map(s => t.tokenize(s).map(t.processTerm));"
+            "  process.stdout.write(JSON.stringify(out));"
+            "});"
+        )
+        texts = corpus()
+        output = subprocess.run(
+            ["node", "-e", script],
+            input=json.dumps(texts),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        expected = [[process_term(t) for t in tokenize(text)] for text in texts]
+        assert json.loads(output) == expected
+
+
+class TestMiniSearchIndex:
+    """Tests for the prebuilt MiniSearch index."""
+
+    def test_serialized_layout(self):
+        """Test that the index matches MiniSearch's toJSON layout."""
+        index = MiniSearchIndex(["title", "tags"], ["title"])
+        index.add({"id": "a/one", "title": "Hey Hey", "tags": ["rock"]})
+        index.add({"id": "b/two", "title": "Hey You", "tags": []})
+
+        data = json.loads(json.dumps(index.to_dict()))
+        assert data["documentCount"] == 2
+        assert data["nextId"] == 2
+        assert data["documentIds"] == {"0": "a/one", "1": "b/two"}
+        assert data["fieldIds"] == {"title": 0, "tags": 1}
+        # Unique raw tokens per field; an empty tag list is one empty token
+        assert data["fieldLength"] == {"0": [1, 1], "1": [2, 1]}
+        assert data["averageFieldLength"] == [1.5, 1.0]
+        assert data["storedFields"] == {
+            "0": {"title": "Hey Hey"},
+            "1": {"title": "Hey You"},
+        }
+        assert data["serializationVersion"] == 2
+        assert dict(data["index"]) == {
+            "hey": {"0": {"0": 2, "1": 1}},
+            "rock": {"1": {"0": 1}},
+            "you": {"0": {"1": 1}},
+        }
+
+    def test_generate_search_index(self, tmp_path: Path):
+        """Test that the shipped catalog produces a loadable index file."""
+        tabs = parse_directory(PROJECT_ROOT / "content")
+        output = tmp_path / "search-index.json"
+        assert generate_search_index(tabs, output, "/tabstash") == len(tabs)
+
+        data = json.loads(output.read_text())
+        assert data["documentCount"] == len(tabs)
+        stored = data["storedFields"]["0"]
+        assert stored["url"].startswith("/tabstash/tabs/")
+        assert set(stored) == {"title", "artist", "url", "tags"}
+
+
+class TestShardedIndex:
+    """Tests for the prefix-sharded search index."""
+
+    @pytest.fixture
+    def index(self) -> MiniSearchIndex:
+        index = MiniSearchIndex(["title", "tags"], ["title"])
+        index.add({"id": "a/one", "title": "Wonderwall", "tags": ["acoustic"]})
+        index.add({"id": "b/two", "title": "Wish You Were Here", "tags": []})
+        index.add({"id": "c/three", "title": "Silver and Gold", "tags": ["acoustic"]})
+        return index
+
+    def test_shards_partition_terms(self, index: MiniSearchIndex):
+        """Test that every term lands in exactly one shard."""
+        shards = index.shards(1)
+        assert set(shards) == {"a", "g", "h", "s", "w", "y"}
+        terms = [term for shard in shards.values() for term in shard]
+        assert sorted(terms) == sorted(index.index)
+
+    def test_shards_keep_global_statistics(self, index: MiniSearchIndex):
+        """Test that shards only carry the documents their terms point at."""
+        shard = json.loads(index.serialize(index.shards(2)["wo"]))
+        assert shard["documentCount"] == 3
+        assert shard["averageFieldLength"] == index.average_field_length
+        assert shard["documentIds"] == {"0": "a/one"}
+        assert set(shard["storedFields"]) == {"0"}
+
+    def test_generate_sharded_index(self, tmp_path: Path):
+        """Test that sharded output is a small manifest plus shard files."""
+        tabs = parse_directory(PROJECT_ROOT / "content")
+        output = tmp_path / "search-index.json"
+        assert generate_search_index(tabs, output, shard_prefix=1) == len(tabs)
+        assert (tmp_path / "search-index.json.gz").exists()
+
+        manifest = json.loads(output.read_text())
+        assert manifest["prefixLength"] == 1
+        for name in manifest["shards"].values():
+            shard = json.loads((tmp_path / "search-index" / name).read_text())
+            assert shard["serializationVersion"] == 2
+
+        # Switching back to a single index removes the shards
+        generate_search_index(tabs, output)
+        assert not (tmp_path / "search-index").exists()
+
+
+def load_in_search_js(index_json: str, base_url: str) -> dict:
+    """Run search.js under node with stubs and capture what it loads."""
+    script = f"""
+const fs = require('fs');
+let loaded = null;
+global.TabStashTokenizer = require({json.dumps(str(TOKENIZER_JS))});
+global.MiniSearch = {{ loadJS: (js) => {{ loaded = js; return {{}}; }} }};
+const container = {{ dataset: {{ shardPrefix: '0' }} }};
+const input = {{ closest: () => container, addEventListener: () => {{}} }};
+global.document = {{
+    getElementById: (id) => (id === 'search' ? input : null),
+    body: {{ dataset: {{ baseUrl: {json.dumps(base_url)} }} }},
+    addEventListener: () => {{}},
+}};
+global.fetch = () => Promise.resolve({{ text: () => fs.readFileSync(0, 'utf8') }});
+eval(fs.readFileSync({json.dumps(str(SEARCH_JS))}, 'utf8'));
+setTimeout(() => process.stdout.write(JSON.stringify(loaded)), 50);
+"""
+    output = subprocess.run(
+        ["node", "-e", script],
+        input=index_json,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output)
+
+
+class TestCompactIndex:
+    """Tests for the compact columnar index layout."""
+
+    @pytest.fixture
+    def index(self) -> MiniSearchIndex:
+        return build_search_index(parse_directory(PROJECT_ROOT / "content"), "/ts")
+
+    def test_compact_is_smaller(self, index: MiniSearchIndex):
+        """Test that the columnar layout beats the toJSON layout."""
+        assert len(index.serialize(compact=True)) < len(index.serialize())
+
+    def test_interns_artists(self, index: MiniSearchIndex):
+        """Test that artist names are stored once in a lookup table."""
+        compact = index.to_compact()
+        table = compact["interned"]["artist"]
+        assert len(table) == len(set(table))
+        assert "url" not in compact["stored"]
+        assert "docs" not in compact
+
+    @requires_node
+    @pytest.mark.parametrize("compact", [False, True])
+    def test_search_js_expands_to_minisearch_layout(
+        self, index: MiniSearchIndex, compact: bool
+    ):
+        """Test that search.js hands MiniSearch the same index either way."""
+        loaded = load_in_search_js(index.serialize(compact=compact), "/ts")
+        assert loaded == json.loads(index.serialize())
+
+    @requires_node
+    def test_search_js_expands_partial_index(self, index: MiniSearchIndex):
+        """Test that a shard's sparse document ids survive the round trip."""
+        terms = index.shards(1)["w"]
+        loaded = load_in_search_js(index.serialize(terms, compact=True), "/ts")
+        assert loaded == json.loads(index.serialize(terms))
+
+
+class TestPrecompression:
+    """Tests for compressed siblings and their reported sizes."""
+
+    def test_sizes_cover_all_encodings(self, tmp_path: Path):
+        """Test that raw and compressed sizes are reported."""
+        tabs = parse_directory(PROJECT_ROOT / "content")
+        output = tmp_path / "search-index.json"
+        generate_search_index(tabs, output, compact=True)
+
+        sizes = search_index_sizes(output)
+        assert sizes["raw"] == output.stat().st_size
+        assert 0 < sizes["gzip"] < sizes["raw"]
+        assert gzip.decompress((tmp_path / "search-index.json.gz").read_bytes()) == (
+            output.read_bytes()
+        )
+        if compress.brotli is not None:
+            assert 0 < sizes["br"] < sizes["raw"]
@@ -0,0 +1,229 @@
+"""Tests for the threaded site server."""
+
+import gzip
+import http.client
+import os
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from tabstash.server import (
+    IMMUTABLE,
+    REVALIDATE,
+    FileCache,
+    FileInfo,
+    SiteServer,
+    accepted_encodings,
+    parse_range,
+)
+
+PAGE = b"<html>" + b"tab " * 500 + b"</html>"
+
+
+@pytest.fixture
+def site(tmp_path: Path) -> Path:
+    """A small built site with compressed siblings."""
+    root = tmp_path / "dist"
+    (root / "static" / "js").mkdir(parents=True)
+    (root / "tabs").mkdir()
+    (root / "index.html").write_bytes(PAGE)
+    (root / "index.html.gz").write_bytes(gzip.compress(PAGE))
+    (root / "tabs" / "index.html").write_bytes(b"tabs")
+    (root / "static" / "js" / "search.0123abcd.js").write_bytes(b"search()")
+    (root / ".tabstash-manifest.json").write_text("{}")
+    return root
+
+
+@pytest.fixture
+def server(site: Path) -> Iterator[SiteServer]:
+    """A server for the site on a free port."""
+    httpd = SiteServer(("127.0.0.1", 0), site, quiet=True)
+    thread = threading.Thread(
+        target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    )
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def get(
+    server: SiteServer, path: str, **headers: str
+) -> tuple[http.client.HTTPResponse, bytes]:
+    """Make one GET request, with header names given in snake_case."""
+    connection = http.client.HTTPConnection(*server.server_address, timeout=5)
+    connection.request(
+        "GET", path, headers={k.replace("_", "-"): v for k, v in headers.items()}
+    )
+    response = connection.getresponse()
+    body = response.read()
+    connection.close()
+    return response, body
+
+
+class TestSiteServer:
+    """Tests for request handling."""
+
+    def test_serves_files(self, server: SiteServer):
+        """Test a plain request for a page."""
+        response, body = get(server, "/index.html")
+        assert response.status == 200
+        assert body == PAGE
+        assert response.getheader("Content-Type") == "text/html; charset=utf-8"
+        assert response.getheader("Cache-Control") == REVALIDATE
+        assert response.getheader("Content-Encoding") is None
+
+    def test_serves_precompressed_sibling(self, server: SiteServer):
+        """Test that clients accepting gzip get the .gz file."""
+        response, body = get(server, "/", accept_encoding="br, gzip")
+        assert response.getheader("Content-Encoding") == "gzip"
+        assert response.getheader("Vary") == "Accept-Encoding"
+        assert gzip.decompress(body) == PAGE
+
+    def test_ignores_stale_sibling(self, server: SiteServer, site: Path):
+        """Test that a sibling older than its file is not served."""
+        os.utime(site / "index.html.gz", ns=(0, 0))
+        response, body = get(server, "/", accept_encoding="gzip")
+        assert response.getheader("Content-Encoding") is None
+        assert body == PAGE
+
+    def test_conditional_request(self, server: SiteServer):
+        """Test that a matching ETag gets a 304 and a stale one the page."""
+        response, _ = get(server, "/index.html")
+        etag = response.getheader("ETag")
+        response, body = get(server, "/index.html", if_none_match=etag)
+        assert response.status == 304
+        assert body == b""
+        response, _ = get(server, "/index.html", if_none_match='"other"')
+        assert response.status == 200
+
+    def test_byte_ranges(self, server: SiteServer):
+        """Test partial and unsatisfiable ranges."""
+        response, body = get(server, "/index.html", range="bytes=0-5")
+        assert response.status == 206
+        assert body == PAGE[:6]
+        assert response.getheader("Content-Range") == f"bytes 0-5/{len(PAGE)}"
+        response, body = get(server, "/index.html", range="bytes=-7")
+        assert body == PAGE[-7:]
+        response, _ = get(server, "/index.html", range=f"bytes={len(PAGE)}-")
+        assert response.status == 416
+
+    def test_fingerprinted_assets_are_immutable(self, server: SiteServer):
+        """Test that hashed asset names get a long-lived Cache-Control."""
+        response, body = get(server, "/static/js/search.0123abcd.js")
+        assert body == b"search()"
+        assert response.getheader("Cache-Control") == IMMUTABLE
+        assert response.getheader("Content-Type").startswith("text/javascript")
+
+    def test_directories(self, server: SiteServer):
+        """Test directory redirects and index pages."""
+        response, _ = get(server, "/tabs")
+        assert response.status == 301
+        assert response.getheader("Location") == "/tabs/"
+        response, body = get(server, "/tabs/")
+        assert body == b"tabs"
+
+    def test_refuses_hidden_and_outside_files(self, server: SiteServer):
+        """Test that dotfiles and paths outside the site are not served."""
+        for path in ["/.tabstash-manifest.json", "/../dist/index.html", "/missing"]:
+            response, _ = get(server, path)
+            assert response.status == 404, path
+
+    def test_keep_alive(self, server: SiteServer):
+        """Test that one connection serves several requests."""
+        connection = http.client.HTTPConnection(*server.server_address, timeout=5)
+        for _ in range(3):
+            connection.request("GET", "/index.html")
+            assert connection.getresponse().read() == PAGE
+        connection.close()
+
+    def test_headers_match_a_file_replaced_after_stat(
+        self, server: SiteServer, site: Path, monkeypatch: pytest.MonkeyPatch
+    ):
+        """Test that a page swapped in after the stat is described correctly."""
+        stat = FileInfo.stat
+
+        def stat_then_replace(path: Path) -> FileInfo:
+            info = stat(path)
+            if path.name == "index.html":
+                (site / "new.html").write_bytes(b"rebuilt")
+                os.replace(site / "new.html", path)
+            return info
+
+        monkeypatch.setattr(FileInfo, "stat", stat_then_replace)
+        response, body = get(server, "/tabs/index.html")
+        assert body == b"rebuilt"
+        assert response.getheader("Content-Length") == str(len(b"rebuilt"))
+        assert response.getheader("ETag") == stat(site / "tabs" / "index.html").etag
+
+
+class TestFileCache:
+    """Tests for the file contents cache."""
+
+    def test_evicts_least_recently_used(self, tmp_path: Path):
+        """Test that the cache stays under its size bound."""
+        cache = FileCache(max_bytes=25, max_file_bytes=10)
+        files = []
+        for name in "abc":
+            path = tmp_path / name
+            path.write_bytes(name.encode() * 10)
+            files.append(FileInfo.stat(path))
+        cache.get(files[0])
+        cache.get(files[1])
+        cache.get(files[0])
+        cache.get(files[2])
+        assert len(cache) == 2
+        assert cache.size == 20
+        cache.get(files[0])
+        assert cache.hits == 2
+
+    def test_rewritten_file_is_reread(self, tmp_path: Path):
+        """Test that an entry is dropped once its file changes."""
+        path = tmp_path / "page.html"
+        path.write_bytes(b"old")
+        cache = FileCache()
+        assert cache.get(FileInfo.stat(path)) == b"old"
+        path.write_bytes(b"newer")
+        assert cache.get(FileInfo.stat(path)) == b"newer"
+        assert cache.size == 5
+
+    def test_reads_misses_from_the_open_file(self, tmp_path: Path):
+        """Test that a miss reads the given file, not the path again."""
+        path = tmp_path / "page.html"
+        path.write_bytes(b"served")
+        cache = FileCache()
+        with path.open("rb") as f:
+            info = FileInfo.fstat(path, f)
+            (tmp_path / "new.html").write_bytes(b"swapped in")
+            os.replace(tmp_path / "new.html", path)
+            assert cache.get(info, f) == b"served"
+
+    def test_skips_large_files(self, tmp_path: Path):
+        """Test that files over the per-file bound are not cached."""
+        path = tmp_path / "big"
+        path.write_bytes(b"x" * 100)
+        cache = FileCache(max_bytes=1000, max_file_bytes=50)
+        assert cache.get(FileInfo.stat(path)) is None
+        assert len(cache) == 0
+
+
+class TestHeaders:
+    """Tests for header parsing."""
+
+    def test_accepted_encodings(self):
+        """Test that zero-quality codings are refused."""
+        assert accepted_encodings("gzip, br;q=0.5, deflate;q=0") == {"gzip", "br"}
+        assert accepted_encodings(None) == set()
+
+    def test_parse_range(self):
+        """Test the byte range forms."""
+        assert parse_range("bytes=0-9", 100) == (0, 10)
+        assert parse_range("bytes=90-", 100) == (90, 100)
+        assert parse_range("bytes=-10", 100) == (90, 100)
+        assert parse_range("bytes=0-999", 100) == (0, 100)
+        assert parse_range("bytes=100-", 100) == (100, 100)
+        assert parse_range("bytes=5-1", 100) is None
+        assert parse_range("bytes=0-1,5-6", 100) is None
+        assert parse_range("items=0-1", 100) is None
@@ -0,0 +1,68 @@
+"""Tests for shard assignment and shard metadata."""
+
+from pathlib import Path
+
+import pytest
+
+from tabstash.models import Metadata, TabSummary
+from tabstash.shard import ShardMetadata, parse_shard, shard_of
+
+
+class TestParseShard:
+    """Tests for reading K/N shard specs."""
+
+    def test_parses_k_of_n(self):
+        """Test that K/N becomes a pair."""
+        assert parse_shard("2/5") == (2, 5)
+        assert parse_shard("1/1") == (1, 1)
+
+    @pytest.mark.parametrize("spec", ["3", "0/2", "3/2", "a/b", "1/"])
+    def test_rejects_bad_specs(self, spec: str):
+        """Test that malformed or out-of-range specs are refused."""
+        with pytest.raises(ValueError):
+            parse_shard(spec)
+
+
+class TestShardOf:
+    """Tests for assigning artists to shards."""
+
+    def test_is_stable_and_in_range(self):
+        """Test that an artist always lands in the same valid shard."""
+        slugs = [f"artist-{i}" for i in range(200)]
+        shards = [shard_of(slug, 4) for slug in slugs]
+        assert shards == [shard_of(slug, 4) for slug in slugs]
+        assert set(shards) == {1, 2, 3, 4}
+
+    def test_single_shard_takes_everything(self):
+        """Test that one shard builds every artist."""
+        assert {shard_of(f"artist-{i}", 1) for i in range(20)} == {1}
+
+
+class TestShardMetadata:
+    """Tests for saving and loading shard metadata."""
+
+    def test_round_trip_relative_to_content(self, tmp_path: Path):
+        """Test that sources are stored relative to the content directory."""
+        tab = TabSummary(
+            metadata=Metadata(title="Song", artist="Artist", tags=["folk"]),
+            source_path=tmp_path / "ci" / "content" / "tabs" / "artist" / "song.md",
+            slug="song",
+            artist_slug="artist",
+        )
+        metadata = ShardMetadata((1, 2), {"page_size": 50}, {"a.css": "a.1.css"}, [tab])
+        metadata.save(tmp_path / "shard.json", tmp_path / "ci" / "content")
+
+        loaded = ShardMetadata.load(tmp_path / "shard.json", tmp_path / "content")
+        assert loaded is not None
+        assert loaded.shard == (1, 2)
+        assert loaded.assets == {"a.css": "a.1.css"}
+        assert loaded.tabs[0].source_path == (
+            tmp_path / "content" / "tabs" / "artist" / "song.md"
+        )
+        assert loaded.tabs[0].metadata == tab.metadata
+
+    def test_unusable_file_loads_as_none(self, tmp_path: Path):
+        """Test that a missing or foreign file is not taken for metadata."""
+        assert ShardMetadata.load(tmp_path / "missing.json", tmp_path) is None
+        (tmp_path / "other.json").write_text('{"format": "something-else"}')
+        assert ShardMetadata.load(tmp_path / "other.json", tmp_path) is None
@@ -0,0 +1,83 @@
+"""Tests for chord transposition."""
+
+from tabstash.parser import tokenize_lines
+from tabstash.transpose import parse_key, spelling, transpose_tab
+
+SONG = """[Intro]
+Em7  G  Dsus4  A7sus4  (x2)
+
+[Verse]
+G      D/F#      Em
+Today is gonna be the day
+(Bb)   C  |
+G      D/F#      Em
+"""
+
+
+def transpose(content: str, key: str | None = None):
+    """Transpose content the way the builder does."""
+    return transpose_tab(content, tokenize_lines(content), key)
+
+
+class TestParseKey:
+    """Tests for reading the key from metadata."""
+
+    def test_major_and_minor(self):
+        """Test that tonic and mode are recognised."""
+        assert parse_key("G") == (7, False)
+        assert parse_key("F#m") == (6, True)
+        assert parse_key("Bbmaj7") == (10, False)
+        assert parse_key("unknown") is None
+        assert parse_key(None) is None
+
+    def test_spelling_follows_key(self):
+        """Test that flat keys spell with flats and minors follow their major."""
+        assert spelling(5, False)[10] == "Bb"
+        assert spelling(7, False)[6] == "F#"
+        assert spelling(2, True)[10] == "Bb"
+
+
+class TestTransposeTab:
+    """Tests for precomputed key variants."""
+
+    def test_twelve_keys(self):
+        """Test that every shift is spelled and labelled."""
+        result = transpose(SONG, "G")
+        assert result is not None
+        assert result.keys == [
+            "G", "Ab", "A", "Bb", "B", "C", "Db", "D", "Eb", "E", "F", "F#"
+        ]  # fmt: skip
+        assert len(result.variants) == 12
+        assert result.variants[2][0] == "F#m7 A  Esus4  B7sus4  (x2)"
+        assert result.variants[5][1] == "C      G/B       Am"
+
+    def test_original_spelling_kept(self):
+        """Test that shift zero is the tab exactly as written."""
+        result = transpose(SONG, "G")
+        assert result.variants[0] == [
+            "Em7  G  Dsus4  A7sus4  (x2)",
+            "G      D/F#      Em",
+            "(Bb)   C  |",
+        ]
+
+    def test_repeated_lines_share_a_slot(self):
+        """Test that identical chord lines are stored once."""
+        result = transpose(SONG, "G")
+        assert result.slots == {1: 0, 4: 1, 6: 2, 7: 1}
+
+    def test_longer_chords_keep_a_space(self):
+        """Test that a chord growing in length never runs into the next."""
+        result = transpose("G A\nwords", "G")
+        assert result.variants[1][0] == "Ab Bb"
+
+    def test_unknown_key_uses_semitones(self):
+        """Test that tabs without a key are labelled by shift."""
+        result = transpose(SONG)
+        assert result.keys[:3] == ["0", "+1", "+2"]
+        assert result.keys[-1] == "-1"
+        # Spelled relative to the first chord, E minor
+        assert result.variants[1][1] == "Ab     Eb/G      Fm"
+
+    def test_no_chords(self):
+        """Test that tabs without chord lines are skipped."""
+        assert transpose("[Verse]\nJust words", "G") is None
@@ -0,0 +1,73 @@
+"""Tests for the polling file watcher."""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from tabstash.watch import Watcher
+
+
+class TestWatcher:
+    """Tests for change detection."""
+
+    def test_detects_added_modified_and_deleted(self, tmp_path: Path):
+        """Test that each kind of change is reported once."""
+        keep = tmp_path / "keep.md"
+        edit = tmp_path / "sub" / "edit.md"
+        gone = tmp_path / "gone.md"
+        edit.parent.mkdir()
+        for path in (keep, edit, gone):
+            path.write_text("one")
+
+        watcher = Watcher([tmp_path])
+        assert watcher.poll() == set()
+
+        edit.write_text("two, longer")
+        gone.unlink()
+        added = tmp_path / "sub" / "new.md"
+        added.write_text("new")
+
+        assert watcher.poll() == {edit, gone, added}
+        assert watcher.poll() == set()
+
+    def test_ignores_hidden_files(self, tmp_path: Path):
+        """Test that editor swap files do not trigger rebuilds."""
+        watcher = Watcher([tmp_path])
+        (tmp_path / ".song.md.swp").write_text("swap")
+        assert watcher.poll() == set()
+
+    def test_changes_debounces_bursts(self, tmp_path: Path):
+        """Test that a burst of writes is yielded as one change set."""
+        watcher = Watcher([tmp_path], interval=0.01, debounce=0.05)
+        first = tmp_path / "a.md"
+        second = tmp_path / "b.md"
+        first.write_text("a")
+        second.write_text("b")
+        assert next(watcher.changes()) == {first, second}
+
+    def test_unchanged_directories_are_not_listed(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ):
+        """Test that a poll only lists directories whose mtime moved."""
+        for name in ("one", "two"):
+            (tmp_path / name).mkdir()
+            (tmp_path / name / "song.md").write_text(name)
+        old = os.stat(tmp_path).st_mtime_ns - 10 * 10**9
+        for path in (tmp_path, tmp_path / "one", tmp_path / "two"):
+            os.utime(path, ns=(old, old))
+        watcher = Watcher([tmp_path])
+        listed: list[str] = []
+        scandir = os.scandir
+
+        def counting_scandir(path):
+            listed.append(Path(path).name)
+            return scandir(path)
+
+        monkeypatch.setattr(os, "scandir", counting_scandir)
+        assert watcher.poll() == set()
+        assert listed == []
+        added = tmp_path / "two" / "new.md"
+        added.write_text("new")
+        assert watcher.poll() == {added}
+        assert listed == ["two"]